@@ -14,9 +14,62 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# JWT verification configuration
+# Shared secret for projects that still sign access tokens with HS256,
+# asymmetric signing keys are fetched from the project's JWKS endpoint
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+
+# Role cache configuration
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "60"))
+ROLE_CACHE_MAX_SIZE = int(os.getenv("ROLE_CACHE_MAX_SIZE", "10000"))
+
 # Create Supabase client
+# Synchronous client kept for scripts, request handlers use the async repositories
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Async PostgREST connection pool configuration
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+DB_POOL_KEEPALIVE_EXPIRY = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "30"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "True").lower() == "true"
+
+# AI job queue and worker configuration
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_DELAY = int(os.getenv("JOB_RETRY_BASE_DELAY", "30"))
+JOB_RETRY_MAX_DELAY = int(os.getenv("JOB_RETRY_MAX_DELAY", "900"))
+# Stale in_progress generation rows with no live job are recovered by the worker
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", "60"))
+REAPER_STALE_SECONDS = int(os.getenv("REAPER_STALE_SECONDS", "600"))
+# How often the worker compacts the agent session storage (see services/session_compaction.py), 0 disables
+SESSION_COMPACTION_INTERVAL = float(os.getenv("SESSION_COMPACTION_INTERVAL", "3600"))
+# How often the worker logs its model client and connection pool stats, 0 disables
+MODEL_STATS_INTERVAL = float(os.getenv("MODEL_STATS_INTERVAL", "300"))
+# Streamed BRD, PRD and market report generation: seconds between draft writes of the partial
+# output, how often /stream endpoints poll the draft without a STATUS_EVENTS_DB_URL LISTEN
+# connection, and their keepalive interval
+STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "2"))
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "1"))
+STREAM_HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+# Generation status events (see migrations/status_events.sql): direct Postgres connection the
+# API LISTENs on, defaulting to the agno storage connection, events kept for Last-Event-ID
+# replay, and events buffered per /events connection before it has to catch up from the table
+STATUS_EVENTS_DB_URL = os.getenv("STATUS_EVENTS_DB_URL") or os.getenv("POSTGRES_CONNECTION")
+STATUS_EVENT_RETENTION = int(os.getenv("STATUS_EVENT_RETENTION", "86400"))
+STATUS_EVENT_QUEUE_SIZE = int(os.getenv("STATUS_EVENT_QUEUE_SIZE", "100"))
+# Generation stages started for a new project, each as soon as its inputs are completed
+# (see app/utils/pipeline.py). github_setup only runs for users with a connected GitHub account.
+PIPELINE_STAGES = [
+    stage.strip()
+    for stage in os.getenv("PIPELINE_STAGES", "brd,prd,tasks,market_research,mockup,github_setup").split(",")
+    if stage.strip()
+]
+
 # Frontend configuration
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:8000")
 
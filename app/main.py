@@ -1,6 +1,10 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import API_V1_PREFIX, PROJECT_NAME, VERSION, CORS_ORIGINS
+from .repositories import close_db
+from .utils.status_events import status_hub
+from .services.memory_writer import memory_writer
 from .routes.user import auth as user_auth
 from .routes.user import project as user_project
 from .routes.user import task as user_task
@@ -8,10 +12,25 @@ from .routes.user import index as user_info
 from .routes.user import setting as user_setting
 from .routes.user import feedback as user_feedback
 from .routes.admin import auth as admin_auth
+from .routes.admin import cache as admin_cache
+from .routes.admin import jobs as admin_jobs
 from .routes.super import auth as super_auth
+from .routes.super import user as super_user
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    yield
+    # Stop listening for status events
+    await status_hub.aclose()
+    # Write queued user memories
+    await memory_writer.aclose()
+    # Release pooled PostgREST connections
+    await close_db()
 
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=PROJECT_NAME,
     version=VERSION,
     docs_url=f"{API_V1_PREFIX}/docs",
@@ -26,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include user routers
@@ -38,9 +58,12 @@ app.include_router(user_feedback.router, prefix=f"{API_V1_PREFIX}/user/feedback"
 
 # Include admin routers
 app.include_router(admin_auth.router, prefix=f"{API_V1_PREFIX}/admin")
+app.include_router(admin_cache.router, prefix=f"{API_V1_PREFIX}/admin")
+app.include_router(admin_jobs.router, prefix=f"{API_V1_PREFIX}/admin")
 
 # Include super admin routers
 app.include_router(super_auth.router, prefix=f"{API_V1_PREFIX}/super")
+app.include_router(super_user.router, prefix=f"{API_V1_PREFIX}/super")
 
 @app.get("/")
 async def root():
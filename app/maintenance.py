@@ -0,0 +1,58 @@
+"""
+Maintenance commands.
+
+Run with ``python maintenance.py <command>``:
+
+compact-sessions
+    Delete agent sessions idle for longer than the retention period and drop
+    the runs beyond the newest ones kept from the rest (see
+    ``app/services/session_compaction.py``), then report the sessions and
+    bytes before and after, the bytes reclaimed, and the median time to load
+    and save the largest sessions before and after.
+"""
+import sys
+import json
+import argparse
+import logging
+
+from .services.config import SESSION_KEEP_RUNS, SESSION_RETENTION_DAYS, SESSION_ARCHIVE
+from .services.memory_storage_service import get_storage
+from .services.session_compaction import SessionCompactor
+
+
+def compact_sessions(args: argparse.Namespace) -> dict:
+    compactor = SessionCompactor(
+        get_storage(),
+        keep_runs=args.keep_runs,
+        retention_days=args.retention_days,
+        archive=args.archive,
+        batch_size=args.batch_size,
+    )
+    return compactor.run(dry_run=args.dry_run, sample=0 if args.dry_run else args.sample)
+
+
+def main() -> None:
+    """Entry point for ``python maintenance.py``"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(prog="maintenance.py", description="TaskFlow maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact = commands.add_parser("compact-sessions", help="Expire and compact the agent session storage")
+    compact.add_argument("--keep-runs", type=int, default=SESSION_KEEP_RUNS, help="Runs kept per session")
+    compact.add_argument("--retention-days", type=int, default=SESSION_RETENTION_DAYS,
+                         help="Delete sessions not updated for this many days, 0 keeps them")
+    compact.add_argument("--archive", action=argparse.BooleanOptionalAction, default=SESSION_ARCHIVE,
+                         help="Store what is removed, compressed, in ai.agent_sessions_archive")
+    compact.add_argument("--sample", type=int, default=20,
+                         help="Largest sessions to time loading and saving of before and after")
+    compact.add_argument("--batch-size", type=int, default=100, help="Sessions changed per transaction")
+    compact.add_argument("--dry-run", action="store_true", help="Only count what would be removed")
+    compact.set_defaults(handler=compact_sessions)
+
+    args = parser.parse_args()
+    report = args.handler(args)
+    json.dump(report, sys.stdout, indent=2)
+    print()
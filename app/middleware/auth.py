@@ -1,32 +1,79 @@
 from typing import Optional, Callable
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..config import supabase
+from ..config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWT_AUDIENCE,
+    ROLE_CACHE_TTL,
+    ROLE_CACHE_MAX_SIZE,
+)
+from ..repositories import get_auth, users
+from ..utils.cache import TTLCache
+from ..utils.jwt_verifier import SupabaseJWTVerifier, TokenVerificationUnavailable, claims_to_user
 
 security = HTTPBearer()
 
-def get_current_user(request: Request) -> dict:
-    """Get current user from Supabase session"""
+# Verifies access tokens in-process, GoTrue is only asked when that is not possible
+jwt_verifier = SupabaseJWTVerifier(
+    supabase_url=SUPABASE_URL,
+    supabase_key=SUPABASE_KEY,
+    jwt_secret=SUPABASE_JWT_SECRET,
+    audience=SUPABASE_JWT_AUDIENCE,
+)
+
+# Role and ban flag per user id, so each request does not re-read the users table
+role_cache = TTLCache(max_size=ROLE_CACHE_MAX_SIZE, ttl=ROLE_CACHE_TTL)
+
+async def get_current_user(request: Request) -> dict:
+    """Get current user from the bearer token, verified locally with a GoTrue fallback"""
     try:
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
         token = auth_header.split(' ')[1]
-        user = supabase.auth.get_user(token)
-        return user.dict()
+        try:
+            return claims_to_user(await jwt_verifier.verify(token))
+        except TokenVerificationUnavailable:
+            # Signing key unknown or not configured, let GoTrue decide
+            user = await get_auth().get_user(token)
+            return user.dict()
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+async def get_user_role(user_id: str) -> Optional[dict]:
+    """Get role and ban flag for a user, served from the role cache when possible"""
+    role_info = role_cache.get(user_id)
+    if role_info is None:
+        role_info = await users.get_user(user_id, 'role,is_banned')
+        if not role_info:
+            # Do not cache misses, the users row may not be created yet
+            return None
+        role_cache.set(user_id, role_info)
+    return role_info
+
+def invalidate_user_role(user_id: str) -> bool:
+    """Drop a cached role, call this whenever a user's role or ban flag changes"""
+    return role_cache.invalidate(user_id)
+
+def get_role_cache_stats() -> dict:
+    """Hit/miss counters of the role cache"""
+    return role_cache.stats()
+
 def check_user_role(allowed_roles: list[str]) -> Callable:
     """Middleware factory to check user role"""
     async def role_middleware(request: Request):
         try:
-            user = get_current_user(request)
-            user_data = supabase.table('users').select('role').eq('id', user['user']['id']).single().execute()
+            user = await get_current_user(request)
+            role_info = await get_user_role(user['user']['id'])
             
-            if not user_data or user_data.data['role'] not in allowed_roles:
+            if not role_info or role_info['role'] not in allowed_roles:
                 raise HTTPException(status_code=403, detail="Not enough permissions")
+
+            if role_info.get('is_banned'):
+                raise HTTPException(status_code=403, detail="User is banned")
             
             return user['user']
         except HTTPException as e:
@@ -1,6 +1,6 @@
-from .user import User, UserCreate, UserUpdate, UserInDB
-from .project import Project, ProjectCreate, ProjectUpdate, ProjectInDB, ProjectDetail
-from .task import Task, TaskCreate, TaskUpdate, TaskInDB, TaskType, TaskStatus
+from .user import User, UserCreate, UserUpdate, UserInDB, UserRole, UserRoleUpdate
+from .project import Project, ProjectCreate, ProjectUpdate, ProjectInDB, ProjectDetail, ProjectSummary
+from .task import Task, TaskCreate, TaskUpdate, TaskInDB, TaskType, TaskStatus, TaskOrder
 from .market_research import MarketResearch
 from .mockup import Mockup
 from .prd import PRD
@@ -8,9 +8,9 @@ from .github_setup import GitHubSetup
 from .feedback import Feedback, FeedbackCreate, FeedbackInDB
  
 __all__ = [
-    'User', 'UserCreate', 'UserUpdate', 'UserInDB',
+    'User', 'UserCreate', 'UserUpdate', 'UserInDB', 'UserRole', 'UserRoleUpdate',
     'Project', 'ProjectCreate', 'ProjectUpdate', 'ProjectInDB',
-    'Task', 'TaskCreate', 'TaskUpdate', 'TaskInDB', 'TaskType', 'TaskStatus',
-    'MarketResearch', 'Mockup', 'PRD', 'GitHubSetup', 'ProjectDetail',
+    'Task', 'TaskCreate', 'TaskUpdate', 'TaskInDB', 'TaskType', 'TaskStatus', 'TaskOrder',
+    'MarketResearch', 'Mockup', 'PRD', 'GitHubSetup', 'ProjectDetail', 'ProjectSummary',
     'Feedback', 'FeedbackCreate', 'FeedbackInDB'
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ from typing import Optional
 
 class MarketResearch(BaseModel):
     id: str
-    report_markdown: Optional[str]
+    report_markdown: Optional[str] = None
     status: str  # ai_generation_status enum
     created_at: str
     updated_at: str 
\ No newline at end of file
@@ -3,7 +3,7 @@ from typing import Optional
 
 class PRD(BaseModel):
     id: str
-    prd_markdown: Optional[str]
+    prd_markdown: Optional[str] = None
     status: str  # ai_generation_status enum
     created_at: str
     updated_at: str 
\ No newline at end of file
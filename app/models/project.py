@@ -39,6 +39,10 @@ class ProjectInDB(ProjectBase):
 class Project(ProjectInDB):
     pass
 
+class ProjectSummary(Project):
+    tasks_generation_status: Optional[str] = None
+    tasks_generated: Optional[list] = None
+
 class ProjectDetail(Project):
     tasks_generation_status: Optional[str] = None
     tasks_generated: Optional[list] = None
@@ -46,4 +50,13 @@ class ProjectDetail(Project):
     prd: Optional[PRD] = None
     market_research: Optional[MarketResearch] = None
     github_setup: Optional[GitHubSetup] = None 
-    mockup: Optional[Mockup] = None
\ No newline at end of file
+    mockup: Optional[Mockup] = None
+
+class ProjectStatus(BaseModel):
+    id: UUID4
+    tasks: Optional[str] = None
+    brd: Optional[str] = None
+    prd: Optional[str] = None
+    market_research: Optional[str] = None
+    mockup: Optional[str] = None
+    github_setup: Optional[str] = None
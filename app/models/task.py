@@ -38,6 +38,7 @@ class TaskUpdate(TaskBase):
 class TaskInDB(TaskBase):
     id: UUID4
     project_id: UUID4
+    rank: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -45,4 +46,9 @@ class TaskInDB(TaskBase):
         from_attributes = True
 
 class Task(TaskInDB):
-    pass 
\ No newline at end of file
+    pass 
+
+class TaskOrder(BaseModel):
+    task_id: UUID4
+    position: int = Field(..., ge=0)
+    status: Optional[TaskStatus] = None
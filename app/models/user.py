@@ -1,6 +1,12 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, UUID4
+from enum import Enum
+
+class UserRole(str, Enum):
+    user = "user"
+    admin = "admin"
+    super = "super"
 
 class UserBase(BaseModel):
     full_name: Optional[str] = None
@@ -14,6 +20,10 @@ class UserCreate(UserBase):
 class UserUpdate(UserBase):
     is_banned: Optional[bool] = None
 
+class UserRoleUpdate(BaseModel):
+    role: Optional[UserRole] = None
+    is_banned: Optional[bool] = None
+
 class UserInDB(UserBase):
     id: UUID4
     role: str = 'user'
@@ -0,0 +1,7 @@
+"""
+Async data access layer on top of Supabase PostgREST.
+"""
+from .client import get_db, get_auth, new_auth, close_db
+from . import projects, documents, tasks, users, feedback, jobs, llm_limits, llm_cache, embeddings, status_events, memory_chunks
+
+__all__ = ['get_db', 'get_auth', 'new_auth', 'close_db', 'projects', 'documents', 'tasks', 'users', 'feedback', 'jobs', 'llm_limits', 'llm_cache', 'embeddings', 'status_events', 'memory_chunks']
@@ -0,0 +1,116 @@
+"""
+Shared async Supabase clients.
+
+A single pooled ``httpx.AsyncClient`` (keep-alive, HTTP/2, bounded pool) backs
+every PostgREST call made by a process, so request handlers and background
+jobs no longer block the event loop on ``.execute()``.
+"""
+import asyncio
+from typing import Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from gotrue import AsyncMemoryStorage
+from supabase import AsyncClient, ASupabaseAuthClient
+
+from ..config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_MAX_KEEPALIVE,
+    DB_POOL_KEEPALIVE_EXPIRY,
+    DB_TIMEOUT,
+    DB_HTTP2,
+)
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session uses the tuned connection pool"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=DB_HTTP2,
+            limits=httpx.Limits(
+                max_connections=DB_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=DB_POOL_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+
+_db: Optional[PooledPostgrestClient] = None
+_db_loop: Optional[asyncio.AbstractEventLoop] = None
+_auth_client: Optional[AsyncClient] = None
+
+
+def get_db() -> PooledPostgrestClient:
+    """
+    Get the process-wide PostgREST client.
+
+    The underlying connection pool is bound to the event loop it was created
+    on, so a new client is built if called from a different loop (e.g. the
+    job worker or a test client).
+    """
+    global _db, _db_loop
+    loop = asyncio.get_running_loop()
+    if _db is None or _db_loop is not loop:
+        # Always talk to PostgREST with the project key, never a user session
+        _db = PooledPostgrestClient(
+            f"{SUPABASE_URL}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apiKey": SUPABASE_KEY,
+                "Authorization": f"Bearer {SUPABASE_KEY}",
+            },
+            timeout=DB_TIMEOUT,
+        )
+        _db_loop = loop
+    return _db
+
+
+def get_auth():
+    """
+    Get the shared async GoTrue client.
+
+    Only for calls scoped by a token, such as ``get_user(token)`` and
+    ``admin.sign_out(token)``, see ``new_auth`` for the others.
+    """
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = AsyncClient(SUPABASE_URL, SUPABASE_KEY)
+    return _auth_client.auth
+
+
+def new_auth() -> ASupabaseAuthClient:
+    """
+    Get a short-lived GoTrue client for one request.
+
+    Sign-in, code exchange, refresh and sign-out store the session, and the
+    OAuth URL the PKCE code verifier, on the client they are called on, so on
+    the shared client concurrent requests would act on each other's session.
+    Use as ``async with new_auth() as auth:`` to close it afterwards.
+    """
+    return ASupabaseAuthClient(
+        url=f"{SUPABASE_URL}/auth/v1",
+        headers={"apiKey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+        auto_refresh_token=False,
+        persist_session=False,
+        storage=AsyncMemoryStorage(),
+        flow_type="pkce",
+    )
+
+
+async def close_db() -> None:
+    """Close the connection pool, called on application shutdown"""
+    global _db, _db_loop
+    if _db is not None:
+        await _db.aclose()
+        _db = None
+        _db_loop = None
@@ -0,0 +1,71 @@
+"""
+Repository for the one-to-one generation tables of a project
+(BRD, PRD, market research, mockup and GitHub setup).
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from .client import get_db
+
+DOCUMENT_TABLES = ('brd', 'market_research', 'mockup', 'prd', 'github_setup')
+
+# Small columns always returned for each generation table
+DOCUMENT_COLUMNS = {
+    'brd': ('id', 'status', 'created_at', 'updated_at'),
+    'market_research': ('id', 'status', 'created_at', 'updated_at'),
+    'mockup': ('id', 'preview_url', 'tool_used', 'status', 'created_at', 'updated_at'),
+    'prd': ('id', 'status', 'created_at', 'updated_at'),
+    'github_setup': ('id', 'repository_url', 'status', 'created_at', 'updated_at'),
+}
+
+# Large generated content, only fetched when the caller asks for it
+DOCUMENT_CONTENT_COLUMNS = {
+    'brd': 'brd_markdown',
+    'market_research': 'report_markdown',
+    'prd': 'prd_markdown',
+}
+
+
+async def get_document(table: str, project_id: str, columns: str = '*') -> Optional[dict]:
+    """Get the generation record of a project"""
+    result = await get_db().table(table).select(columns).eq('project_id', project_id).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def create_document(table: str, project_id: str, status: str = 'in_progress') -> None:
+    """Create the generation record of a project"""
+    await get_db().table(table).insert({
+        'project_id': project_id,
+        'status': status
+    }).execute()
+
+
+async def update_document(table: str, project_id: str, data: dict) -> None:
+    """Update the generation record of a project"""
+    await get_db().table(table).update(data).eq('project_id', project_id).execute()
+
+
+async def set_document_status(table: str, project_id: str, status: str) -> None:
+    """Update only the generation status of a project record"""
+    await update_document(table, project_id, {'status': status})
+
+
+async def save_draft(table: str, project_id: str, content: str) -> None:
+    """Store the partial content of a document that is still being generated"""
+    await get_db().table('document_drafts').upsert({
+        'project_id': project_id,
+        'kind': table,
+        'content': content,
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }, on_conflict='project_id,kind').execute()
+
+
+async def get_draft(table: str, project_id: str) -> Optional[dict]:
+    """Get the partial content of a document that is being generated"""
+    result = await get_db().table('document_drafts').select('content,updated_at').eq('project_id', project_id).eq('kind', table).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def delete_draft(table: str, project_id: str) -> None:
+    """Drop the partial content once the document is saved"""
+    await get_db().table('document_drafts').delete().eq('project_id', project_id).eq('kind', table).execute()
@@ -0,0 +1,58 @@
+"""
+Project embedding repository.
+
+Wrappers over the similarity search functions in ``migrations/semantic_cache.sql``.
+Vectors are sent in pgvector's text format.
+"""
+from .client import get_db
+
+
+def _vector(embedding: list[float]) -> str:
+    return '[' + ','.join(str(float(x)) for x in embedding) + ']'
+
+
+async def save_project_embedding(project_id: str, model: str, embedding: list[float]) -> None:
+    """Store or replace the objective embedding of a project"""
+    await get_db().rpc('save_project_embedding', {
+        'p_project_id': project_id,
+        'p_model': model,
+        'p_embedding': _vector(embedding)
+    }).execute()
+
+
+async def match_similar_projects(
+    project_id: str,
+    model: str,
+    embedding: list[float],
+    kind: str,
+    threshold: float,
+    limit: int = 1,
+    shared: bool = False
+) -> list[dict]:
+    """
+    Store a project's embedding and find other projects with a similar one.
+
+    Args:
+        kind: Completed document to return, 'brd' or 'market_research'
+        threshold: Minimum cosine similarity
+        shared: Search every user's projects instead of only the owner's
+
+    Returns:
+        list[dict]: ``project_id``, ``similarity`` and ``content`` of the matches, most similar first
+    """
+    result = await get_db().rpc('match_similar_projects', {
+        'p_project_id': project_id,
+        'p_model': model,
+        'p_embedding': _vector(embedding),
+        'p_kind': kind,
+        'p_threshold': threshold,
+        'p_limit': limit,
+        'p_shared': shared
+    }).execute()
+    return result.data or []
+
+
+async def get_stats() -> dict:
+    """Stored embeddings and per-kind lookup, hit and search latency counters"""
+    result = await get_db().rpc('semantic_cache_stats', {}).execute()
+    return result.data[0] if result.data else {}
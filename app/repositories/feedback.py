@@ -0,0 +1,12 @@
+"""
+Feedback repository.
+"""
+from typing import Optional
+
+from .client import get_db
+
+
+async def create_feedback(data: dict) -> Optional[dict]:
+    """Insert feedback and return the created row"""
+    result = await get_db().table('feedback').insert(data).execute()
+    return result.data[0] if result.data else None
@@ -0,0 +1,105 @@
+"""
+AI job queue repository.
+
+Thin wrappers over the ``ai_jobs`` database functions, see
+``migrations/job_queue.sql`` for the claiming and lease rules.
+"""
+from typing import Optional
+
+from .client import get_db
+
+
+async def enqueue_job(job_type: str, project_id: str, payload: dict, max_attempts: int) -> Optional[str]:
+    """
+    Queue a job.
+
+    Returns:
+        Optional[str]: The job id, None if the same job is already queued or running
+    """
+    result = await get_db().rpc('enqueue_ai_job', {
+        'p_job_type': job_type,
+        'p_project_id': project_id,
+        'p_payload': payload,
+        'p_max_attempts': max_attempts
+    }).execute()
+    return result.data[0] if result.data else None
+
+
+async def get_pipeline(project_id: str) -> Optional[list[str]]:
+    """Get the pipeline stages of a project from its newest job that carries them, None without one"""
+    result = await (
+        get_db().table('ai_jobs').select('pipeline:payload->pipeline')
+        .eq('project_id', project_id)
+        .not_.is_('payload->pipeline', 'null')
+        .order('created_at', desc=True)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]['pipeline'] if result.data else None
+
+
+async def claim_jobs(worker_id: str, limit: int, lease_seconds: int) -> list[dict]:
+    """Lease up to ``limit`` ready jobs for a worker"""
+    result = await get_db().rpc('claim_ai_jobs', {
+        'p_worker': worker_id,
+        'p_limit': limit,
+        'p_lease_seconds': lease_seconds
+    }).execute()
+    return result.data or []
+
+
+async def heartbeat_job(job_id: str, worker_id: str, lease_seconds: int) -> bool:
+    """Extend a job lease, returns False if the worker lost the job"""
+    result = await get_db().rpc('heartbeat_ai_job', {
+        'p_job_id': job_id,
+        'p_worker': worker_id,
+        'p_lease_seconds': lease_seconds
+    }).execute()
+    return bool(result.data and result.data[0])
+
+
+async def complete_job(job_id: str, worker_id: str) -> bool:
+    """Mark a job completed, returns False if the worker lost the job"""
+    result = await get_db().rpc('complete_ai_job', {
+        'p_job_id': job_id,
+        'p_worker': worker_id
+    }).execute()
+    return bool(result.data and result.data[0])
+
+
+async def fail_job(job_id: str, worker_id: str, error: str, retry_delay: int) -> Optional[str]:
+    """
+    Record a failed attempt.
+
+    Returns:
+        Optional[str]: ``queued`` if the job will be retried, ``failed`` if it
+        ran out of attempts, None if the worker lost the job
+    """
+    result = await get_db().rpc('fail_ai_job', {
+        'p_job_id': job_id,
+        'p_worker': worker_id,
+        'p_error': error,
+        'p_retry_delay_seconds': retry_delay
+    }).execute()
+    return result.data[0] if result.data else None
+
+
+async def expire_jobs() -> list[dict]:
+    """Fail running jobs whose lease expired with no attempts left and return them"""
+    result = await get_db().rpc('expire_ai_jobs', {}).execute()
+    return result.data or []
+
+
+async def reap_stale_generations(stale_seconds: int, max_attempts: int) -> list[dict]:
+    """Recover in_progress generation rows that have no live job and return the recoveries"""
+    result = await get_db().rpc('reap_stale_generations', {
+        'p_stale_seconds': stale_seconds,
+        'p_max_attempts': max_attempts
+    }).execute()
+    return result.data or []
+
+
+async def get_metrics(since: str) -> dict:
+    """Queue and recovery counters, finished jobs and recoveries are counted from ``since``"""
+    result = await get_db().rpc('ai_job_metrics', {'p_since': since}).execute()
+    return result.data[0] if result.data else {}
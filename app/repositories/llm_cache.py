@@ -0,0 +1,35 @@
+"""
+LLM response cache repository.
+
+Wrappers over the cache functions in ``migrations/llm_response_cache.sql``.
+"""
+from typing import Optional
+
+from .client import get_db
+
+
+async def get_entry(key: str, model: str) -> Optional[str]:
+    """Get the cached response for a key, None when missing or expired"""
+    result = await get_db().rpc('get_llm_cache_entry', {
+        'p_key': key,
+        'p_model': model
+    }).execute()
+    return result.data[0] if result.data else None
+
+
+async def put_entry(key: str, model: str, content: str, ttl_seconds: int, max_bytes: int) -> int:
+    """Store a response, returns the number of entries evicted to stay within max_bytes"""
+    result = await get_db().rpc('put_llm_cache_entry', {
+        'p_key': key,
+        'p_model': model,
+        'p_content': content,
+        'p_ttl_seconds': ttl_seconds,
+        'p_max_bytes': max_bytes
+    }).execute()
+    return int(result.data[0]) if result.data else 0
+
+
+async def get_stats() -> dict:
+    """Entry count, stored bytes and per-model hit counters of the shared cache"""
+    result = await get_db().rpc('llm_cache_stats', {}).execute()
+    return result.data[0] if result.data else {}
@@ -0,0 +1,34 @@
+"""
+Shared LLM rate limit repository.
+
+Wrappers over the token bucket functions in ``migrations/llm_rate_limits.sql``.
+"""
+from .client import get_db
+
+
+async def take_capacity(key: str, requests_per_minute: int, tokens_per_minute: int, tokens: int) -> float:
+    """Take capacity for one call, returns 0 or the seconds to wait before asking again"""
+    result = await get_db().rpc('take_llm_capacity', {
+        'p_key': key,
+        'p_requests_per_minute': requests_per_minute,
+        'p_tokens_per_minute': tokens_per_minute,
+        'p_tokens': tokens
+    }).execute()
+    return float(result.data[0]) if result.data else 0.0
+
+
+async def settle_tokens(key: str, tokens_per_minute: int, tokens: int) -> None:
+    """Charge (or refund, when negative) the difference between estimated and real token usage"""
+    await get_db().rpc('settle_llm_tokens', {
+        'p_key': key,
+        'p_tokens_per_minute': tokens_per_minute,
+        'p_tokens': tokens
+    }).execute()
+
+
+async def block_key(key: str, seconds: float) -> None:
+    """Stop every process from calling the key for the given seconds"""
+    await get_db().rpc('block_llm_key', {
+        'p_key': key,
+        'p_seconds': seconds
+    }).execute()
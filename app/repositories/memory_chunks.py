@@ -0,0 +1,47 @@
+"""
+Memory chunk repository.
+
+Wrappers over the functions in ``migrations/memory_retrieval.sql``. Vectors
+are sent in pgvector's text format.
+"""
+from .client import get_db
+from .embeddings import _vector
+
+
+async def save_memory_chunks(memory_id: str, user_id: str, model: str, chunks: list[dict]) -> int:
+    """
+    Replace the chunks of a memory.
+
+    Args:
+        chunks: ``content``, ``tokens`` and ``embedding`` of each chunk, in order
+
+    Returns:
+        int: Chunks stored, 0 if the memory no longer exists
+    """
+    result = await get_db().rpc('save_memory_chunks', {
+        'p_memory_id': memory_id,
+        'p_user_id': user_id,
+        'p_model': model,
+        'p_chunks': [
+            {'content': chunk['content'], 'tokens': chunk['tokens'], 'embedding': _vector(chunk['embedding'])}
+            for chunk in chunks
+        ]
+    }).execute()
+    return result.data[0] if result.data else 0
+
+
+async def match_memory_chunks(user_id: str, model: str, embedding: list[float], limit: int) -> list[dict]:
+    """
+    Find the chunks of a user's memories most similar to an embedding.
+
+    Returns:
+        list[dict]: ``memory_id``, ``chunk_index``, ``content``, ``tokens``, ``similarity`` and
+        ``total_tokens`` (of all the user's chunks) of the matches, most similar first
+    """
+    result = await get_db().rpc('match_memory_chunks', {
+        'p_user_id': user_id,
+        'p_model': model,
+        'p_embedding': _vector(embedding),
+        'p_limit': limit
+    }).execute()
+    return result.data or []
@@ -0,0 +1,140 @@
+"""
+Project repository.
+"""
+from typing import Optional, Tuple
+
+from .client import get_db
+from .documents import DOCUMENT_TABLES, DOCUMENT_COLUMNS, DOCUMENT_CONTENT_COLUMNS
+
+PROJECT_COLUMNS = (
+    'id', 'user_id', 'name', 'objective', 'estimated_income', 'estimated_outcome',
+    'start_date', 'end_date', 'tasks_generation_status', 'created_at', 'updated_at',
+)
+
+# Large project columns a listing only returns on request
+LIST_CONTENT_FIELDS = ('tasks_generated',)
+
+# Large fields of a project detail that callers may skip
+DETAIL_CONTENT_FIELDS = ('tasks_generated', *DOCUMENT_CONTENT_COLUMNS.values())
+
+
+def detail_select(content_fields=DETAIL_CONTENT_FIELDS) -> str:
+    """
+    Build the embedded select for a project and its one-to-one generation records.
+
+    Args:
+        content_fields: Names from ``DETAIL_CONTENT_FIELDS`` to include
+
+    Returns:
+        str: A PostgREST select string such as ``id,...,brd(id,status,...)``
+    """
+    columns = list(PROJECT_COLUMNS)
+    if 'tasks_generated' in content_fields:
+        columns.append('tasks_generated')
+
+    for table in DOCUMENT_TABLES:
+        child = list(DOCUMENT_COLUMNS[table])
+        content = DOCUMENT_CONTENT_COLUMNS.get(table)
+        if content and content in content_fields:
+            child.append(content)
+        columns.append(f"{table}({','.join(child)})")
+
+    return ','.join(columns)
+
+
+# Select for the generation statuses of a project, tasks_generation_status plus each document's status
+STATUS_SELECT = ','.join(['id', 'tasks_generation_status', *(f"{table}(status)" for table in DOCUMENT_TABLES)])
+
+
+def flatten_statuses(row: dict) -> dict:
+    """Turn a ``STATUS_SELECT`` row into ``{'id', 'tasks', 'brd', ...}``, None for missing records"""
+    statuses = {'id': row['id'], 'tasks': row.get('tasks_generation_status')}
+    for table in DOCUMENT_TABLES:
+        statuses[table] = (row.get(table) or {}).get('status')
+    return statuses
+
+
+async def list_project_statuses(user_id: str) -> list[dict]:
+    """
+    Get the generation statuses of every project owned by a user in a single request.
+
+    Returns:
+        list[dict]: ``flatten_statuses`` rows, newest project first
+    """
+    result = await get_db().table('projects').select(STATUS_SELECT).eq('user_id', user_id).order('created_at', desc=True).order('id', desc=True).execute()
+    return [flatten_statuses(row) for row in result.data or []]
+
+
+async def create_project(data: dict) -> dict:
+    """Insert a project and return the created row"""
+    result = await get_db().table('projects').insert(data).execute()
+    return result.data[0]
+
+
+async def list_projects(
+    user_id: str,
+    columns: str = ','.join(PROJECT_COLUMNS),
+    limit: Optional[int] = None,
+    after: Optional[Tuple[str, str]] = None
+) -> list[dict]:
+    """
+    List projects owned by a user, newest first.
+
+    Args:
+        user_id: Owner of the projects
+        columns: PostgREST select string, ``created_at`` and ``id`` must be included when paginating
+        limit: Maximum number of rows to return, all rows when None
+        after: ``(created_at, id)`` of the last row of the previous page
+
+    Returns:
+        list[dict]: Project rows ordered by ``(created_at, id)`` descending
+    """
+    query = get_db().table('projects').select(columns).eq('user_id', user_id)
+
+    if after:
+        # Keyset condition (created_at, id) < (after_created_at, after_id)
+        created_at, row_id = after
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+
+    query = query.order('created_at', desc=True).order('id', desc=True)
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = await query.execute()
+    return result.data or []
+
+
+async def get_user_project(project_id: str, user_id: str, columns: str = '*') -> Optional[dict]:
+    """Get a project only if it is owned by the user"""
+    result = await get_db().table('projects').select(columns).eq('id', project_id).eq('user_id', user_id).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def get_user_project_detail(project_id: str, user_id: str, content_fields=DETAIL_CONTENT_FIELDS) -> Optional[dict]:
+    """
+    Get a project owned by the user together with its BRD, PRD, market research,
+    mockup and GitHub setup records in a single request.
+
+    The child tables reference ``projects`` through a unique foreign key, so
+    PostgREST embeds each of them as an object (or null when missing).
+    """
+    return await get_user_project(project_id, user_id, detail_select(content_fields))
+
+
+async def get_project(project_id: str, columns: str = '*') -> Optional[dict]:
+    """Get a project by id regardless of owner, for background jobs"""
+    result = await get_db().table('projects').select(columns).eq('id', project_id).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def update_project(project_id: str, data: dict) -> None:
+    """Update a project"""
+    await get_db().table('projects').update(data).eq('id', project_id).execute()
+
+
+async def delete_project(project_id: str) -> None:
+    """Delete a project, child rows are removed by cascade"""
+    await get_db().table('projects').delete().eq('id', project_id).execute()
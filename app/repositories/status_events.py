@@ -0,0 +1,27 @@
+"""
+Generation status event repository.
+
+Reads and prunes the events recorded by ``migrations/status_events.sql``.
+"""
+from typing import Optional
+
+from .client import get_db
+
+STATUS_EVENT_COLUMNS = 'id,user_id,project_id,kind,status,created_at'
+
+
+async def list_events(user_id: str, after_id: int, project_id: Optional[str] = None, limit: int = 500) -> list[dict]:
+    """Get a user's events recorded after an event id, oldest first"""
+    query = get_db().table('status_events').select(STATUS_EVENT_COLUMNS).eq('user_id', user_id).gt('id', after_id)
+    if project_id:
+        query = query.eq('project_id', project_id)
+    result = await query.order('id').limit(limit).execute()
+    return result.data or []
+
+
+async def prune_events(retention_seconds: int) -> int:
+    """Delete events older than the retention, returns how many were deleted"""
+    result = await get_db().rpc('prune_status_events', {
+        'p_retention_seconds': retention_seconds
+    }).execute()
+    return int(result.data[0]) if result.data else 0
@@ -0,0 +1,146 @@
+"""
+Task repository.
+"""
+from typing import Optional, Tuple
+
+from .client import get_db
+
+
+async def list_tasks(project_id: str, status: Optional[str] = None) -> list[dict]:
+    """
+    List tasks of a project ordered by rank, optionally filtered by status.
+
+    The stored position is only renumbered by bulk reorders, so each task's
+    position is its 1-based place in its status column by rank.
+    """
+    query = get_db().table('tasks').select('*').eq('project_id', project_id)
+    if status:
+        query = query.eq('status', status)
+    result = await query.order('rank').order('id').execute()
+    rows = result.data or []
+    counts: dict[str, int] = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+        row['position'] = counts[row['status']]
+    return rows
+
+
+async def get_rank_position(task: dict) -> int:
+    """1-based place of a task in its status column by rank, as ``list_tasks`` numbers it"""
+    result = await (
+        get_db().table('tasks').select('id', count='exact', head=True)
+        .eq('project_id', task['project_id'])
+        .eq('status', task['status'])
+        .or_(f"rank.lt.{task['rank']},and(rank.eq.{task['rank']},id.lt.{task['id']})")
+        .execute()
+    )
+    return (result.count or 0) + 1
+
+
+async def get_rank_bounds(
+    project_id: str,
+    status: str,
+    position: Optional[int] = None,
+    exclude_id: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Get the ranks a task must sort between to land at ``position`` in a status column.
+
+    Args:
+        project_id: Project of the column
+        status: Status of the column
+        position: 1-based target slot, the end of the column when None or past the end
+        exclude_id: Task being moved, left out so it does not count as its own neighbour
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: Ranks above and below the slot, None at the ends
+    """
+    query = get_db().table('tasks').select('rank').eq('project_id', project_id).eq('status', status)
+    if exclude_id:
+        query = query.neq('id', exclude_id)
+
+    if position is None:
+        result = await query.order('rank', desc=True).limit(1).execute()
+        return (result.data[0]['rank'] if result.data else None), None
+
+    # Read the neighbour above (if any) and the task currently in the slot
+    start = max(position - 2, 0)
+    end = position - 1
+    result = await query.order('rank').order('id').range(start, end).execute()
+    ranks = [row['rank'] for row in result.data or []]
+
+    if position <= 1:
+        return None, (ranks[0] if ranks else None)
+    if not ranks:
+        return await get_rank_bounds(project_id, status, None, exclude_id)
+    return ranks[0], (ranks[1] if len(ranks) > 1 else None)
+
+
+async def rebalance_ranks(project_id: str, status: str) -> None:
+    """Respace the ranks of a status column once its keys have grown too long"""
+    await get_db().rpc('rebalance_task_ranks', {
+        'p_project_id': project_id,
+        'p_status': status
+    }).execute()
+
+
+async def get_task(task_id: str, project_id: str, columns: str = '*') -> Optional[dict]:
+    """Get a task that belongs to the given project"""
+    result = await get_db().table('tasks').select(columns).eq('id', task_id).eq('project_id', project_id).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def create_task(data: dict) -> None:
+    """Insert a single task"""
+    await get_db().table('tasks').insert(data).execute()
+
+
+async def create_tasks(records: list[dict]) -> None:
+    """Insert many tasks in one request"""
+    await get_db().table('tasks').insert(records).execute()
+
+
+async def import_generated_tasks(project_id: str, records: list[dict]) -> int:
+    """
+    Insert generated tasks and mark the project's task generation completed
+    in one transaction with the ``import_generated_tasks`` database function.
+
+    Positions and ranks are assigned set-wise after any existing tasks, in the
+    order of ``records``, without running the per-row position trigger.
+
+    Returns:
+        int: Number of tasks inserted
+    """
+    result = await get_db().rpc('import_generated_tasks', {
+        'p_project_id': project_id,
+        'p_tasks': records
+    }).execute()
+    return result.data[0] if result.data else 0
+
+
+async def update_task(task_id: str, data: dict) -> None:
+    """Update a task"""
+    await get_db().table('tasks').update(data).eq('id', task_id).execute()
+
+
+async def delete_task(task_id: str) -> None:
+    """Delete a task"""
+    await get_db().table('tasks').delete().eq('id', task_id).execute()
+
+
+async def reorder_tasks(project_id: str, user_id: str, orders: list[dict]) -> Optional[int]:
+    """
+    Apply a whole ordering with the ``reorder_tasks`` database function.
+
+    Ownership is checked, positions are written and the touched statuses are
+    renumbered in one transaction.
+
+    Returns:
+        Optional[int]: Number of tasks moved, None if the project is not owned by the user
+    """
+    result = await get_db().rpc('reorder_tasks', {
+        'p_project_id': project_id,
+        'p_user_id': user_id,
+        'p_orders': orders
+    }).execute()
+    return result.data[0] if result.data else None
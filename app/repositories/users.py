@@ -0,0 +1,18 @@
+"""
+User repository.
+"""
+from typing import Optional
+
+from .client import get_db
+
+
+async def get_user(user_id: str, columns: str = '*') -> Optional[dict]:
+    """Get a user row"""
+    result = await get_db().table('users').select(columns).eq('id', user_id).maybe_single().execute()
+    return result.data if result and result.data else None
+
+
+async def update_user(user_id: str, data: dict) -> list[dict]:
+    """Update a user row and return the updated rows"""
+    result = await get_db().table('users').update(data).eq('id', user_id).execute()
+    return result.data or []
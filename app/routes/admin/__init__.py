@@ -1,3 +1,3 @@
-from . import auth
+from . import auth, cache, jobs
  
-__all__ = ['auth'] 
\ No newline at end of file
+__all__ = ['auth', 'cache', 'jobs'] 
\ No newline at end of file
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from ...middleware.auth import require_admin, invalidate_user_role, get_role_cache_stats
+from ...repositories import llm_cache, embeddings
+from ...services.response_cache import get_response_cache_stats
+from ...services.semantic_cache import get_semantic_cache_stats
+from ...services.memory_retrieval import get_memory_retrieval_stats
+from ...utils.error_handler import handle_exceptions
+
+router = APIRouter(
+    prefix="/cache",
+    tags=["admin-cache"]
+)
+
+@router.get("/stats")
+@handle_exceptions(status_code=500)
+async def cache_stats(user: dict = Depends(require_admin)):
+    """Get in-process cache and memory recall counters and the shared LLM response and semantic cache counters"""
+    return {
+        "role_cache": get_role_cache_stats(),
+        "llm_response_cache": {
+            "process": get_response_cache_stats(),
+            "shared": await llm_cache.get_stats()
+        },
+        "semantic_cache": {
+            "process": get_semantic_cache_stats(),
+            "shared": await embeddings.get_stats()
+        },
+        "memory_retrieval": {
+            "process": get_memory_retrieval_stats()
+        }
+    }
+
+@router.delete("/role/{user_id}")
+@handle_exceptions(status_code=500)
+async def invalidate_role(user_id: str, user: dict = Depends(require_admin)):
+    """Drop a user's cached role so the next request re-reads it"""
+    invalidated = invalidate_user_role(user_id)
+    return {"message": "Role cache invalidated", "invalidated": invalidated}
@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, Query
+from ...middleware.auth import require_admin
+from ...repositories import jobs
+from ...utils.error_handler import handle_exceptions
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["admin-jobs"]
+)
+
+@router.get("/metrics")
+@handle_exceptions(status_code=500)
+async def job_metrics(hours: int = Query(24, ge=1, le=720), user: dict = Depends(require_admin)):
+    """Get AI job queue counters and stale generation recoveries for the last `hours` hours"""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return await jobs.get_metrics(since.isoformat())
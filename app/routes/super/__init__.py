@@ -1,3 +1,3 @@
-from . import auth
+from . import auth, user
  
-__all__ = ['auth'] 
\ No newline at end of file
+__all__ = ['auth', 'user'] 
\ No newline at end of file
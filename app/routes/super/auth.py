@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request
-from ...config import supabase
+from ...repositories import get_auth, new_auth, users
 from ...models.user import User
 from ...utils.error_handler import handle_exceptions
 
@@ -13,15 +13,16 @@ router = APIRouter(
 async def super_login(username: str, password: str):
     """Super admin login with username and password"""
     # Sign in with email/password
-    auth_response = supabase.auth.sign_in_with_password({
-        "email": username,
-        "password": password
-    })
-    
+    async with new_auth() as auth:
+        auth_response = await auth.sign_in_with_password({
+            "email": username,
+            "password": password
+        })
+        user = await auth.get_user(auth_response.session.access_token)
+
     # Verify super admin role
-    user = supabase.auth.get_user(auth_response.session.access_token)
-    user_data = supabase.table('users').select('role').eq('id', user.user.id).single().execute()
-    if not user_data.data or user_data.data['role'] != 'super':
+    user_data = await users.get_user(user.user.id, 'role')
+    if not user_data or user_data['role'] != 'super':
         raise HTTPException(status_code=403, detail="Not authorized as super admin")
     
     return {
@@ -35,11 +36,12 @@ async def super_login(username: str, password: str):
 @handle_exceptions(status_code=400)
 async def refresh_token(refresh_token: str):
     """Refresh access token using refresh token"""
-    response = supabase.auth.refresh_session(refresh_token)
-    # Verify super admin role
-    user = supabase.auth.get_user(response.session.access_token)
-    user_data = supabase.table('users').select('role').eq('id', user.user.id).single().execute()
-    if not user_data.data or user_data.data['role'] != 'super':
+    async with new_auth() as auth:
+        response = await auth.refresh_session(refresh_token)
+        # Verify super admin role
+        user = await auth.get_user(response.session.access_token)
+    user_data = await users.get_user(user.user.id, 'role')
+    if not user_data or user_data['role'] != 'super':
         raise HTTPException(status_code=403, detail="Not authorized as super admin")
         
     return {
@@ -57,5 +59,6 @@ async def signout(request: Request):
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
     token = auth_header.split(' ')[1]
-    supabase.auth.sign_out(token)
+    # Revoke the session behind this access token
+    await get_auth().admin.sign_out(token)
     return {"message": "Successfully signed out"}
\ No newline at end of file
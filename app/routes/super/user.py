@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ...repositories import users
+from ...middleware.auth import require_super, invalidate_user_role
+from ...models.user import UserRoleUpdate
+from ...utils.error_handler import handle_exceptions
+
+router = APIRouter(
+    prefix="/user",
+    tags=["super-user"]
+)
+
+@router.patch("/{user_id}")
+@handle_exceptions(status_code=400)
+async def update_user_role(user_id: str, body: UserRoleUpdate, user: dict = Depends(require_super)):
+    """Change a user's role or ban flag"""
+    update_dict = body.model_dump(exclude_unset=True)
+    if not update_dict:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    updated = await users.update_user(user_id, update_dict)
+    if not updated:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Make the new role effective immediately instead of after the cache TTL
+    invalidate_user_role(user_id)
+
+    return {"message": "User updated successfully"}
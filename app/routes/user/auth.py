@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import RedirectResponse
-from ...config import supabase, FRONTEND_URL
+from ...config import FRONTEND_URL
+from ...repositories import new_auth, users
 from pydantic import BaseModel
 from ...utils.error_handler import handle_exceptions
 
@@ -20,17 +21,18 @@ router = APIRouter(
 @handle_exceptions(status_code=400)
 async def github_login():
     """Get GitHub OAuth login URL from Supabase"""
-    auth_url = supabase.auth.sign_in_with_oauth({
-        "provider": "github",
-        "options": {
-            "redirect_to": f"{FRONTEND_URL}/auth/callback/github",
-            "skip_http_redirect": True,  # Return URL instead of redirecting
-            "scopes": "user:email read:user openid"
-        }
-    })
-    code_verifier = supabase.auth._storage.get_item(
-        f"{supabase.auth._storage_key}-code-verifier"
-    )
+    async with new_auth() as auth:
+        auth_url = await auth.sign_in_with_oauth({
+            "provider": "github",
+            "options": {
+                "redirect_to": f"{FRONTEND_URL}/auth/callback/github",
+                "skip_http_redirect": True,  # Return URL instead of redirecting
+                "scopes": "user:email read:user openid"
+            }
+        })
+        code_verifier = await auth._storage.get_item(
+            f"{auth._storage_key}-code-verifier"
+        )
     return {
         "url": auth_url.url,
         "code_verifier": code_verifier
@@ -41,18 +43,19 @@ async def github_login():
 async def exchange_github_code(body: GitHubCodeExchange):
     """Exchange GitHub OAuth code for session"""
     # Exchange code for session
-    auth_response = supabase.auth.exchange_code_for_session({
-        "auth_code": body.code,
-        "code_verifier": body.code_verifier
-    })
-    
-    # Get user data including provider token (GitHub access token)
-    session = auth_response.session
-    user = supabase.auth.get_user(session.access_token)
+    async with new_auth() as auth:
+        auth_response = await auth.exchange_code_for_session({
+            "auth_code": body.code,
+            "code_verifier": body.code_verifier
+        })
+
+        # Get user data including provider token (GitHub access token)
+        session = auth_response.session
+        user = await auth.get_user(session.access_token)
     
     # Verify user role
-    user_data = supabase.table('users').select('role').eq('id', user.user.id).maybe_single().execute()
-    if not user_data or not user_data.data or user_data.data['role'] != 'user':
+    user_data = await users.get_user(user.user.id, 'role')
+    if not user_data or user_data['role'] != 'user':
         raise HTTPException(status_code=403, detail="Not authorized as user")
     
     # Store GitHub access token
@@ -71,11 +74,12 @@ async def exchange_github_code(body: GitHubCodeExchange):
 @handle_exceptions(status_code=400)
 async def refresh_token(body: RefreshTokenRequest):
     """Refresh access token using refresh token"""
-    response = supabase.auth.refresh_session(body.refresh_token)
-    # Verify user role
-    user = supabase.auth.get_user(response.session.access_token)
-    user_data = supabase.table('users').select('role').eq('id', user.user.id).maybe_single().execute()
-    if not user_data or not user_data.data or user_data.data['role'] != 'user':
+    async with new_auth() as auth:
+        response = await auth.refresh_session(body.refresh_token)
+        # Verify user role
+        user = await auth.get_user(response.session.access_token)
+    user_data = await users.get_user(user.user.id, 'role')
+    if not user_data or user_data['role'] != 'user':
         raise HTTPException(status_code=403, detail="Not authorized as user")
         
     return {
@@ -88,9 +92,10 @@ async def refresh_token(body: RefreshTokenRequest):
 @handle_exceptions(status_code=400)
 async def signout(body: RefreshTokenRequest):
     """Sign out user and invalidate session"""
-    # call refresh token
-    supabase.auth.refresh_session(body.refresh_token)
-    supabase.auth.sign_out({
-        "scope": "local"
-    })
+    # Sign out the session the refresh token belongs to, on a client of this request only
+    async with new_auth() as auth:
+        await auth.refresh_session(body.refresh_token)
+        await auth.sign_out({
+            "scope": "local"
+        })
     return {"message": "Successfully signed out"}
\ No newline at end of file
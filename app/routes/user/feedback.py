@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from ...config import supabase
+from ...repositories import feedback
 from ...middleware.auth import require_user
 from ...utils.error_handler import handle_exceptions
 from ...models import FeedbackCreate
@@ -16,16 +16,16 @@ async def create_feedback(feedback_data: FeedbackCreate, user: dict = Depends(re
     """
     try:
         # Insert into database
-        result = supabase.table('feedback').insert({
+        result = await feedback.create_feedback({
             "user_id": user['id'],
             "title": feedback_data.title,
             "content": feedback_data.content,
             "rating": feedback_data.rating
-        }).execute()
+        })
         
-        if not result.data:
+        if not result:
             raise HTTPException(status_code=500, detail="Failed to create feedback")
         
-        return {"message": "Feedback submitted successfully", "id": result.data[0]['id']}
+        return {"message": "Feedback submitted successfully", "id": result['id']}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting feedback: {str(e)}") 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
-from ...config import supabase
+from ...repositories import users
 from pydantic import BaseModel
 from ...middleware.auth import require_user
 from ...utils.error_handler import handle_exceptions
@@ -18,8 +18,8 @@ class UserInfo(BaseModel):
 async def get_current_user(user: dict = Depends(require_user)):
     """Get current user's basic information"""
     # Get user data from database
-    user_data = supabase.table('users').select('id,full_name,avatar_url').eq('id', user['id']).maybe_single().execute()
-    if not user_data or not user_data.data:
+    user_data = await users.get_user(user['id'], 'id,full_name,avatar_url')
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return user_data.data 
\ No newline at end of file
+    return user_data 
\ No newline at end of file
@@ -1,19 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import json
+import hashlib
+from typing import Optional, Literal
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 import httpx
 from ...middleware.auth import require_user
-from ...models.project import Project, ProjectCreate, ProjectUpdate, ProjectDetail
-from ...config import supabase
+from ...models.project import ProjectCreate, ProjectUpdate, ProjectDetail, ProjectSummary, ProjectStatus
+from ...repositories import projects, documents
 from ...utils.error_handler import handle_exceptions
-from ...utils.github_utils import get_github_token, validate_github_token
-from ...utils.background_tasks import (
-    generate_brd_background,
-    generate_prd_background,
-    generate_brd_and_prd_background,
-    generate_tasks_background,
-    validate_market_background,
-    setup_github_repository_background,
-    generate_preview_background
-)
+from ...utils.pagination import encode_cursor, decode_cursor
+from ...utils.github_utils import GITHUB_REQUIRED_SCOPES, get_github_token, has_github_access, validate_github_token
+from ...utils.job_queue import enqueue_job
+from ...utils.pipeline import start_pipeline, pipeline_payload
+from ...utils.streaming import tail_document
+from ...utils.status_events import status_hub, follow_status
+from ...config import PIPELINE_STAGES
 
 router = APIRouter(
     prefix="/project",
@@ -22,7 +23,11 @@ router = APIRouter(
 
 @router.post("")
 @handle_exceptions(status_code=400)
-async def create_project(project: ProjectCreate, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def create_project(
+    project: ProjectCreate,
+    draft: bool = Query(False, description="Reuse the BRD and market report of a project with a similar objective as is"),
+    user: dict = Depends(require_user)
+):
     """Create a new project"""
     # Convert project model to dict
     project_dict = project.model_dump()
@@ -40,63 +45,145 @@ async def create_project(project: ProjectCreate, background_tasks: BackgroundTas
         project_dict['end_date'] = project_dict['end_date'].isoformat()
     
     # Insert project with converted values
-    project_data = supabase.table('projects').insert({
+    project_data = await projects.create_project({
         **project_dict,
         'user_id': user['id']
-    }).execute()
-
-    # Get the created project's Data from the response
-    project_datas =  project_data.data[0]
-    project_id = project_datas['id']
-
-
-    # Initialize background tasks for BRD generation and PRD generation
-    # Initialize BRD record
-    supabase.table('brd').insert({
-        'project_id': project_id,
-        'status': 'in_progress'
-    }).execute()
-
-    # Initialize PRD record 
-    supabase.table('prd').insert({
-        'project_id': project_id,
-        'status': 'in_progress'
-    }).execute()
-
-    # Add background tasks
-    background_tasks.add_task(
-        generate_brd_and_prd_background,
-        project_id,
-        project_data.data[0]
-    )
+    })
+
+    # Get the created project's ID from the response
+    project_id = project_data['id']
+
+
+    # Start every generation stage as soon as its inputs are ready, the GitHub
+    # repository is only set up for users who connected an account with the scopes it needs
+    stages = PIPELINE_STAGES
+    if 'github_setup' in stages and not await has_github_access(user['id']):
+        stages = [stage for stage in stages if stage != 'github_setup']
+    await start_pipeline(project_id, stages, draft)
 
-    
     return {"message": "Project created successfully"}
 
-@router.get("", response_model=list[Project])
+@router.get("", response_model=list[ProjectSummary], response_model_exclude_unset=True)
+@handle_exceptions(status_code=500)
+async def list_projects(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of projects to return"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    include: Optional[str] = Query(None, description="Comma-separated large columns to include (tasks_generated)"),
+    user: dict = Depends(require_user)
+):
+    """List projects for current user, newest first, one page at a time"""
+    # Resolve the keyset position of the previous page
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Only fetch the large columns the caller asked for
+    columns = list(projects.PROJECT_COLUMNS)
+    if include:
+        requested = {field.strip() for field in include.split(',') if field.strip()}
+        unknown = requested - set(projects.LIST_CONTENT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+        columns += [field for field in projects.LIST_CONTENT_FIELDS if field in requested]
+
+    # Fetch one extra row to know whether another page exists
+    rows = await projects.list_projects(user['id'], ','.join(columns), limit + 1, after)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers['X-Next-Cursor'] = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+    return rows  # Empty list if no projects
+
+@router.get("/status", response_model=list[ProjectStatus])
 @handle_exceptions(status_code=500)
-async def list_projects(user: dict = Depends(require_user)):
-    """List all projects for current user"""
-    projects = supabase.table('projects').select('*').eq('user_id', user['id']).execute()
-    return projects.data or []  # Return empty list if no projects
+async def list_project_statuses(request: Request, response: Response, user: dict = Depends(require_user)):
+    """Generation statuses of all of the user's projects, 304 when unchanged since the given ETag"""
+    statuses = await projects.list_project_statuses(user['id'])
+
+    # Weak ETag over the statuses, dashboards polling an unchanged state get no body
+    digest = hashlib.sha1(json.dumps(statuses, sort_keys=True, default=str).encode()).hexdigest()
+    etag = f'W/"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if '*' in tags or etag.removeprefix('W/') in tags:
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return statuses
 
-@router.get("/{project_id}", response_model=ProjectDetail)
+def _status_stream(user_id: str, project_id: Optional[str], last_event_id: Optional[str]) -> StreamingResponse:
+    if not status_hub.enabled:
+        raise HTTPException(status_code=503, detail="Status events are not configured")
+    try:
+        after = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    return StreamingResponse(
+        follow_status(user_id, project_id, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/events")
 @handle_exceptions(status_code=500)
-async def get_project(project_id: str, user: dict = Depends(require_user)):
-    """Get a specific project with BRD, market research, mockup, PRD, and GitHub setup"""
-    # Get project data
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    
-    if not project or not project.data:
+async def stream_status_events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    user: dict = Depends(require_user)
+):
+    """Generation status changes of all of the user's projects, as Server-Sent Events"""
+    return _status_stream(user['id'], None, last_event_id)
+
+@router.get("/{project_id}/events")
+@handle_exceptions(status_code=500)
+async def stream_project_status_events(
+    project_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    user: dict = Depends(require_user)
+):
+    """Generation status changes of one project, as Server-Sent Events"""
+    # Verify project ownership
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Get related data
-    related_tables = ['brd', 'market_research', 'mockup', 'prd', 'github_setup']
-    project_detail = project.data
+    return _status_stream(user['id'], project_id, last_event_id)
+
+@router.get("/{project_id}", response_model=ProjectDetail, response_model_exclude_unset=True)
+@handle_exceptions(status_code=500)
+async def get_project(
+    project_id: str,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated large fields to include "
+                    "(tasks_generated, brd_markdown, prd_markdown, report_markdown). "
+                    "Omit for all of them, pass an empty value for statuses only."
+    ),
+    user: dict = Depends(require_user)
+):
+    """Get a specific project with BRD, market research, mockup, PRD, and GitHub setup"""
+    # Resolve which large fields to fetch
+    if fields is None:
+        content_fields = projects.DETAIL_CONTENT_FIELDS
+    else:
+        content_fields = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = content_fields - set(projects.DETAIL_CONTENT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # Get project data and related records in one query
+    project_detail = await projects.get_user_project_detail(project_id, user['id'], content_fields)
 
-    for table in related_tables:
-        result = supabase.table(table).select('*').eq('project_id', project_id).maybe_single().execute()
-        project_detail[table] = result.data if result and result.data else None
+    if not project_detail:
+        raise HTTPException(status_code=404, detail="Project not found")
 
     return project_detail
 
@@ -105,10 +192,10 @@ async def get_project(project_id: str, user: dict = Depends(require_user)):
 async def update_project(project_id: str, project_update: ProjectUpdate, user: dict = Depends(require_user)):
     """Update a project"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
+    project = await projects.get_user_project(project_id, user['id'], 'id')
     
-    # Handle both None response and empty data cases
-    if not project or not project.data:
+    # Handle missing or not owned project
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Convert project model to dict with only set values
@@ -127,7 +214,7 @@ async def update_project(project_id: str, project_update: ProjectUpdate, user: d
         update_dict['end_date'] = update_dict['end_date'].isoformat()
     
     # Update project with converted values
-    supabase.table('projects').update(update_dict).eq('id', project_id).execute()
+    await projects.update_project(project_id, update_dict)
     
     return {"message": "Project updated successfully"}
 
@@ -136,49 +223,70 @@ async def update_project(project_id: str, project_update: ProjectUpdate, user: d
 async def delete_project(project_id: str, user: dict = Depends(require_user)):
     """Delete a project"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
+    project = await projects.get_user_project(project_id, user['id'], 'id')
     
-    # Handle both None response and empty data cases
-    if not project or not project.data:
+    # Handle missing or not owned project
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Delete project
-    supabase.table('projects').delete().eq('id', project_id).execute()
+    await projects.delete_project(project_id)
     return {"message": "Project deleted successfully"}
 
+@router.get("/{project_id}/{kind}/stream")
+@handle_exceptions(status_code=500)
+async def stream_document(
+    project_id: str,
+    kind: Literal['brd', 'prd', 'market_research'],
+    user: dict = Depends(require_user)
+):
+    """Stream a BRD, PRD or market report while it is generated, as Server-Sent Events"""
+    # Verify project ownership
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return StreamingResponse(
+        tail_document(kind, project_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/{project_id}/generate-brd")
 @handle_exceptions(status_code=500)
-async def generate_brd(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def generate_brd(
+    project_id: str,
+    use_cache: bool = Query(True, description="Set to false to regenerate instead of reusing a response cached for the same input"),
+    draft: bool = Query(False, description="Reuse the document of a project with a similar objective as is, when there is one"),
+    user: dict = Depends(require_user)
+):
     """Generate BRD (Business Requirements Document) for project"""
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if BRD record exists
-    brd_record = supabase.table('brd').select('*').eq('project_id', project_id).maybe_single().execute()
+    brd_record = await documents.get_document('brd', project_id)
     
-    # If BRD already exists and is not failed, return the existing content
-    if brd_record and brd_record.data['status'] != 'failed':
+    # If BRD already exists and has started, return the existing content
+    if brd_record and brd_record['status'] not in ('failed', 'not_started'):
         return {
-            "message": f"BRD exists with status: {brd_record.data['status']}",
-            "content": brd_record.data.get('brd_markdown', None),
-            "status": brd_record.data['status']
+            "message": f"BRD exists with status: {brd_record['status']}",
+            "content": brd_record.get('brd_markdown', None),
+            "status": brd_record['status']
         }
     
-    # Create new record or update failed record to in_progress
+    # Create new record or move a failed or not started record to in_progress
     if not brd_record:
         # Create a new BRD record with status 'in_progress'
-        supabase.table('brd').insert({
-            'project_id': project_id,
-            'status': 'in_progress'
-        }).execute()
+        await documents.create_document('brd', project_id)
     else:
         # Update the status to 'in_progress'
-        supabase.table('brd').update({'status': 'in_progress'}).eq('project_id', project_id).execute()
+        await documents.set_document_status('brd', project_id, 'in_progress')
     
-    # Add the background task
-    background_tasks.add_task(generate_brd_background, project_id, project.data)
+    # Queue the generation job
+    await enqueue_job('brd', project_id, use_cache=use_cache, draft=draft, **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -189,48 +297,44 @@ async def generate_brd(project_id: str, background_tasks: BackgroundTasks, user:
 
 @router.post("/{project_id}/generate-prd")
 @handle_exceptions(status_code=500)
-async def generate_prd(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def generate_prd(
+    project_id: str,
+    use_cache: bool = Query(True, description="Set to false to regenerate instead of reusing a response cached for the same input"),
+    user: dict = Depends(require_user)
+):
     """Generate PRD (Product Requirements Document) for project"""
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if PRD record exists
-    prd_record = supabase.table('prd').select('*').eq('project_id', project_id).maybe_single().execute()
+    prd_record = await documents.get_document('prd', project_id)
     
-    # If PRD already exists and is not failed, return the existing content
-    if prd_record and prd_record.data['status'] != 'failed':
+    # If PRD already exists and has started, return the existing content
+    if prd_record and prd_record['status'] not in ('failed', 'not_started'):
         return {
-            "message": f"PRD exists with status: {prd_record.data['status']}",
-            "content": prd_record.data.get('prd_markdown', None),
-            "status": prd_record.data['status']
+            "message": f"PRD exists with status: {prd_record['status']}",
+            "content": prd_record.get('prd_markdown', None),
+            "status": prd_record['status']
         }
     
     # Check BRD status - PRD can only be generated if BRD is completed
-    brd_record = supabase.table('brd').select('*').eq('project_id', project_id).maybe_single().execute()
+    brd_record = await documents.get_document('brd', project_id)
     
-    if not brd_record or brd_record.data['status'] != 'completed':
+    if not brd_record or brd_record['status'] != 'completed':
         raise HTTPException(status_code=400, detail="BRD must be completed before generating PRD")
     
-    # Create new record or update failed record to in_progress
+    # Create new record or move a failed or not started record to in_progress
     if not prd_record:
         # Create a new PRD record with status 'in_progress'
-        supabase.table('prd').insert({
-            'project_id': project_id,
-            'status': 'in_progress'
-        }).execute()
+        await documents.create_document('prd', project_id)
     else:
         # Update the status to 'in_progress'
-        supabase.table('prd').update({'status': 'in_progress'}).eq('project_id', project_id).execute()
-    
-    # Add the background task
-    background_tasks.add_task(
-        generate_prd_background, 
-        project_id, 
-        brd_record.data['brd_markdown'], 
-        project.data['name']
-    )
+        await documents.set_document_status('prd', project_id, 'in_progress')
+    
+    # Queue the generation job
+    await enqueue_job('prd', project_id, use_cache=use_cache, **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -241,21 +345,25 @@ async def generate_prd(project_id: str, background_tasks: BackgroundTasks, user:
 
 @router.post("/{project_id}/generate-scope")
 @handle_exceptions(status_code=500)
-async def generate_project_scope(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def generate_project_scope(
+    project_id: str,
+    use_cache: bool = Query(True, description="Set to false to regenerate instead of reusing a response cached for the same input"),
+    user: dict = Depends(require_user)
+):
     """Generate project scope (tasks) using AI"""
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check task generation status
-    task_status = project.data.get('tasks_generation_status', 'not_started')
+    task_status = project.get('tasks_generation_status', 'not_started')
     
     # If already in progress or completed, return status
     if task_status != 'failed' and task_status != 'not_started':
         # If completed, return the tasks_generated
-        if task_status == 'completed' and project.data.get('tasks_generated'):
-            raw_tasks = project.data.get('tasks_generated')
+        if task_status == 'completed' and project.get('tasks_generated'):
+            raw_tasks = project.get('tasks_generated')
             task_count = len(raw_tasks) if raw_tasks else 0
             
             return {
@@ -274,22 +382,18 @@ async def generate_project_scope(project_id: str, background_tasks: BackgroundTa
         }
     
     # Check PRD status - Tasks can only be generated if PRD is completed
-    prd_record = supabase.table('prd').select('*').eq('project_id', project_id).maybe_single().execute()
+    prd_record = await documents.get_document('prd', project_id)
     
-    if not prd_record or prd_record.data['status'] != 'completed':
+    if not prd_record or prd_record['status'] != 'completed':
         raise HTTPException(status_code=400, detail="PRD must be completed before generating tasks")
     
     # Set task generation status to in_progress in the projects table
-    supabase.table('projects').update({
+    await projects.update_project(project_id, {
         'tasks_generation_status': 'in_progress'
-    }).eq('id', project_id).execute()
+    })
     
-    # Add the background task
-    background_tasks.add_task(
-        generate_tasks_background, 
-        project_id, 
-        prd_record.data['prd_markdown']
-    )
+    # Queue the generation job
+    await enqueue_job('tasks', project_id, use_cache=use_cache, **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -301,41 +405,39 @@ async def generate_project_scope(project_id: str, background_tasks: BackgroundTa
 
 @router.post("/{project_id}/validate-market")
 @handle_exceptions(status_code=500)
-async def validate_market_fit(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def validate_market_fit(
+    project_id: str,
+    use_cache: bool = Query(True, description="Set to false to skip the lookup of a similar project's report"),
+    draft: bool = Query(False, description="Reuse the document of a project with a similar objective as is, when there is one"),
+    user: dict = Depends(require_user)
+):
     """Validate market fit using AI analysis"""
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if market research record exists
-    market_record = supabase.table('market_research').select('*').eq('project_id', project_id).maybe_single().execute()
+    market_record = await documents.get_document('market_research', project_id)
     
-    # If market research already exists and is not failed, return the existing content
-    if market_record and market_record.data['status'] != 'failed':
+    # If market research already exists and has started, return the existing content
+    if market_record and market_record['status'] not in ('failed', 'not_started'):
         return {
-            "message": f"Market validation exists with status: {market_record.data['status']}",
-            "content": market_record.data.get('report_markdown', None),
-            "status": market_record.data['status']
+            "message": f"Market validation exists with status: {market_record['status']}",
+            "content": market_record.get('report_markdown', None),
+            "status": market_record['status']
         }
     
-    # Create new record or update failed record to in_progress
+    # Create new record or move a failed or not started record to in_progress
     if not market_record:
         # Create a new market research record with status 'in_progress'
-        supabase.table('market_research').insert({
-            'project_id': project_id,
-            'status': 'in_progress'
-        }).execute()
+        await documents.create_document('market_research', project_id)
     else:
         # Update the status to 'in_progress'
-        supabase.table('market_research').update({'status': 'in_progress'}).eq('project_id', project_id).execute()
+        await documents.set_document_status('market_research', project_id, 'in_progress')
     
-    # Add the background task
-    background_tasks.add_task(
-        validate_market_background, 
-        project_id, 
-        project.data['objective']
-    )
+    # Queue the validation job
+    await enqueue_job('market_validation', project_id, use_cache=use_cache, draft=draft, **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -346,63 +448,55 @@ async def validate_market_fit(project_id: str, background_tasks: BackgroundTasks
 
 @router.post("/{project_id}/setup-repository")
 @handle_exceptions(status_code=500)
-async def setup_project_repository(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def setup_project_repository(project_id: str, user: dict = Depends(require_user)):
     """Setup GitHub repository for project"""
     # Get github access token from user
-    github_access_token = get_github_token(user['id'])
+    github_access_token = await get_github_token(user['id'])
     
     if not github_access_token:
         raise HTTPException(status_code=400, detail="You need to connect your GitHub account to use this feature")
     
     # Validate token and check required scopes
-    required_scopes = {'repo', 'admin:repo_hook', 'read:user', 'user:email'}
-    user_infos = validate_github_token(github_access_token, required_scopes)
+    user_infos = await validate_github_token(github_access_token, GITHUB_REQUIRED_SCOPES)
     
     # Get github username
     github_username = user_infos.get('login')
 
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if GitHub setup record exists
-    github_record = supabase.table('github_setup').select('*').eq('project_id', project_id).maybe_single().execute()
+    github_record = await documents.get_document('github_setup', project_id)
     
-    # If setup already exists and is not failed, return the existing content
-    if github_record and github_record.data['status'] != 'failed':
+    # If setup already exists and has started, return the existing content
+    if github_record and github_record['status'] not in ('failed', 'not_started'):
         return {
-            "message": f"GitHub setup exists with status: {github_record.data['status']}",
-            "repository_url": github_record.data.get('repository_url', None),
-            "status": github_record.data['status']
+            "message": f"GitHub setup exists with status: {github_record['status']}",
+            "repository_url": github_record.get('repository_url', None),
+            "status": github_record['status']
         }
     
     # Check PRD and tasks status - Repository can only be set up if PRD is completed and tasks are generated
-    prd_record = supabase.table('prd').select('*').eq('project_id', project_id).maybe_single().execute()
+    prd_record = await documents.get_document('prd', project_id)
     
-    if not prd_record or prd_record.data['status'] != 'completed':
+    if not prd_record or prd_record['status'] != 'completed':
         raise HTTPException(status_code=400, detail="PRD must be completed before setting up repository")
         
-    if project.data.get('tasks_generation_status') != 'completed':
+    if project.get('tasks_generation_status') != 'completed':
         raise HTTPException(status_code=400, detail="Tasks must be generated before setting up repository")
     
-    # Create new record or update failed record to in_progress
+    # Create new record or move a failed or not started record to in_progress
     if not github_record:
         # Create a new GitHub setup record with status 'in_progress'
-        supabase.table('github_setup').insert({
-            'project_id': project_id,
-            'status': 'in_progress'
-        }).execute()
+        await documents.create_document('github_setup', project_id)
     else:
         # Update the status to 'in_progress'
-        supabase.table('github_setup').update({'status': 'in_progress'}).eq('project_id', project_id).execute()
+        await documents.set_document_status('github_setup', project_id, 'in_progress')
     
-    # Add the background task
-    background_tasks.add_task(
-        setup_github_repository_background,
-        project_id,
-        github_access_token
-    )
+    # Queue the setup job, the worker looks the token up again when it runs
+    await enqueue_job('github_setup', project_id, user_id=user['id'], **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -413,44 +507,41 @@ async def setup_project_repository(project_id: str, background_tasks: Background
 
 @router.post("/{project_id}/generate-preview")
 @handle_exceptions(status_code=500)
-async def generate_project_preview(project_id: str, background_tasks: BackgroundTasks, user: dict = Depends(require_user)):
+async def generate_project_preview(project_id: str, user: dict = Depends(require_user)):
     """Generate project preview/mockup using Lovable"""
     # Verify project ownership
-    project = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'])
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if mockup record exists
-    mockup_record = supabase.table('mockup').select('*').eq('project_id', project_id).maybe_single().execute()
+    mockup_record = await documents.get_document('mockup', project_id)
     
-    # If mockup already exists and is not failed, return the existing content
-    if mockup_record and mockup_record.data['status'] != 'failed':
+    # If mockup already exists and has started, return the existing content
+    if mockup_record and mockup_record['status'] not in ('failed', 'not_started'):
         return {
-            "message": f"Preview exists with status: {mockup_record.data['status']}",
-            "preview_url": mockup_record.data.get('preview_url', None),
-            "tool_used": mockup_record.data.get('tool_used', None),
-            "status": mockup_record.data['status']
+            "message": f"Preview exists with status: {mockup_record['status']}",
+            "preview_url": mockup_record.get('preview_url', None),
+            "tool_used": mockup_record.get('tool_used', None),
+            "status": mockup_record['status']
         }
     
     # Check BRD status - Preview can only be generated if BRD is completed
-    brd_record = supabase.table('brd').select('*').eq('project_id', project_id).maybe_single().execute()
+    brd_record = await documents.get_document('brd', project_id)
     
-    if not brd_record or brd_record.data['status'] != 'completed':
+    if not brd_record or brd_record['status'] != 'completed':
         raise HTTPException(status_code=400, detail="BRD must be completed before generating preview")
     
-    # Create new record or update failed record to in_progress
+    # Create new record or move a failed or not started record to in_progress
     if not mockup_record:
         # Create a new mockup record with status 'in_progress'
-        supabase.table('mockup').insert({
-            'project_id': project_id,
-            'status': 'in_progress'
-        }).execute()
+        await documents.create_document('mockup', project_id)
     else:
         # Update the status to 'in_progress'
-        supabase.table('mockup').update({'status': 'in_progress'}).eq('project_id', project_id).execute()
+        await documents.set_document_status('mockup', project_id, 'in_progress')
     
-    # Add the background task
-    background_tasks.add_task(generate_preview_background, project_id)
+    # Queue the generation job
+    await enqueue_job('preview', project_id, **await pipeline_payload(project_id))
     
     # Return immediately with in_progress status
     return {
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from ...config import supabase, FRONTEND_URL
+from ...config import FRONTEND_URL
+from ...repositories import new_auth, users
 from ...middleware.auth import require_user
 from ...utils.error_handler import handle_exceptions
-from ...utils.github_utils import get_github_token, validate_github_token
+from ...utils.github_utils import GITHUB_REQUIRED_SCOPES, get_github_token, validate_github_token
 
 class GitHubCodeExchange(BaseModel):
     code: str
@@ -19,13 +20,12 @@ router = APIRouter(
 async def github_connect(user: dict = Depends(require_user)):
     """Get GitHub OAuth login URL from Supabase for connecting GitHub account"""
     # Check if user already has valid GitHub token with required permissions
-    github_token = get_github_token(user['id'])
-    required_scopes = {'repo', 'admin:repo_hook', 'read:user', 'user:email'}
+    github_token = await get_github_token(user['id'])
     
     if github_token:
         try:
             # Raise an exception if token is invalid or missing required scopes
-            validate_github_token(github_token, required_scopes)
+            await validate_github_token(github_token, GITHUB_REQUIRED_SCOPES)
             raise HTTPException(
                 status_code=400,
                 detail="GitHub account is already connected with required permissions"
@@ -37,18 +37,19 @@ async def github_connect(user: dict = Depends(require_user)):
                 raise e
 
     # Get new GitHub OAuth URL
-    auth_url = supabase.auth.sign_in_with_oauth({
-        "provider": "github",
-        "options": {
-            "redirect_to": f"{FRONTEND_URL}/setting/github/callback",
-            "skip_http_redirect": True,
-            "scopes": "user:email read:user openid repo admin:repo_hook"
-        }
-    })
+    async with new_auth() as auth:
+        auth_url = await auth.sign_in_with_oauth({
+            "provider": "github",
+            "options": {
+                "redirect_to": f"{FRONTEND_URL}/setting/github/callback",
+                "skip_http_redirect": True,
+                "scopes": "user:email read:user openid repo admin:repo_hook"
+            }
+        })
 
-    code_verifier = supabase.auth._storage.get_item(
-        f"{supabase.auth._storage_key}-code-verifier"
-    )
+        code_verifier = await auth._storage.get_item(
+            f"{auth._storage_key}-code-verifier"
+        )
 
     return {
         "url": auth_url.url,
@@ -59,26 +60,25 @@ async def github_connect(user: dict = Depends(require_user)):
 @handle_exceptions(status_code=400)
 async def github_verify(body: GitHubCodeExchange, user: dict = Depends(require_user)):
     """Exchange GitHub OAuth code and store access token in the database"""
-    # Exchange code for session
-    auth_response = supabase.auth.exchange_code_for_session({
-        "auth_code": body.code,
-        "code_verifier": body.code_verifier,
-    })
-    
-    # Get provider token (GitHub access token)
-    session = auth_response.session
-    
+    # Exchange code for session, on a client of this request only
+    async with new_auth() as auth:
+        auth_response = await auth.exchange_code_for_session({
+            "auth_code": body.code,
+            "code_verifier": body.code_verifier,
+        })
 
-    # make this user sign out
-    supabase.auth.refresh_session(session.refresh_token)
-    supabase.auth.sign_out({
-        "scope": "local"
-    })
+        # Get provider token (GitHub access token)
+        session = auth_response.session
+
+        # Only the provider token is kept, sign out the session the exchange created
+        await auth.sign_out({
+            "scope": "local"
+        })
 
     # Store GitHub access token
-    supabase.table('users').update({
+    await users.update_user(user['id'], {
         'github_access_token': session.provider_token
-    }).eq('id', user['id']).execute()
+    })
     
     return {
         "message": "GitHub access token successfully stored"
@@ -1,29 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
+from postgrest.exceptions import APIError
 from ...middleware.auth import require_user
-from ...models.task import Task, TaskCreate, TaskUpdate, TaskStatus
-from ...config import supabase
+from ...models.task import Task, TaskCreate, TaskUpdate, TaskStatus, TaskOrder
+from ...repositories import projects, tasks
 from ...utils.error_handler import handle_exceptions
+from ...utils.ranking import rank_between, needs_rebalance
 
 router = APIRouter(
     prefix="/task",
     tags=["user-task"]
 )
 
+async def _rank_for_slot(project_id: str, status: str, position: Optional[int], task_id: Optional[str] = None) -> str:
+    """Get a rank that places a task at ``position`` (or last) in a status column"""
+    lower, upper = await tasks.get_rank_bounds(project_id, status, position, task_id)
+    try:
+        return rank_between(lower, upper)
+    except ValueError:
+        # Neighbours share a rank (concurrent moves), respace the column and retry
+        await tasks.rebalance_ranks(project_id, status)
+        lower, upper = await tasks.get_rank_bounds(project_id, status, position, task_id)
+        return rank_between(lower, upper)
+
 @router.post("/{project_id}")
 @handle_exceptions(status_code=400)
 async def create_task(project_id: str, task: TaskCreate, user: dict = Depends(require_user)):
     """Create a new task in a project"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    # Rank the task into its slot, position is assigned by the database
+    task_dict = task.model_dump(mode='json')
+    position = task_dict.pop('position')
+    task_dict['rank'] = await _rank_for_slot(project_id, task_dict['status'], position)
+
     # Create task
-    supabase.table('tasks').insert({
-        **task.model_dump(),
+    await tasks.create_task({
+        **task_dict,
         'project_id': project_id
-    }).execute()
+    })
+
+    if needs_rebalance(task_dict['rank']):
+        await tasks.rebalance_ranks(project_id, task_dict['status'])
     
     return {"message": "Task created successfully"}
 
@@ -36,34 +57,55 @@ async def list_tasks(
 ):
     """List all tasks in a project"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Build query
-    query = supabase.table('tasks').select('*').eq('project_id', project_id)
-    if status:
-        query = query.eq('status', status)
-    
-    # Execute query
-    tasks = query.order('position').execute()
-    return tasks.data or []  # Return empty list if no tasks
+    # Empty list if no tasks
+    return await tasks.list_tasks(project_id, status)
+
+# Declared before /{project_id}/{task_id} so "reorder" is not taken as a task id
+@router.patch("/{project_id}/reorder")
+@handle_exceptions(status_code=500)
+async def reorder_tasks(
+    project_id: str,
+    task_orders: list[TaskOrder],
+    user: dict = Depends(require_user)
+):
+    """Reorder tasks in a project"""
+    orders = [order.model_dump(mode='json', exclude_none=True) for order in task_orders]
+
+    # Verify ownership and apply the whole ordering in one database call
+    try:
+        moved = await tasks.reorder_tasks(project_id, user['id'], orders)
+    except APIError as e:
+        # invalid_parameter_value: a task id is unknown, foreign or duplicated
+        if e.code == '22023':
+            raise HTTPException(status_code=400, detail=e.message)
+        raise
+
+    if moved is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return {"message": "Tasks reordered successfully"}
 
 @router.get("/{project_id}/{task_id}", response_model=Task)
 @handle_exceptions(status_code=500)
 async def get_task(project_id: str, task_id: str, user: dict = Depends(require_user)):
     """Get a specific task"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Get task
-    task = supabase.table('tasks').select('*').eq('id', task_id).eq('project_id', project_id).maybe_single().execute()
-    if not task or not task.data:
+    task = await tasks.get_task(task_id, project_id)
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    return task.data
+
+    # The stored position goes stale after rank moves, report the rank order instead
+    task['position'] = await tasks.get_rank_position(task)
+    return task
 
 @router.patch("/{project_id}/{task_id}")
 @handle_exceptions(status_code=500)
@@ -75,19 +117,30 @@ async def update_task(
 ):
     """Update a task"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Verify task exists
-    task = supabase.table('tasks').select('id').eq('id', task_id).eq('project_id', project_id).maybe_single().execute()
-    if not task or not task.data:
+    task = await tasks.get_task(task_id, project_id, 'id,status')
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    update_dict = task_update.model_dump(mode='json', exclude_unset=True)
+
+    # A move only rewrites this task's rank, siblings are left untouched
+    status = update_dict.get('status') or task['status']
+    moved = 'position' in update_dict or status != task['status']
+    if moved:
+        position = update_dict.pop('position', None)
+        update_dict['status'] = status
+        update_dict['rank'] = await _rank_for_slot(project_id, status, position, task_id)
+
     # Update task
-    supabase.table('tasks').update(
-        task_update.model_dump(exclude_unset=True)
-    ).eq('id', task_id).execute()
+    await tasks.update_task(task_id, update_dict)
+
+    if moved and needs_rebalance(update_dict['rank']):
+        await tasks.rebalance_ranks(project_id, status)
     
     return {"message": "Task updated successfully"}
 
@@ -96,36 +149,15 @@ async def update_task(
 async def delete_task(project_id: str, task_id: str, user: dict = Depends(require_user)):
     """Delete a task"""
     # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
+    project = await projects.get_user_project(project_id, user['id'], 'id')
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Verify task exists
-    task = supabase.table('tasks').select('id').eq('id', task_id).eq('project_id', project_id).maybe_single().execute()
-    if not task or not task.data:
+    task = await tasks.get_task(task_id, project_id, 'id')
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Delete task
-    supabase.table('tasks').delete().eq('id', task_id).execute()
+    await tasks.delete_task(task_id)
     return {"message": "Task deleted successfully"}
-
-@router.patch("/{project_id}/reorder")
-@handle_exceptions(status_code=500)
-async def reorder_tasks(
-    project_id: str,
-    task_orders: list[dict],
-    user: dict = Depends(require_user)
-):
-    """Reorder tasks in a project"""
-    # Verify project ownership
-    project = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).maybe_single().execute()
-    if not project or not project.data:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Update task positions
-    for order in task_orders:
-        supabase.table('tasks').update({
-            'position': order['position']
-        }).eq('id', order['task_id']).execute()
-    
-    return {"message": "Tasks reordered successfully"} 
\ No newline at end of file
@@ -4,27 +4,27 @@ BRD Generator service for generating Business Requirements Documents.
 import json
 import logging
 import os
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.memory.v2.schema import UserMemory
 
 from .config import (
     BRD_MODEL_TYPE,
     BRD_MODEL_ID,
+    BRD_GENERATION_MODE,
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
 )
 from .memory_storage_service import get_memory, get_storage
+from .memory_writer import memory_writer
+from .memory_retrieval import memory_retriever
+from .model_registry import get_model
+from .response_cache import response_cache
+from .streaming import run_with_partials, PartialCallback
+from ..utils.fences import extract_markdown
+from .sectioned_generation import SectionedGenerator, BRD_SECTIONS
 
 # Set up logging
 logging.basicConfig(
@@ -48,17 +48,8 @@ class BRDGeneratorService:
         self.model_type = model_type or BRD_MODEL_TYPE
         self.model_id = model_id or BRD_MODEL_ID
         
-        # Initialize the model based on provider
-        if self.model_type.lower() == "gemini":
-            self.model = Gemini(id=self.model_id)
-        elif self.model_type.lower() == "openai":
-            self.model = OpenAIChat(id=self.model_id)
-        elif self.model_type.lower() == "mistral":
-            self.model = MistralChat(id=self.model_id)
-        elif self.model_type.lower() == "openai_like":
-            self.model = OpenAILike(id=self.model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        else:  # Default to groq
-            self.model = Groq(id=self.model_id)
+        # Shared pooled client for the provider, rate limited
+        self.model = get_model(self.model_type, self.model_id)
         
         # Load BRD template for reference if available
         brd_template = ""
@@ -134,9 +125,19 @@ class BRDGeneratorService:
             markdown=ENABLE_MARKDOWN
         )
             
+        # Outline plus concurrent per-section calls, used in sectioned mode
+        self.sectioned = SectionedGenerator(
+            self.model_type, self.model_id,
+            name="BRDGenerator",
+            role="an expert business analyst",
+            title="BUSINESS REQUIREMENTS DOCUMENT (BRD)",
+            sections=BRD_SECTIONS,
+            level=2,
+        )
+            
         logger.info(f"Initialized BRD Generator with {self.model_type} model (ID: {self.model_id})")
 
-    async def generate_brd(self, project_details: Dict[str, Any], user_id: str = None) -> Dict[str, Any]:
+    async def generate_brd(self, project_details: Dict[str, Any], user_id: str = None, use_cache: bool = True, reference: Optional[str] = None, on_partial: Optional[PartialCallback] = None, sectioned: Optional[bool] = None) -> Dict[str, Any]:
         """
         Generate a comprehensive BRD based on project details.
         
@@ -146,6 +147,10 @@ class BRDGeneratorService:
                 - project_description: Brief description of the project
                 - start_date: Project start date (dd/mm/yyyy)
                 - end_date: Project end date (dd/mm/yyyy)
+            use_cache: Reuse a cached BRD generated from the same details, if any
+            reference: BRD excerpt of a similar project to build on
+            on_partial: Streams the response, called with the content generated so far
+            sectioned: Write the BRD section by section, defaults to ``BRD_GENERATION_MODE``
             
         Returns:
             Dictionary with BRD generation results, including content
@@ -156,22 +161,46 @@ class BRDGeneratorService:
         logger.info(f"Generating BRD for: {project_details.get('project_name', 'Unnamed Project')}")
         
         # Convert project details to string for the prompt
-        project_details_text = json.dumps(project_details, indent=2)
-        
-        try:
-            brd_response = await self.agent.arun(f"""
+        project_details_text = json.dumps(project_details, indent=2, sort_keys=True)
+        prompt = f"""
             Project Details:
             {project_details_text}
-            """, user_id=user_id, session_id=f"{user_id}_brd" if user_id else None)
-            brd_content = brd_response.content.strip()
+            """
+        if reference:
+            prompt += f"""
+            BRD of a similar earlier project, reuse what applies and adapt everything to this project:
+            ```markdown
+            {reference}
+            ```
+            """
+        model = f"{self.model_type}:{self.model_id}"
+        cache_key = response_cache.key(model, self.agent.instructions, prompt)
+        if sectioned is None:
+            sectioned = BRD_GENERATION_MODE == "sectioned"
+        
+        try:
+            # Sectioned mode caches the outline and each section itself
+            brd_content = None if sectioned else await response_cache.get(cache_key, model, use_cache)
+            if sectioned:
+                brd_content = await self.sectioned.generate(
+                    prompt, project_details.get('project_name', 'Unnamed Project'), use_cache, on_partial
+                )
+            elif brd_content is not None:
+                logger.info("Using cached BRD generated from the same project details")
+            else:
+                await memory_retriever.recall(user_id, prompt)
+                brd_content = await run_with_partials(
+                    self.agent, prompt, on_partial, user_id=user_id, session_id=f"{user_id}_brd" if user_id else None
+                )
+                brd_content = brd_content.strip()
+
+                # Unwrap the document if the model fenced it
+                brd_content = extract_markdown(brd_content)
 
-            # Extract content between ``` markers using regex
-            match = re.search(r"```(?:markdown)?([\s\S]*?)```\s*$", brd_content, re.MULTILINE)
-            if match:
-                brd_content = match.group(1).strip()
+                await response_cache.set(cache_key, model, brd_content)
 
             project_name = project_details.get('project_name', 'Unnamed Project')
-            self.memory.add_user_memory(user_id=user_id, memory=UserMemory(
+            memory_writer.add(user_id=user_id, memory=UserMemory(
                 memory=f"""
                 Project BRD:
                 ```markdown
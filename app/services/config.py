@@ -2,6 +2,7 @@
 Configuration settings for AI services.
 """
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -51,6 +52,85 @@ MARKET_VALIDATION_MANAGER_MODEL_ID = os.getenv("MARKET_VALIDATION_MANAGER_MODEL_
 PREVIEW_MODEL_TYPE = os.getenv("PREVIEW_MODEL_TYPE", DEFAULT_MODEL_TYPE)
 PREVIEW_MODEL_ID = os.getenv("PREVIEW_MODEL_ID", DEFAULT_MODEL_ID)
 
+# LLM provider limits (see rate_limiter.py), keyed by "model_type" or "model_type:model_id", e.g.
+# {"groq": {"max_in_flight": 4, "requests_per_minute": 30, "tokens_per_minute": 12000}}
+# Requests and tokens per minute are shared by all processes, in-flight calls are per process.
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+LLM_RATE_LIMIT_MAX_DELAY = float(os.getenv("LLM_RATE_LIMIT_MAX_DELAY", "60"))
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024"))
+
+# Shared HTTP connection pool of the model clients (see model_registry.py), timeouts in seconds
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "True").lower() == "true"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "300"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+
+# BRD, PRD and task response cache (see response_cache.py), a Postgres table shared by all
+# processes (TTL in seconds, size in bytes of content) with an in-memory tier per process
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "604800"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", "104857600"))
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "128"))
+LLM_CACHE_MEMORY_TTL = float(os.getenv("LLM_CACHE_MEMORY_TTL", "600"))
+
+# BRD and PRD generation mode: 'single' (one agent call) or 'sectioned' (outline, then concurrent
+# per-section calls stitched together, see sectioned_generation.py)
+BRD_GENERATION_MODE = os.getenv("BRD_GENERATION_MODE", "single").lower()
+PRD_GENERATION_MODE = os.getenv("PRD_GENERATION_MODE", "single").lower()
+SECTIONED_MAX_CONCURRENCY = int(os.getenv("SECTIONED_MAX_CONCURRENCY", "4"))
+SECTION_MAX_ATTEMPTS = int(os.getenv("SECTION_MAX_ATTEMPTS", "3"))
+
+# Task generation mode: 'single' (one JSON completion) or 'staged' (epics, then features per epic,
+# then tasks per feature, concurrently, see staged_task_generation.py)
+TASK_GENERATION_MODE = os.getenv("TASK_GENERATION_MODE", "single").lower()
+TASK_STAGE_MAX_CONCURRENCY = int(os.getenv("TASK_STAGE_MAX_CONCURRENCY", "4"))
+TASK_STAGE_MAX_ATTEMPTS = int(os.getenv("TASK_STAGE_MAX_ATTEMPTS", "3"))
+
+# Ask task and GitHub README generation for their schema (TaskHierarchy, RepositoryContent) through the
+# provider's structured output support where the model has it, see structured_output.py. Other
+# providers, or this disabled, fall back to parsing the text with the tolerant JSON parser.
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "False").lower() == "true"
+
+# Memories stored after each generation are queued and upserted in batches (see memory_writer.py),
+# seconds a memory may wait and how many are written at once
+MEMORY_WRITE_DELAY = float(os.getenv("MEMORY_WRITE_DELAY", "2"))
+MEMORY_WRITE_BATCH_SIZE = int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "50"))
+
+# Embedding model ('gemini' or 'openai'), the dimensions must match the vector columns in the migrations
+EMBEDDING_MODEL_TYPE = os.getenv("EMBEDDING_MODEL_TYPE", "gemini")
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "text-embedding-004")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
+
+# Reuse of BRDs and market reports of projects with a similar objective (see semantic_cache.py).
+# Only the same user's projects are matched unless SEMANTIC_CACHE_SHARED is enabled.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_SHARED = os.getenv("SEMANTIC_CACHE_SHARED", "False").lower() == "true"
+SEMANTIC_CACHE_REFERENCE_CHARS = int(os.getenv("SEMANTIC_CACHE_REFERENCE_CHARS", "4000"))
+
+# Agents are given the chunks of their user's memories most similar to the prompt (see
+# memory_retrieval.py) instead of every memory: at most MEMORY_RETRIEVAL_TOP_K chunks of about
+# MEMORY_CHUNK_TOKENS each, within MEMORY_RETRIEVAL_TOKEN_BUDGET. Only the newest MEMORY_MAX_PER_USER
+# memories of a user (a project, for the generation services) are kept.
+MEMORY_RETRIEVAL_ENABLED = os.getenv("MEMORY_RETRIEVAL_ENABLED", "True").lower() == "true"
+MEMORY_RETRIEVAL_TOP_K = int(os.getenv("MEMORY_RETRIEVAL_TOP_K", "8"))
+MEMORY_RETRIEVAL_TOKEN_BUDGET = int(os.getenv("MEMORY_RETRIEVAL_TOKEN_BUDGET", "2000"))
+MEMORY_CHUNK_TOKENS = int(os.getenv("MEMORY_CHUNK_TOKENS", "400"))
+MEMORY_MAX_PER_USER = int(os.getenv("MEMORY_MAX_PER_USER", "20"))
+
+# Agent session storage compaction (see session_compaction.py): sessions keep their newest
+# SESSION_KEEP_RUNS runs, sessions not updated for SESSION_RETENTION_DAYS are deleted (0 keeps
+# them), and with SESSION_ARCHIVE the removed runs and sessions are kept compressed in
+# ai.agent_sessions_archive.
+SESSION_COMPACTION_ENABLED = os.getenv("SESSION_COMPACTION_ENABLED", "True").lower() == "true"
+SESSION_KEEP_RUNS = int(os.getenv("SESSION_KEEP_RUNS", "5"))
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", "90"))
+SESSION_ARCHIVE = os.getenv("SESSION_ARCHIVE", "False").lower() == "true"
+
 # Service settings
 ENABLE_DEBUG_MODE = os.getenv("ENABLE_DEBUG_MODE", "False").lower() == "true"
 ENABLE_SHOW_TOOL_CALLS = os.getenv("ENABLE_SHOW_TOOL_CALLS", "True").lower() == "true"
@@ -0,0 +1,51 @@
+"""
+Text embeddings for similarity search.
+
+The agno embedders are synchronous, so calls run in a worker thread. Recent
+embeddings are kept in memory because the same project objective is embedded
+by more than one generation stage.
+"""
+import asyncio
+import hashlib
+from typing import Optional
+
+from ..utils.cache import TTLCache
+from .config import EMBEDDING_MODEL_TYPE, EMBEDDING_MODEL_ID, EMBEDDING_DIMENSIONS
+
+_embedder = None
+_embeddings = TTLCache(max_size=256, ttl=3600)
+
+
+def get_embedder():
+    """The configured agno embedder, built on first use"""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDING_MODEL_TYPE.lower() == "openai":
+            from agno.embedder.openai import OpenAIEmbedder
+            _embedder = OpenAIEmbedder(id=EMBEDDING_MODEL_ID, dimensions=EMBEDDING_DIMENSIONS)
+        else:  # Default to gemini
+            from agno.embedder.google import GeminiEmbedder
+            _embedder = GeminiEmbedder(id=EMBEDDING_MODEL_ID, dimensions=EMBEDDING_DIMENSIONS, task_type="SEMANTIC_SIMILARITY")
+    return _embedder
+
+
+def embedding_model() -> str:
+    """Name stored with each embedding, vectors of different models are never compared"""
+    return f"{EMBEDDING_MODEL_TYPE.lower()}:{EMBEDDING_MODEL_ID}:{EMBEDDING_DIMENSIONS}"
+
+
+async def embed_text(text: str) -> Optional[list[float]]:
+    """
+    Embed a text with the configured model.
+
+    Returns:
+        Optional[list[float]]: The embedding, None if the model returned none or the wrong size
+    """
+    key = hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+    embedding = _embeddings.get(key)
+    if embedding is None:
+        embedding = await asyncio.to_thread(get_embedder().get_embedding, text)
+        if len(embedding or []) != EMBEDDING_DIMENSIONS:
+            return None
+        _embeddings.set(key, embedding)
+    return embedding
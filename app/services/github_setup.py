@@ -1,34 +1,31 @@
 """
 GitHub setup service for setting up project repositories.
 """
-import json
 import logging
 import re
 import asyncio
 import aiohttp
 import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
-from github import Github
+from github import Github, UnknownObjectException
 
 from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.memory.v2.schema import UserMemory
 
 from app.services.memory_storage_service import get_memory, get_storage
+from app.services.memory_writer import memory_writer
+from app.services.memory_retrieval import memory_retriever
+from .model_registry import get_model
+from .structured_output import use_structured_output, parse_structured
 
 from .config import (
     GITHUB_MODEL_TYPE,
     GITHUB_MODEL_ID,
+    STRUCTURED_OUTPUT,
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
 )
 
 # Set up logging
@@ -55,28 +52,20 @@ class RepositoryContent(BaseModel):
 class GitHubSetupService:
     """Service for setting up GitHub repositories."""
 
-    def __init__(self, model_type: str = None, model_id: str = None):
+    def __init__(self, model_type: str = None, model_id: str = None, structured_output: Optional[bool] = None):
         """
         Initialize the GitHub Setup service.
         
         Args:
             model_type: The model provider to use ('groq', 'gemini', 'openai', 'openai_like', or 'mistral')
             model_id: The model ID to use
+            structured_output: Use the provider's structured output if supported, defaults to ``STRUCTURED_OUTPUT``
         """
         self.model_type = model_type or GITHUB_MODEL_TYPE
         self.model_id = model_id or GITHUB_MODEL_ID
         
-        # Initialize the model based on provider
-        if self.model_type.lower() == "gemini":
-            self.model = Gemini(id=self.model_id)
-        elif self.model_type.lower() == "openai":
-            self.model = OpenAIChat(id=self.model_id)
-        elif self.model_type.lower() == "mistral":
-            self.model = MistralChat(id=self.model_id)
-        elif self.model_type.lower() == "openai_like":
-            self.model = OpenAILike(id=self.model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        else:  # Default to groq
-            self.model = Groq(id=self.model_id)
+        # Shared pooled client for the provider, rate limited
+        self.model = get_model(self.model_type, self.model_id)
 
         # Initialize Memory and Storage using singleton service
         self.memory = get_memory()
@@ -164,17 +153,13 @@ class GitHubSetupService:
             debug_mode=ENABLE_DEBUG_MODE,
             markdown=ENABLE_MARKDOWN
         )
+        # The provider returns a validated RepositoryContent where supported, text otherwise
+        self.structured_output = use_structured_output(
+            self.agent, RepositoryContent, STRUCTURED_OUTPUT if structured_output is None else structured_output
+        )
             
         logger.info(f"Initialized GitHub Setup with {self.model_type} model (ID: {self.model_id})")
 
-    def extract_json_from_response(self, response_content: str) -> str:
-        """Extract JSON content from markdown code blocks"""
-        json_matches = list(re.finditer(r"```(?:json)?([\s\S]*?)```", response_content, re.MULTILINE))
-        if json_matches:
-            # Use the last match
-            return json_matches[-1].group(1).strip()
-        return response_content.strip()
-
     async def generate_repo_content(self, repo_name: str, prd_content: str, project_id: str = None) -> RepositoryContent:
         """Generate repository content from PRD"""
         prompt = f"""
@@ -184,6 +169,7 @@ class GitHubSetupService:
         ```
         """
 
+        await memory_retriever.recall(project_id, prompt)
         response = await self.agent.arun(
             prompt,
             user_id=project_id,
@@ -193,16 +179,8 @@ class GitHubSetupService:
             raise ValueError("Failed to generate repository content")
             
         try:
-            # Parse the JSON response
-            if isinstance(response.content, str):
-                # Extract JSON from markdown code blocks if present
-                json_content = self.extract_json_from_response(response.content)
-                content_dict = json.loads(json_content)
-                return RepositoryContent(**content_dict)
-            elif isinstance(response.content, RepositoryContent):
-                return response.content
-            else:
-                raise ValueError(f"Unexpected response type: {type(response.content)}")
+            # Structured output, or text parsed with JSON repair
+            return parse_structured(response.content, RepositoryContent)
         except Exception as e:
             raise ValueError(f"Failed to parse agent response: {str(e)}")
 
@@ -262,15 +240,32 @@ class GitHubSetupService:
             logger.error(f"❌ Failed to create {item_type}: {str(e)}")
             return None
 
-    async def create_items_in_batches(self, repo, items, item_type, milestone_map=None, batch_size=5):
-        """Generic function to create GitHub items in batches"""
+    def get_existing_items(self, repo, item_type):
+        """Milestones or issues of a type already in the repository, by title"""
+        if item_type == "milestone":
+            existing = repo.get_milestones(state="all")
+        else:
+            existing = repo.get_issues(state="all", labels=[item_type])
+        return {item.title: item for item in existing}
+
+    async def create_items_in_batches(self, repo, items, item_type, milestone_map=None, batch_size=5, reuse=False):
+        """Generic function to create GitHub items in batches, reusing the ones with the same title if reuse is set"""
         if not items:
             return {}
-            
+
+        item_map = {}
+        if reuse:
+            existing = self.get_existing_items(repo, item_type)
+            item_map = {item["id"]: existing[item["title"]] for item in items if item["title"] in existing}
+            items = [item for item in items if item["id"] not in item_map]
+            if item_map:
+                logger.info(f"♻️ Reusing {len(item_map)} {item_type}s from a previous attempt")
+            if not items:
+                return item_map
+
         logger.info(f"🔨 Creating {len(items)} {item_type}s in batches...")
         batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
         
-        item_map = {}
         for i, batch in enumerate(batches, 1):
             logger.info(f"📦 Processing {item_type} batch {i}/{len(batches)} ({len(batch)} items)...")
             
@@ -389,14 +384,16 @@ class GitHubSetupService:
                 "task": sorted([t for t in tasks_json if t.get("task_type") == "task"], key=lambda x: x.get("position", 999))
             }
             
-            # Generate repository name with sanitized project name and timestamp
+            # Generate repository name with sanitized project name and the project id, so a
+            # retried setup finds the repository an earlier attempt created
             safe_name = re.sub(r'-+', '-', re.sub(r'[^a-zA-Z0-9]', '-', project_details.get('name', 'project'))[:10]).strip('-').lower()
-            repo_name = f"{safe_name}-taskflow-{int(datetime.datetime.now().timestamp())}"
+            suffix = str(project_id).replace('-', '')[:12] if project_id else int(datetime.datetime.now().timestamp())
+            repo_name = f"{safe_name}-taskflow-{suffix}"
             
             # Generate repository content
             logger.info("🤖 Generating repository content with AI...")
             repo_content = await self.generate_repo_content(repo_name, prd_content or "No PRD provided", project_id)
-            self.memory.add_user_memory(user_id=project_id, memory=UserMemory(
+            memory_writer.add(user_id=project_id, memory=UserMemory(
                 memory=f"""
                 Repository Content:
                 ```markdown
@@ -407,14 +404,20 @@ class GitHubSetupService:
             ))
             
             
-            # Create repository
-            repo = user.create_repo(
-                name=repo_name,
-                description=repo_content.description,
-                private=False,
-                auto_init=False
-            )
-            logger.info(f"🎉 Created new repository: {repo.html_url}")
+            # Create repository, or continue the one of an earlier attempt
+            try:
+                repo = user.get_repo(repo_name)
+                reuse = True
+                logger.info(f"♻️ Continuing repository from a previous attempt: {repo.html_url}")
+            except UnknownObjectException:
+                repo = user.create_repo(
+                    name=repo_name,
+                    description=repo_content.description,
+                    private=False,
+                    auto_init=False
+                )
+                reuse = False
+                logger.info(f"🎉 Created new repository: {repo.html_url}")
             
             logger.info("\n🚀 Setting up project components in parallel...")
             
@@ -425,14 +428,14 @@ class GitHubSetupService:
             # Phase 2: Create milestones and README in parallel
             logger.info("\n📋 Phase 2: Setting up milestones and README...")
             readme_task = self.create_or_update_readme(repo, repo_content.readme_content)
-            milestone_task = self.create_items_in_batches(repo, tasks_by_type["epic"], "milestone")
+            milestone_task = self.create_items_in_batches(repo, tasks_by_type["epic"], "milestone", reuse=reuse)
             
             _, milestone_map = await asyncio.gather(readme_task, milestone_task)
             
             # Phase 3: Create feature and task issues in parallel
             logger.info("\n📋 Phase 3: Creating feature and task issues in parallel...")
-            feature_task = self.create_items_in_batches(repo, tasks_by_type["feature"], "feature", milestone_map)
-            task_task = self.create_items_in_batches(repo, tasks_by_type["task"], "task")
+            feature_task = self.create_items_in_batches(repo, tasks_by_type["feature"], "feature", milestone_map, reuse=reuse)
+            task_task = self.create_items_in_batches(repo, tasks_by_type["task"], "task", reuse=reuse)
             
             feature_map, task_map = await asyncio.gather(feature_task, task_task)
             
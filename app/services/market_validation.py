@@ -4,21 +4,19 @@ Market Validation service for analyzing market opportunities.
 import logging
 import datetime
 import os
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from agno.agent import Agent
 from agno.team import Team
-from agno.models.openai import OpenAIChat
-from agno.models.google import Gemini
-from agno.models.groq import Groq
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.tools.tavily import TavilyTools
 from agno.memory.v2.schema import UserMemory
 
 from app.services.memory_storage_service import get_memory, get_storage
+from app.services.memory_writer import memory_writer
 from .toolkits.firecrawl import FirecrawlTools
+from .model_registry import get_model
+from .streaming import run_with_partials, PartialCallback
+from ..utils.fences import extract_markdown
 
 from .config import (
     MARKET_RESEARCH_MODEL_TYPE,
@@ -32,8 +30,6 @@ from .config import (
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
 )
 from ..utils.ai_utils import save_markdown
 
@@ -69,53 +65,11 @@ class MarketValidationService:
         report_model_id = REPORT_GENERATOR_MODEL_ID
         manager_model_id = MARKET_VALIDATION_MANAGER_MODEL_ID
         
-        # Initialize research model
-        if research_model_type.lower() == "openai":
-            self.market_research_model = OpenAIChat(id=research_model_id)
-        elif research_model_type.lower() == "openai_like":
-            self.market_research_model = OpenAILike(id=research_model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif research_model_type.lower() == "groq":
-            self.market_research_model = Groq(id=research_model_id)
-        elif research_model_type.lower() == "mistral":
-            self.market_research_model = MistralChat(id=research_model_id)
-        else:  # Default to Gemini
-            self.market_research_model = Gemini(id=research_model_id)
-            
-        # Initialize analysis model
-        if analysis_model_type.lower() == "gemini":
-            self.market_analysis_model = Gemini(id=analysis_model_id)
-        elif analysis_model_type.lower() == "openai_like":
-            self.market_analysis_model = OpenAILike(id=analysis_model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif analysis_model_type.lower() == "groq":
-            self.market_analysis_model = Groq(id=analysis_model_id)
-        elif analysis_model_type.lower() == "mistral":
-            self.market_analysis_model = MistralChat(id=analysis_model_id)
-        else:  # Default to OpenAI
-            self.market_analysis_model = OpenAIChat(id=analysis_model_id)
-            
-        # Initialize report model
-        if report_model_type.lower() == "gemini":
-            self.report_generator_model = Gemini(id=report_model_id)
-        elif report_model_type.lower() == "openai_like":
-            self.report_generator_model = OpenAILike(id=report_model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif report_model_type.lower() == "groq":
-            self.report_generator_model = Groq(id=report_model_id)
-        elif report_model_type.lower() == "mistral":
-            self.report_generator_model = MistralChat(id=report_model_id)
-        else:  # Default to OpenAI
-            self.report_generator_model = OpenAIChat(id=report_model_id)
-            
-        # Initialize manager model
-        if manager_model_type.lower() == "gemini":
-            self.manager_model = Gemini(id=manager_model_id)
-        elif manager_model_type.lower() == "openai_like":
-            self.manager_model = OpenAILike(id=manager_model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif manager_model_type.lower() == "groq":
-            self.manager_model = Groq(id=manager_model_id)
-        elif manager_model_type.lower() == "mistral":
-            self.manager_model = MistralChat(id=manager_model_id)
-        else:  # Default to OpenAI
-            self.manager_model = OpenAIChat(id=manager_model_id)
+        # Shared pooled clients per provider, rate limited
+        self.market_research_model = get_model(research_model_type, research_model_id)
+        self.market_analysis_model = get_model(analysis_model_type, analysis_model_id)
+        self.report_generator_model = get_model(report_model_type, report_model_id)
+        self.manager_model = get_model(manager_model_type, manager_model_id)
         
         logger.info(f"Initialized Market Validation models: Research={research_model_type}, Analysis={analysis_model_type}, Report={report_model_type}, Manager={manager_model_type}")
     
@@ -282,12 +236,14 @@ class MarketValidationService:
             markdown=ENABLE_MARKDOWN
         )
     
-    async def run_market_validation(self, project_description: str, user_id: str = None) -> Dict[str, Any]:
+    async def run_market_validation(self, project_description: str, user_id: str = None, reference: Optional[str] = None, on_partial: Optional[PartialCallback] = None) -> Dict[str, Any]:
         """
         Run the market validation process.
         
         Args:
             project_description: Description of the project to validate
+            reference: Market report excerpt of a similar project to build on
+            on_partial: Streams the report, called with the content generated so far
             
         Returns:
             Dictionary with market validation results, including report and timing information
@@ -298,14 +254,25 @@ class MarketValidationService:
         logger.info(f"Start Time: {start_time}")
         
         try:
-            # Run the market validation team
-            response = await self.team.arun(
-                f"""
+            prompt = f"""
                 Project Description:
                 ```markdown
                 {project_description}
                 ```
-                """,
+                """
+            if reference:
+                prompt += f"""
+                Market report of a similar earlier project, verify and update it rather than starting over:
+                ```markdown
+                {reference}
+                ```
+                """
+
+            # Run the market validation team
+            report_content = await run_with_partials(
+                self.team,
+                prompt,
+                on_partial,
                 user_id=user_id,
                 session_id=f"{user_id}_market_validation" if user_id else None
             )
@@ -316,15 +283,12 @@ class MarketValidationService:
             logger.info(f"Time taken: {time_taken}")
             
             # Save the report
-            report_content = response.content
             # report_path = save_markdown(report_content, "market_validation_report")
         
-            # Extract content between ``` markers using regex
-            match = re.search(r"```(?:markdown)?(.*?)```\s*$", report_content, re.DOTALL)
-            if match:
-                report_content = match.group(1).strip()
+            # Unwrap the report if the model fenced it
+            report_content = extract_markdown(report_content)
             
-            self.memory.add_user_memory(user_id=user_id, memory=UserMemory(
+            memory_writer.add(user_id=user_id, memory=UserMemory(
                 memory=f"""
                 Market Validation Report:
                 ```markdown
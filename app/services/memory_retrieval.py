@@ -0,0 +1,246 @@
+"""
+Retrieval of the memories given to an agent.
+
+agno puts every memory of the user into the system message of an agent run,
+and the generation services store whole documents as memories, so a PRD run
+carried the project's BRD and market report in full on top of its prompt.
+Instead, memories are split into chunks of about ``MEMORY_CHUNK_TOKENS`` and
+embedded when the memory writer stores them (``migrations/memory_retrieval.sql``),
+and before an agent run ``recall`` looks up the chunks of the user's memories
+most similar to the prompt. ``RetrievalMemory``, the memory of the agents,
+then gives the agent only those: the top ``MEMORY_RETRIEVAL_TOP_K`` that fit
+in ``MEMORY_RETRIEVAL_TOKEN_BUDGET``.
+
+Runs without a recall, or whose user has no chunks yet or whose lookup
+failed, get the newest memories that fit in the budget. The memory tokens
+given to agents are counted against what the full memories would have cost,
+with the recall latency.
+"""
+import re
+import time
+import asyncio
+import logging
+import textwrap
+from contextvars import ContextVar
+from typing import Optional
+
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+
+from ..utils.fences import extract_markdown
+from .config import (
+    MEMORY_RETRIEVAL_ENABLED,
+    MEMORY_RETRIEVAL_TOP_K,
+    MEMORY_RETRIEVAL_TOKEN_BUDGET,
+    MEMORY_CHUNK_TOKENS,
+)
+from .embeddings import embed_text, embedding_model
+
+logger = logging.getLogger(__name__)
+
+# Enough of a long prompt to find its topic, and within the embedding models' input limits
+_QUERY_CHARS = 8000
+
+# Chunks recalled per user for the agent runs of the current task, replaced and never mutated
+_recalled: ContextVar[dict[str, list[UserMemory]]] = ContextVar("recalled_memories", default={})
+
+
+def _memory_chunks():
+    # Imported on use, app.config builds the services before the repositories can load
+    from ..repositories import memory_chunks
+    return memory_chunks
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count, about four characters per token as the rate limiter estimates"""
+    return len(text) // 4 + 1
+
+
+def chunk_text(text: str, max_tokens: int = MEMORY_CHUNK_TOKENS) -> list[str]:
+    """Split text into chunks of at most about ``max_tokens``, at headings and blank lines where possible"""
+    max_chars = max_tokens * 4
+    blocks = []
+    for block in re.split(r"\n\s*\n|\n(?=#)", text):
+        block = block.strip()
+        # A paragraph longer than a chunk is cut at its last line or word break that fits
+        while len(block) > max_chars:
+            cut = block.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = block.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            blocks.append(block[:cut].strip())
+            block = block[cut:].strip()
+        if block:
+            blocks.append(block)
+
+    chunks, current = [], ""
+    for block in blocks:
+        # A heading starts a new chunk unless the current one is still small
+        if current and (len(current) + 2 + len(block) > max_chars or (block.startswith("#") and len(current) >= max_chars // 2)):
+            chunks.append(current)
+            current = block
+        else:
+            current = f"{current}\n\n{block}" if current else block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def memory_chunks(memory: UserMemory) -> list[str]:
+    """The chunks a memory is stored as, each labelled with the memory's topic"""
+    # The services indent their memories and fence the document in them
+    text = extract_markdown(textwrap.dedent(memory.memory or ""))
+    label = f"{memory.topics[0]}: " if memory.topics else ""
+    return [label + chunk for chunk in chunk_text(text)]
+
+
+class MemoryRetriever:
+    """Indexes memory chunks and recalls the ones relevant to an agent's prompt"""
+
+    def __init__(
+        self,
+        enabled: bool = MEMORY_RETRIEVAL_ENABLED,
+        top_k: int = MEMORY_RETRIEVAL_TOP_K,
+        token_budget: int = MEMORY_RETRIEVAL_TOKEN_BUDGET,
+    ):
+        self.enabled = enabled
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self._stats = {
+            'recalls': 0, 'fallbacks': 0, 'errors': 0, 'chunks': 0, 'tokens': 0, 'full_tokens': 0,
+            'latency_ms': 0.0, 'indexed': 0, 'index_errors': 0,
+        }
+
+    async def index(self, rows: list[dict]) -> None:
+        """
+        Chunk, embed and store written memories, replacing their previous chunks.
+
+        Args:
+            rows: ``id``, ``user_id`` and ``memory`` (a ``UserMemory`` dict) of each memory
+        """
+        if not self.enabled:
+            return
+        for row in rows:
+            try:
+                # from_dict parses the timestamp in place
+                chunks = memory_chunks(UserMemory.from_dict(dict(row['memory'])))
+                if not chunks:
+                    continue
+                embeddings = await asyncio.gather(*(embed_text(chunk) for chunk in chunks))
+                if any(embedding is None for embedding in embeddings):
+                    raise ValueError("The embedding model returned no embedding or the wrong size")
+                await _memory_chunks().save_memory_chunks(row['id'], row['user_id'], embedding_model(), [
+                    {'content': chunk, 'tokens': count_tokens(chunk), 'embedding': embedding}
+                    for chunk, embedding in zip(chunks, embeddings)
+                ])
+                self._stats['indexed'] += 1
+            except Exception as e:
+                self._stats['index_errors'] += 1
+                logger.warning(f"Indexing memory {row['id']} failed, it is only given to agents as a recent memory: {e}")
+
+    async def recall(self, user_id: Optional[str], query: str) -> list[UserMemory]:
+        """
+        Look up the user's memory chunks most similar to a prompt.
+
+        The chunks are what the agents given this user id are told they
+        remember for the rest of the current task, until the next recall.
+
+        Args:
+            user_id: Whose memories to search, the project for the generation services
+            query: The prompt of the coming agent run
+
+        Returns:
+            list[UserMemory]: The chunks within the token budget, empty if none were found
+        """
+        if not self.enabled or not user_id or not query:
+            return []
+
+        started = time.monotonic()
+        try:
+            embedding = await embed_text(query[:_QUERY_CHARS])
+            matches = [] if embedding is None else await _memory_chunks().match_memory_chunks(
+                user_id, embedding_model(), embedding, self.top_k
+            )
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"Memory recall for {user_id} failed, using the most recent memories: {e}")
+            matches = []
+
+        recalled = {key: value for key, value in _recalled.get().items() if key != user_id}
+        if not matches:
+            _recalled.set(recalled)
+            return []
+
+        selected, used = [], 0
+        for match in matches:
+            if used + match['tokens'] <= self.token_budget:
+                selected.append(match)
+                used += match['tokens']
+        # Chunks of the same memory read in their original order
+        selected.sort(key=lambda match: (match['memory_id'], match['chunk_index']))
+        memories = [
+            UserMemory(memory=match['content'], memory_id=f"{match['memory_id']}:{match['chunk_index']}")
+            for match in selected
+        ]
+        recalled[user_id] = memories
+        _recalled.set(recalled)
+
+        self._stats['recalls'] += 1
+        self._stats['chunks'] += len(memories)
+        self._stats['tokens'] += used
+        self._stats['full_tokens'] += int(matches[0]['total_tokens'])
+        self._stats['latency_ms'] += (time.monotonic() - started) * 1000
+        return memories
+
+    def recalled(self, user_id: str) -> Optional[list[UserMemory]]:
+        """The chunks recalled for the user in the current task, None without a recall"""
+        return _recalled.get().get(user_id)
+
+    def within_budget(self, memories: list[UserMemory]) -> list[UserMemory]:
+        """The newest of the memories that fit in the token budget"""
+        selected, used, full = [], 0, 0
+        newest_first = sorted(
+            memories, key=lambda memory: memory.last_updated.timestamp() if memory.last_updated else 0, reverse=True
+        )
+        for memory in newest_first:
+            tokens = count_tokens(memory.memory or "")
+            full += tokens
+            if used + tokens <= self.token_budget:
+                selected.append(memory)
+                used += tokens
+        self._stats['fallbacks'] += 1
+        self._stats['tokens'] += used
+        self._stats['full_tokens'] += full
+        return selected
+
+    def stats(self) -> dict:
+        """Recalls, memory tokens given to agents against the full memories, and recall latency for this process"""
+        runs = self._stats['recalls'] + self._stats['fallbacks']
+        return {
+            **{key: value for key, value in self._stats.items() if key != 'latency_ms'},
+            'avg_tokens': round(self._stats['tokens'] / runs, 1) if runs else 0.0,
+            'avg_full_tokens': round(self._stats['full_tokens'] / runs, 1) if runs else 0.0,
+            'avg_recall_ms': round(self._stats['latency_ms'] / self._stats['recalls'], 2) if self._stats['recalls'] else 0.0,
+        }
+
+
+memory_retriever = MemoryRetriever()
+
+
+class RetrievalMemory(Memory):
+    """Agent memory whose prompt references are the recalled chunks rather than every memory"""
+
+    def get_user_memories(self, user_id: Optional[str] = None, refresh_from_db: bool = True) -> list[UserMemory]:
+        if not memory_retriever.enabled:
+            return super().get_user_memories(user_id=user_id, refresh_from_db=refresh_from_db)
+        recalled = memory_retriever.recalled(user_id or "default")
+        if recalled is not None:
+            return recalled
+        return memory_retriever.within_budget(
+            super().get_user_memories(user_id=user_id, refresh_from_db=refresh_from_db)
+        )
+
+
+def get_memory_retrieval_stats() -> dict:
+    return memory_retriever.stats()
@@ -3,13 +3,10 @@ Singleton service for shared Memory and PostgresStorage instances.
 """
 import threading
 from agno.memory.v2.db.postgres import PostgresMemoryDb
-from agno.memory.v2.memory import Memory
-from agno.storage.postgres import PostgresStorage
 from .config import DEFAULT_MODEL_TYPE, DEFAULT_MODEL_ID, POSTGRES_CONNECTION
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
+from .model_registry import get_model
+from .memory_retrieval import RetrievalMemory
+from .session_compaction import CompactingPostgresStorage
 
 # Thread-safe singleton implementation
 class _MemoryStorageSingleton:
@@ -25,22 +22,15 @@ class _MemoryStorageSingleton:
         return cls._instance
 
     def _init(self):
-        # Choose a model for memory (default to groq)
-        model_type = DEFAULT_MODEL_TYPE
-        model_id = DEFAULT_MODEL_ID
-        if model_type.lower() == "gemini":
-            model = Gemini(id=model_id)
-        elif model_type.lower() == "openai":
-            model = OpenAIChat(id=model_id)
-        elif model_type.lower() == "mistral":
-            model = MistralChat(id=model_id)
-        else:
-            model = Groq(id=model_id)
-        self.memory = Memory(
+        # Memory updates share the pooled clients and provider limits of the generation services
+        model = get_model(DEFAULT_MODEL_TYPE, DEFAULT_MODEL_ID)
+        # Agents are given the memories relevant to their prompt, see memory_retrieval.py
+        self.memory = RetrievalMemory(
             model=model,
             db=PostgresMemoryDb(table_name="user_memories", db_url=POSTGRES_CONNECTION),
         )
-        self.storage = PostgresStorage(table_name="agent_sessions", db_url=POSTGRES_CONNECTION)
+        # Sessions are saved with their newest runs only, see session_compaction.py
+        self.storage = CompactingPostgresStorage(table_name="agent_sessions", db_url=POSTGRES_CONNECTION)
 
 
 def get_memory():
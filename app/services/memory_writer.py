@@ -0,0 +1,181 @@
+"""
+Write-behind queue for the memories the services store after a generation.
+
+``Memory.add_user_memory`` reads all of the user's memories back from
+Postgres and then upserts the new one, synchronously, on the event loop, with
+the whole document as the memory. ``memory_writer.add`` only queues the row
+and returns, so a job completes as soon as its document is saved. Queued rows
+are written in one multi-row upsert into ``ai.user_memories`` from a worker
+thread, ``MEMORY_WRITE_DELAY`` seconds after the first one was queued or as
+soon as ``MEMORY_WRITE_BATCH_SIZE`` are waiting.
+
+A memory's id is derived from its user (the project, for the generation
+services) and topics, so a document regenerated for the same project replaces
+its previous memory instead of adding another one, both in the queue and in
+the table. Only the newest ``MEMORY_MAX_PER_USER`` memories of a user are
+kept, and written memories are indexed for retrieval (see memory_retrieval.py).
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from uuid import NAMESPACE_URL, uuid5
+
+from agno.memory.v2.schema import UserMemory
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql
+
+from .config import MEMORY_WRITE_DELAY, MEMORY_WRITE_BATCH_SIZE, MEMORY_MAX_PER_USER
+from .memory_storage_service import get_memory
+from .memory_retrieval import memory_retriever
+
+logger = logging.getLogger(__name__)
+
+_MEMORY_NAMESPACE = uuid5(NAMESPACE_URL, "taskflow:user_memories")
+
+
+def memory_id_for(user_id: str, topics: Optional[list[str]]) -> str:
+    """Stable id of the memory a user keeps for a set of topics"""
+    return str(uuid5(_MEMORY_NAMESPACE, f"{user_id}:{'|'.join(sorted(topics or []))}"))
+
+
+class MemoryWriter:
+    """Queues user memories and upserts them in batches off the event loop"""
+
+    def __init__(
+        self,
+        delay: float = MEMORY_WRITE_DELAY,
+        batch_size: int = MEMORY_WRITE_BATCH_SIZE,
+        max_per_user: int = MEMORY_MAX_PER_USER,
+    ):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.max_per_user = max_per_user
+        self._pending: dict[str, dict] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+        self._table_ready = False
+        self._stats = {'queued': 0, 'deduplicated': 0, 'written': 0, 'batches': 0, 'errors': 0, 'evicted': 0}
+
+    def add(self, user_id: Optional[str], memory: UserMemory) -> str:
+        """
+        Queue a memory for writing, replacing a queued one with the same user and topics.
+
+        Args:
+            user_id: Who the memory belongs to, the project for the generation services
+            memory: The memory to store
+
+        Returns:
+            str: The id of the memory
+        """
+        user_id = user_id or "default"
+        if memory.memory_id is None:
+            memory.memory_id = memory_id_for(user_id, memory.topics)
+        if not memory.last_updated:
+            memory.last_updated = datetime.now()
+
+        if memory.memory_id in self._pending:
+            self._stats['deduplicated'] += 1
+        else:
+            self._stats['queued'] += 1
+        self._pending[memory.memory_id] = {
+            'id': memory.memory_id,
+            'user_id': user_id,
+            'memory': memory.to_dict(),
+        }
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts without an event loop write right away, without indexing the memory for retrieval
+            self._write(self._take())
+            return memory.memory_id
+
+        if self._flusher is None or self._flusher.done():
+            self._full = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_later())
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return memory.memory_id
+
+    def _take(self) -> list[dict]:
+        rows, self._pending = list(self._pending.values()), {}
+        return rows
+
+    async def _flush_later(self) -> None:
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.delay)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything queued so far"""
+        rows = self._take()
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Writing {len(rows)} user memories failed, retrying with the next batch: {e}")
+            # Rows queued again in the meantime are newer, keep those
+            for row in rows:
+                self._pending.setdefault(row['id'], row)
+            return
+        await memory_retriever.index(rows)
+
+    def _write(self, rows: list[dict]) -> None:
+        db = get_memory().db
+        # Timestamps are set here, the table of database.sql has no defaults and eviction keeps the newest
+        stmt = postgresql.insert(db.table).values([{**row, 'created_at': func.now(), 'updated_at': func.now()} for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_=dict(user_id=stmt.excluded.user_id, memory=stmt.excluded.memory, updated_at=func.now()),
+        )
+        if not self._table_ready:
+            if not db.table_exists():
+                db.create()
+            self._table_ready = True
+        with db.Session() as sess, sess.begin():
+            sess.execute(stmt)
+            evicted = sess.execute(self._evict(db.table, {row['user_id'] for row in rows})).rowcount
+        self._stats['written'] += len(rows)
+        self._stats['evicted'] += evicted
+        self._stats['batches'] += 1
+
+    def _evict(self, table, user_ids: set[str]):
+        """Delete the memories of the users beyond their newest ``max_per_user``, their chunks cascade"""
+        ranked = select(
+            table.c.id,
+            func.row_number().over(
+                partition_by=table.c.user_id,
+                order_by=func.coalesce(table.c.updated_at, table.c.created_at).desc().nulls_last(),
+            ).label("rank"),
+        ).where(table.c.user_id.in_(user_ids)).subquery()
+        return delete(table).where(table.c.id.in_(select(ranked.c.id).where(ranked.c.rank > self.max_per_user)))
+
+    def stats(self) -> dict:
+        return {**self._stats, 'pending': len(self._pending)}
+
+    async def aclose(self) -> None:
+        """Stop the background flush and write what is still queued"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"{len(self._pending)} user memories could not be written")
+
+
+memory_writer = MemoryWriter()
+
+
+def get_memory_writer_stats() -> dict:
+    return memory_writer.stats()
@@ -0,0 +1,222 @@
+"""
+Shared model registry for the AI services.
+
+Builds the agno model for a ``(model_type, model_id)`` pair. Every model is
+wired to one ``httpx.AsyncClient`` per pair, built once, and all of those
+clients share a single tuned transport (keep-alive, HTTP/2, pool limits), so
+the services reuse connections to each vendor instead of opening a pool per
+service (or, for the OpenAI and Groq SDKs, a new client per call). Models are
+also routed through the provider rate limiter.
+
+Model instances themselves are cheap and carry per-run state, so each agent
+gets its own, only the HTTP clients are shared.
+"""
+import time
+import logging
+from typing import Optional
+
+import httpx
+from agno.models.groq import Groq
+from agno.models.google import Gemini
+from agno.models.openai import OpenAIChat
+from agno.models.mistral import MistralChat
+from agno.models.openai.like import OpenAILike
+
+from .config import (
+    OPENAI_LIKE_BASE_URL,
+    OPENAI_LIKE_API_KEY,
+    LLM_HTTP2,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP_TIMEOUT,
+    LLM_HTTP_CONNECT_TIMEOUT,
+)
+from .rate_limiter import limit_model, get_limiter_stats
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPES = ('groq', 'gemini', 'openai', 'openai_like', 'mistral')
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """View of the shared transport that clients can close without closing the pool"""
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # google-genai closes its client when it is garbage collected
+        pass
+
+
+class ModelRegistry:
+    """Builds models on shared, pooled HTTP clients and tracks their usage"""
+
+    def __init__(self):
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._stats: dict[str, dict] = {}
+
+    def _get_transport(self) -> httpx.AsyncHTTPTransport:
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(
+                http2=LLM_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._transport
+
+    def _event_hooks(self, key: str) -> dict:
+        stats = self._stats.setdefault(key, {
+            'requests': 0, 'responses': 0, 'errors': 0, 'response_seconds': 0.0, 'hosts': set()
+        })
+
+        async def on_request(request: httpx.Request):
+            stats['requests'] += 1
+            stats['hosts'].add(request.url.host)
+            request.extensions['registry_started'] = time.monotonic()
+
+        async def on_response(response: httpx.Response):
+            stats['responses'] += 1
+            if response.status_code >= 400:
+                stats['errors'] += 1
+            started = response.request.extensions.get('registry_started')
+            if started is not None:
+                stats['response_seconds'] += time.monotonic() - started
+
+        return {'request': [on_request], 'response': [on_response]}
+
+    def get_http_client(self, key: str) -> httpx.AsyncClient:
+        """The pooled client for a ``model_type:model_id`` key, built on first use"""
+        if key not in self._clients:
+            self._clients[key] = httpx.AsyncClient(
+                transport=_SharedTransport(self._get_transport()),
+                timeout=httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+                event_hooks=self._event_hooks(key),
+            )
+        return self._clients[key]
+
+    def get_model(self, model_type: str, model_id: str):
+        """
+        Build a rate limited model on the shared HTTP client of its provider and id.
+
+        Args:
+            model_type: The model provider to use ('groq', 'gemini', 'openai', 'openai_like', or 'mistral'),
+                anything else falls back to groq
+            model_id: The model ID to use
+
+        Returns:
+            An agno model instance
+        """
+        model_type = model_type.lower()
+        if model_type not in MODEL_TYPES:
+            model_type = 'groq'
+        key = f"{model_type}:{model_id}"
+        http_client = self.get_http_client(key)
+
+        if model_type == "gemini":
+            # google-genai builds its own async client from these arguments
+            model = Gemini(id=model_id, client_params={'http_options': {'async_client_args': {
+                'transport': _SharedTransport(self._get_transport()),
+                'event_hooks': http_client.event_hooks,
+            }}})
+        elif model_type == "openai":
+            model = _pooled(OpenAIChat)(id=model_id, http_client=http_client)
+        elif model_type == "mistral":
+            model = MistralChat(id=model_id, client_params={'async_client': http_client})
+        elif model_type == "openai_like":
+            model = _pooled(OpenAILike)(
+                id=model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY, http_client=http_client
+            )
+        else:
+            model = _pooled(Groq)(id=model_id, http_client=http_client)
+
+        return limit_model(model, model_type)
+
+    def stats(self) -> dict:
+        """Per-client request counters and connection counts of the shared pool"""
+        connections = []
+        pool = getattr(self._transport, '_pool', None)
+        for connection in getattr(pool, 'connections', []):
+            origin = getattr(connection, '_origin', None)
+            host = getattr(origin, 'host', b'')
+            connections.append({
+                'host': host.decode() if isinstance(host, bytes) else str(host),
+                'idle': connection.is_idle(),
+            })
+
+        clients = {}
+        for key, stats in self._stats.items():
+            own = [c for c in connections if c['host'] in stats['hosts']]
+            clients[key] = {
+                'requests': stats['requests'],
+                'responses': stats['responses'],
+                'errors': stats['errors'],
+                'avg_response_seconds': round(stats['response_seconds'] / stats['responses'], 3) if stats['responses'] else None,
+                'hosts': sorted(stats['hosts']),
+                'connections': len(own),
+                'idle_connections': sum(1 for c in own if c['idle']),
+            }
+
+        return {
+            'pool': {
+                'connections': len(connections),
+                'idle_connections': sum(1 for c in connections if c['idle']),
+                'max_connections': LLM_HTTP_MAX_CONNECTIONS,
+                'http2': LLM_HTTP2,
+            },
+            'clients': clients,
+            'rate_limits': get_limiter_stats(),
+        }
+
+    async def aclose(self) -> None:
+        """Close the shared clients and their connections"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+
+_pooled_classes: dict[type, type] = {}
+
+
+def _pooled(base: type) -> type:
+    """
+    Subclass of an OpenAI-style agno model that keeps sync calls working.
+
+    These SDKs take one ``http_client`` for both sync and async clients, and the
+    shared one is async, so sync calls fall back to the SDK's own client.
+    """
+    if base not in _pooled_classes:
+        def get_client(self):
+            if isinstance(self.http_client, httpx.AsyncClient):
+                pooled, self.http_client = self.http_client, None
+                try:
+                    return base.get_client(self)
+                finally:
+                    self.http_client = pooled
+            return base.get_client(self)
+
+        _pooled_classes[base] = type(base.__name__, (base,), {'get_client': get_client, '__module__': __name__})
+    return _pooled_classes[base]
+
+
+registry = ModelRegistry()
+
+
+def get_model(model_type: str, model_id: str):
+    """Build a model for a service, see ``ModelRegistry.get_model``"""
+    return registry.get_model(model_type, model_id)
+
+
+def get_model_stats() -> dict:
+    return registry.stats()
@@ -3,27 +3,27 @@ PRD Generator service for generating Product Requirements Documents.
 """
 import logging
 import os
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.memory.v2.schema import UserMemory
 
 from app.services.memory_storage_service import get_memory, get_storage
+from app.services.memory_writer import memory_writer
+from app.services.memory_retrieval import memory_retriever
+from .model_registry import get_model
+from .response_cache import response_cache
+from .streaming import run_with_partials, PartialCallback
+from ..utils.fences import extract_markdown
+from .sectioned_generation import SectionedGenerator, PRD_SECTIONS
 
 from .config import (
     PRD_MODEL_TYPE,
     PRD_MODEL_ID,
+    PRD_GENERATION_MODE,
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
 )
 
 # Set up logging
@@ -48,17 +48,8 @@ class PRDGeneratorService:
         self.model_type = model_type or PRD_MODEL_TYPE
         self.model_id = model_id or PRD_MODEL_ID
         
-        # Initialize the model based on provider
-        if self.model_type.lower() == "gemini":
-            self.model = Gemini(id=self.model_id)
-        elif self.model_type.lower() == "openai":
-            self.model = OpenAIChat(id=self.model_id)
-        elif self.model_type.lower() == "openai_like":
-            self.model = OpenAILike(id=self.model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif self.model_type.lower() == "mistral":
-            self.model = MistralChat(id=self.model_id)
-        else:  # Default to groq
-            self.model = Groq(id=self.model_id)
+        # Shared pooled client for the provider, rate limited
+        self.model = get_model(self.model_type, self.model_id)
         
         # Load PRD template for reference if available
         prd_template = ""
@@ -158,15 +149,27 @@ class PRDGeneratorService:
             debug_mode=ENABLE_DEBUG_MODE,
             markdown=ENABLE_MARKDOWN
         )
+        # Outline plus concurrent per-section calls, used in sectioned mode
+        self.sectioned = SectionedGenerator(
+            self.model_type, self.model_id,
+            name="PRDGenerator",
+            role="an expert product manager",
+            title="PRODUCT REQUIREMENTS DOCUMENT (PRD)",
+            sections=PRD_SECTIONS,
+            level=3,
+        )
         logger.info(f"Initialized PRD Generator with {self.model_type} model (ID: {self.model_id})")
 
-    async def generate_prd(self, brd_content: str, project_name: str = "Unnamed Project", user_id: str = None) -> Dict[str, Any]:
+    async def generate_prd(self, brd_content: str, project_name: str = "Unnamed Project", user_id: str = None, use_cache: bool = True, on_partial: Optional[PartialCallback] = None, sectioned: Optional[bool] = None) -> Dict[str, Any]:
         """
         Generate a PRD based on a BRD.
         
         Args:
             brd_content: Content of the BRD document
             project_name: Name of the project
+            use_cache: Reuse a cached PRD generated from the same BRD, if any
+            on_partial: Streams the response, called with the content generated so far
+            sectioned: Write the PRD section by section, defaults to ``PRD_GENERATION_MODE``
             
         Returns:
             Dictionary with PRD generation results, including content
@@ -176,21 +179,37 @@ class PRDGeneratorService:
         """
         logger.info(f"Generating PRD for project: {project_name}")
         
-        try:
-            prd_response = await self.agent.arun(f"""
+        prompt = f"""
             BRD:
             ```markdown
             {brd_content}
             ```
-            """, user_id=user_id, session_id=f"{user_id}_prd" if user_id else None)
-            prd_content = prd_response.content.strip()
+            """
+        model = f"{self.model_type}:{self.model_id}"
+        cache_key = response_cache.key(model, self.agent.instructions, prompt)
+        if sectioned is None:
+            sectioned = PRD_GENERATION_MODE == "sectioned"
 
-            # Extract content between ``` markers using regex
-            match = re.search(r"```(?:markdown)?([\s\S]*?)```\s*$", prd_content, re.MULTILINE)
-            if match:
-                prd_content = match.group(1).strip()
+        try:
+            # Sectioned mode caches the outline and each section itself
+            prd_content = None if sectioned else await response_cache.get(cache_key, model, use_cache)
+            if sectioned:
+                prd_content = await self.sectioned.generate(prompt, project_name, use_cache, on_partial)
+            elif prd_content is not None:
+                logger.info("Using cached PRD generated from the same BRD")
+            else:
+                await memory_retriever.recall(user_id, prompt)
+                prd_content = await run_with_partials(
+                    self.agent, prompt, on_partial, user_id=user_id, session_id=f"{user_id}_prd" if user_id else None
+                )
+                prd_content = prd_content.strip()
+
+                # Unwrap the document if the model fenced it
+                prd_content = extract_markdown(prd_content)
+
+                await response_cache.set(cache_key, model, prd_content)
             
-            self.memory.add_user_memory(user_id=user_id, memory=UserMemory(
+            memory_writer.add(user_id=user_id, memory=UserMemory(
                 memory=f"""
                 Project PRD:
                 ```markdown
@@ -8,11 +8,6 @@ import asyncio
 from typing import Dict, Any
 
 from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.memory.v2.schema import UserMemory
 from patchright.async_api import async_playwright
 
@@ -22,8 +17,6 @@ from .config import (
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
     LOVABLE_COOKIES,
     WS_CDP_ENDPOINT,
     DATA_DIR,
@@ -31,6 +24,9 @@ from .config import (
     BROWSER_UA,
 )
 from .memory_storage_service import get_memory, get_storage
+from .memory_writer import memory_writer
+from .memory_retrieval import memory_retriever
+from .model_registry import get_model
 
 # Set up logging
 logging.basicConfig(
@@ -54,17 +50,8 @@ class PreviewGeneratorService:
         self.model_type = model_type or DEFAULT_MODEL_TYPE
         self.model_id = model_id or DEFAULT_MODEL_ID
         
-        # Initialize the model based on provider
-        if self.model_type.lower() == "gemini":
-            self._model = Gemini(id=self.model_id)
-        elif self.model_type.lower() == "openai":
-            self._model = OpenAIChat(id=self.model_id)
-        elif self.model_type.lower() == "mistral":
-            self._model = MistralChat(id=self.model_id)
-        elif self.model_type.lower() == "openai_like":
-            self._model = OpenAILike(id=self.model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        else:  # Default to groq
-            self._model = Groq(id=self.model_id)
+        # Shared pooled client for the provider, rate limited
+        self._model = get_model(self.model_type, self.model_id)
         
         # Initialize Memory and Storage using singleton service
         self._memory = get_memory()
@@ -253,6 +240,7 @@ class PreviewGeneratorService:
         From the Project Context and Business Requirements Document, generate a Prompt for an AI tool called Lovable that will generate mockups for a website.
         """
         
+        await memory_retriever.recall(user_id, prompt_input)
         response = await self._agent.arun(
             prompt_input,
             user_id=user_id,
@@ -398,7 +386,7 @@ class PreviewGeneratorService:
                 
                 # Store in memory
                 if user_id and self._memory:
-                    self._memory.add_user_memory(user_id=user_id, memory=UserMemory(
+                    memory_writer.add(user_id=user_id, memory=UserMemory(
                         memory=f"""
                         Project Preview Generated:
                         Project: {project_name}
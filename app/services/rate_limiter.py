@@ -0,0 +1,300 @@
+"""
+Provider-aware rate limiting for LLM calls.
+
+Every model built by the model registry is passed through ``limit_model``, which
+routes its async provider calls through one ``ProviderLimiter`` keyed by
+``model_type:model_id``:
+
+- at most ``max_in_flight`` calls per key run at once in this process, and
+  waiting calls are served round-robin by user so one large project cannot
+  starve the others
+- requests and tokens per minute are taken from a token bucket in Postgres
+  (``migrations/llm_rate_limits.sql``) shared by every API and worker process
+- a 429 response blocks the key for every process for its ``Retry-After``
+  time, then the call is retried
+
+Limits come from ``LLM_RATE_LIMITS`` in ``config.py``. When the shared buckets
+cannot be reached the limiter logs the error and lets calls through.
+"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque, defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+from agno.exceptions import ModelProviderError
+
+from .config import (
+    LLM_RATE_LIMITS,
+    LLM_MAX_IN_FLIGHT,
+    LLM_RATE_LIMIT_RETRIES,
+    LLM_RATE_LIMIT_MAX_DELAY,
+    LLM_OUTPUT_TOKEN_ESTIMATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# User the current task makes LLM calls for, used for fair queueing
+_llm_user: ContextVar[str] = ContextVar('llm_user', default='anonymous')
+
+
+def set_llm_user(user_id: Optional[str]) -> None:
+    """Attribute the LLM calls made by the current task to a user"""
+    _llm_user.set(user_id or 'anonymous')
+
+
+def get_limits(key: str) -> dict:
+    """Limits for a ``model_type:model_id`` key, the most specific configured entry wins"""
+    model_type = key.split(':', 1)[0]
+    limits = {'max_in_flight': LLM_MAX_IN_FLIGHT, 'requests_per_minute': 0, 'tokens_per_minute': 0}
+    limits.update(LLM_RATE_LIMITS.get(model_type, {}))
+    limits.update(LLM_RATE_LIMITS.get(key, {}))
+    return limits
+
+
+class _FairSemaphore:
+    """Semaphore that hands free slots to waiting users in round-robin order"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._waiters: OrderedDict[str, deque] = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    async def acquire(self, user: str) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            else:
+                queue = self._waiters.get(user)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._waiters[user]
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self.in_flight < self.limit and self._waiters:
+            user, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            # Served users go to the back of the line
+            if queue:
+                self._waiters.move_to_end(user)
+            else:
+                del self._waiters[user]
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+
+def _shared_limits():
+    # Imported on use, app.config builds the services before the repositories can load
+    from ..repositories import llm_limits
+    return llm_limits
+
+
+class ProviderLimiter:
+    """Per ``model_type:model_id`` concurrency, rate and Retry-After handling"""
+
+    def __init__(self):
+        self._slots: dict[str, _FairSemaphore] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._stats = defaultdict(lambda: {'calls': 0, 'rate_limited': 0, 'wait_seconds': 0.0})
+
+    def _semaphore(self, key: str) -> _FairSemaphore:
+        if key not in self._slots:
+            self._slots[key] = _FairSemaphore(int(get_limits(key)['max_in_flight']))
+        return self._slots[key]
+
+    @asynccontextmanager
+    async def acquire(self, key: str, tokens: int):
+        """Hold a call slot for ``key`` once the shared buckets have capacity for ``tokens``"""
+        semaphore = self._semaphore(key)
+        started = time.monotonic()
+        await semaphore.acquire(_llm_user.get())
+        try:
+            await self._wait_for_capacity(key, tokens)
+            stats = self._stats[key]
+            stats['calls'] += 1
+            stats['wait_seconds'] += time.monotonic() - started
+            yield
+        finally:
+            semaphore.release()
+
+    async def _wait_for_capacity(self, key: str, tokens: int) -> None:
+        limits = get_limits(key)
+        while True:
+            # Retry-After seen by this process
+            wait = self._blocked_until.get(key, 0) - time.monotonic()
+
+            if wait <= 0 and (limits['requests_per_minute'] or limits['tokens_per_minute']):
+                try:
+                    wait = await _shared_limits().take_capacity(
+                        key, int(limits['requests_per_minute']), int(limits['tokens_per_minute']), tokens
+                    )
+                except Exception as e:
+                    logger.warning(f"LLM rate limit check for {key} failed, continuing without it: {e}")
+                    return
+
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, LLM_RATE_LIMIT_MAX_DELAY))
+
+    async def settle(self, key: str, estimated: int, actual: Optional[int]) -> None:
+        """Correct the shared token bucket with the real usage of a call"""
+        tokens_per_minute = int(get_limits(key)['tokens_per_minute'])
+        if not tokens_per_minute or actual is None or actual == estimated:
+            return
+        try:
+            await _shared_limits().settle_tokens(key, tokens_per_minute, actual - estimated)
+        except Exception as e:
+            logger.warning(f"Settling LLM token usage for {key} failed: {e}")
+
+    async def block(self, key: str, seconds: float) -> None:
+        """Stop calls to ``key`` in every process for ``seconds``"""
+        self._stats[key]['rate_limited'] += 1
+        self._blocked_until[key] = max(self._blocked_until.get(key, 0), time.monotonic() + seconds)
+        try:
+            await _shared_limits().block_key(key, seconds)
+        except Exception as e:
+            logger.warning(f"Sharing the rate limit block of {key} failed: {e}")
+
+    def stats(self) -> dict:
+        """In-flight, waiting and counter values per key for this process"""
+        return {
+            key: {
+                'in_flight': self._slots[key].in_flight if key in self._slots else 0,
+                'waiting': self._slots[key].waiting if key in self._slots else 0,
+                **counters,
+            }
+            for key, counters in self._stats.items()
+        }
+
+
+limiter = ProviderLimiter()
+
+
+def get_limiter_stats() -> dict:
+    return limiter.stats()
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Rough token count of a prompt (about four characters per token) plus the expected output"""
+    characters = sum(len(str(getattr(message, 'content', '') or '')) for message in messages or [])
+    return characters // 4 + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported by a provider response, None when unknown"""
+    usage = getattr(response, 'usage', None)
+    if usage is not None and getattr(usage, 'total_tokens', None) is not None:
+        return int(usage.total_tokens)
+    usage = getattr(response, 'usage_metadata', None)  # Gemini
+    if usage is not None and getattr(usage, 'total_token_count', None) is not None:
+        return int(usage.total_token_count)
+    return None
+
+
+def retry_after(error: ModelProviderError, attempt: int) -> float:
+    """Seconds to back off after a 429, from the provider's Retry-After header when present"""
+    response = getattr(error.__cause__, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return min(float(headers['retry-after-ms']) / 1000, LLM_RATE_LIMIT_MAX_DELAY)
+        if headers.get('retry-after'):
+            value = headers['retry-after']
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            return min(max(seconds, 0.0), LLM_RATE_LIMIT_MAX_DELAY)
+    except (TypeError, ValueError):
+        pass
+    return min(2.0 ** attempt, LLM_RATE_LIMIT_MAX_DELAY)
+
+
+_limited_classes: dict[type, type] = {}
+
+
+def _limited_class(base: type) -> type:
+    """Subclass of an agno model class whose async provider calls go through the limiter"""
+    if base in _limited_classes:
+        return _limited_classes[base]
+
+    async def ainvoke(self, *args, **kwargs):
+        key = self._rate_limit_key
+        messages = kwargs.get('messages', args[0] if args else None)
+        tokens = estimate_tokens(messages)
+
+        for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+            async with limiter.acquire(key, tokens):
+                try:
+                    response = await base.ainvoke(self, *args, **kwargs)
+                except ModelProviderError as e:
+                    if e.status_code != 429 or attempt == LLM_RATE_LIMIT_RETRIES:
+                        raise
+                    delay = retry_after(e, attempt)
+                    logger.warning(f"{key} rate limited, retrying in {delay:.1f}s")
+                    await limiter.block(key, delay)
+                    continue
+
+            await limiter.settle(key, tokens, response_tokens(response))
+            return response
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        key = self._rate_limit_key
+        messages = kwargs.get('messages', args[0] if args else None)
+
+        async with limiter.acquire(key, estimate_tokens(messages)):
+            try:
+                async for chunk in base.ainvoke_stream(self, *args, **kwargs):
+                    yield chunk
+            except ModelProviderError as e:
+                if e.status_code == 429:
+                    await limiter.block(key, retry_after(e, 0))
+                raise
+
+    limited = type(f"RateLimited{base.__name__}", (base,), {
+        'ainvoke': ainvoke,
+        'ainvoke_stream': ainvoke_stream,
+        '__module__': __name__,
+    })
+    _limited_classes[base] = limited
+    _limited_classes[limited] = limited
+    return limited
+
+
+def limit_model(model, model_type: str):
+    """
+    Route the async calls of an agno model through the shared limiter.
+
+    The model's class is swapped for a rate limited subclass, so copies that
+    agno makes of the model stay limited.
+
+    Args:
+        model: An agno model instance
+        model_type: The provider name used in the limiter key ('groq', 'openai', ...)
+
+    Returns:
+        The same model instance
+    """
+    model.__class__ = _limited_class(type(model))
+    model._rate_limit_key = f"{model_type.lower()}:{model.id}"
+    return model
@@ -0,0 +1,114 @@
+"""
+Response cache for document generation.
+
+Regenerating a BRD, PRD or task list from unchanged input (a retry after a
+failed save, or task generation rerun on the same PRD) does not need another
+model call. Responses are keyed by a hash of the model, the agent instructions
+and the whitespace-normalized prompt, and kept in two tiers:
+
+- a per-process ``TTLCache`` in front
+- the ``llm_response_cache`` table shared by every API and worker process, with
+  TTL and size based eviction (``migrations/llm_response_cache.sql``)
+
+Callers pass ``use_cache=False`` to skip the lookup, the fresh response then
+replaces the cached one. Errors from the shared tier are logged and treated as
+misses.
+"""
+import hashlib
+import logging
+from typing import Any, Optional
+
+from ..utils.cache import TTLCache
+from .config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_MEMORY_SIZE,
+    LLM_CACHE_MEMORY_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _shared_cache():
+    # Imported on use, app.config builds the services before the repositories can load
+    from ..repositories import llm_cache
+    return llm_cache
+
+
+def _normalize(text: Any) -> str:
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(str(line) for line in text)
+    return " ".join(str(text or "").split())
+
+
+class ResponseCache:
+    """Two tier cache of generated responses with hit counters"""
+
+    def __init__(self):
+        self._memory = TTLCache(max_size=LLM_CACHE_MEMORY_SIZE, ttl=LLM_CACHE_MEMORY_TTL)
+        self._stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0, 'bypassed': 0, 'writes': 0, 'errors': 0}
+
+    @staticmethod
+    def key(model: str, instructions: Any, prompt: str) -> str:
+        """Content address of a generation: model, agent instructions and prompt"""
+        material = "\x00".join([model, _normalize(instructions), _normalize(prompt)])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    async def get(self, key: str, model: str, use_cache: bool = True) -> Optional[str]:
+        """Get a cached response from memory, then from the shared table, None on a miss"""
+        if not (LLM_CACHE_ENABLED and use_cache):
+            self._stats['bypassed'] += 1
+            return None
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._stats['memory_hits'] += 1
+            return cached
+
+        try:
+            cached = await _shared_cache().get_entry(key, model)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"LLM response cache lookup failed: {e}")
+            cached = None
+
+        if cached is None:
+            self._stats['misses'] += 1
+            return None
+
+        self._stats['shared_hits'] += 1
+        self._memory.set(key, cached)
+        return cached
+
+    async def set(self, key: str, model: str, content: str) -> None:
+        """Store a fresh response in both tiers"""
+        if not LLM_CACHE_ENABLED:
+            return
+
+        self._memory.set(key, content)
+        try:
+            evicted = await _shared_cache().put_entry(key, model, content, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+            self._stats['writes'] += 1
+            if evicted:
+                logger.info(f"LLM response cache evicted {evicted} entries")
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"LLM response cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit counters of this process"""
+        hits = self._stats['memory_hits'] + self._stats['shared_hits']
+        lookups = hits + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory': self._memory.stats(),
+        }
+
+
+response_cache = ResponseCache()
+
+
+def get_response_cache_stats() -> dict:
+    return response_cache.stats()
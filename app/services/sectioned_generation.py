@@ -0,0 +1,195 @@
+"""
+Section-wise document generation.
+
+A single agent call writing a whole BRD or PRD is bounded by the longest
+completion. In sectioned mode a short outline pass runs first, then every
+section is written by its own call, concurrently under the provider rate
+limiter, and the sections are stitched back into the usual markdown structure
+in a fixed order with canonical headings.
+
+The outline and every section go through the response cache on their own, and
+each section is retried separately, so a failed section (or a retried job)
+does not redo the sections that already succeeded.
+"""
+import re
+import asyncio
+import logging
+from typing import Optional, Sequence
+
+from agno.agent import Agent
+
+from .config import SECTIONED_MAX_CONCURRENCY, SECTION_MAX_ATTEMPTS, ENABLE_DEBUG_MODE
+from .model_registry import get_model
+from .response_cache import response_cache
+from .streaming import PartialCallback
+from ..utils.fences import extract_markdown
+
+logger = logging.getLogger(__name__)
+
+# (heading, what the section covers) in document order
+Section = tuple[str, str]
+
+BRD_SECTIONS: tuple[Section, ...] = (
+    ("1. Introduction", "A brief introduction to the project, including background and context"),
+    ("2. Business Objectives", "The key business objectives that this project aims to achieve"),
+    ("3. Project Scope", "What is included in and excluded from the scope of this project, as In Scope and Out of Scope subsections"),
+    ("4. Functional Requirements", "The functional requirements in a table with ID, requirement, description and priority level"),
+    ("5. Non-Functional Requirements", "Performance, security, usability, reliability, scalability and other quality requirements"),
+    ("6. Project Constraints", "Budget, timeline and resource constraints"),
+    ("7. Project Acceptance Criteria", "What constitutes successful completion of the project"),
+)
+
+PRD_SECTIONS: tuple[Section, ...] = (
+    ("Introduction", "Brief introduction based on the BRD"),
+    ("Product Description", "Detailed description of the product"),
+    ("Product Objective", "Key objectives from the BRD"),
+    ("Target User", "Detailed breakdown of target users with demographics"),
+    ("Functional Requirements", (
+        "Requirements organized by feature category, one sub-heading per feature, each with Priority (High/Medium/Low), "
+        "Description, User Story (As a [user], I want to [action] so that [benefit]) and Acceptance Criteria bullets"
+    )),
+    ("Non-Functional Requirements", "Sub-sections for Performance, Security, Scalability, Availability, Usability, Compatibility and Maintenance"),
+    ("User Interface Requirements", "Key screens and UI components"),
+    ("Technical Requirements", "System architecture, technology stack and integrations"),
+    ("Project Budget and Limitations", "Budget and limitations from the BRD"),
+    ("Project Acceptance Criteria", "Clear criteria for project success"),
+    ("Schedule and Milestones", "Phases with estimated timeframes"),
+    ("Risk and Mitigation", "Technical and business risks with mitigation strategies"),
+    ("Glossary", "Technical terms and definitions"),
+)
+
+
+def normalize_section(content: str, heading: str, level: int) -> str:
+    """
+    Give a generated section its canonical heading and drop anything past it.
+
+    Any heading the model wrote first is replaced, and output continues only up
+    to the next heading at the section's level or above, so a model that runs
+    on into the following section cannot duplicate it.
+    """
+    lines = extract_markdown(content).splitlines()
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if lines and re.match(r"^#{1,6}\s", lines[0]):
+        lines.pop(0)
+
+    body = []
+    for line in lines:
+        if re.match(rf"^#{{1,{level}}}\s", line):
+            break
+        body.append(line)
+    return f"{'#' * level} {heading}\n\n" + "\n".join(body).strip()
+
+
+class SectionedGenerator:
+    """Writes a document as an outline pass followed by concurrent per-section calls"""
+
+    def __init__(self, model_type: str, model_id: str, name: str, role: str, title: str, sections: Sequence[Section], level: int):
+        """
+        Initialize the generator.
+
+        Args:
+            model_type: The model provider to use
+            model_id: The model ID to use
+            name: Agent name prefix, e.g. 'BRDGenerator'
+            role: Who the model writes as, e.g. 'an expert business analyst'
+            title: Top heading of the document, e.g. 'BUSINESS REQUIREMENTS DOCUMENT (BRD)'
+            sections: The document's sections in order
+            level: Heading level of the sections
+        """
+        self.model_type = model_type
+        self.model_id = model_id
+        self.name = name
+        self.title = title
+        self.sections = tuple(sections)
+        self.level = level
+        self.outline_instructions = f"""
+            You are TaskFlow, {role}. Write a concise outline of a {title} for the given input.
+            For each of the listed sections give 2 to 5 short bullet points with the specific facts,
+            names, numbers and decisions that section must contain, so sections written separately stay consistent.
+            Output only the outline in markdown, one heading per section, no prose.
+            """
+        self.section_instructions = f"""
+            You are TaskFlow, {role}, writing one section of a {title}.
+            Follow the outline so the section agrees with the rest of the document, and make it detailed,
+            actionable and specific to the project. Write only the requested section, starting with its heading,
+            in markdown without code fences.
+            """
+
+    def _agent(self, suffix: str, instructions: str) -> Agent:
+        # A fresh agent per call, agents keep per-run state and these calls run concurrently
+        return Agent(
+            model=get_model(self.model_type, self.model_id),
+            name=f"{self.name}{suffix}",
+            instructions=instructions,
+            add_datetime_to_instructions=True,
+            debug_mode=ENABLE_DEBUG_MODE,
+        )
+
+    async def _run(self, suffix: str, instructions: str, prompt: str, use_cache: bool) -> str:
+        """One cached model call, retried up to ``SECTION_MAX_ATTEMPTS`` times"""
+        model = f"{self.model_type}:{self.model_id}"
+        cache_key = response_cache.key(model, instructions, prompt)
+        cached = await response_cache.get(cache_key, model, use_cache)
+        if cached is not None:
+            return cached
+
+        for attempt in range(1, SECTION_MAX_ATTEMPTS + 1):
+            try:
+                response = await self._agent(suffix, instructions).arun(prompt)
+                content = (response.content or "").strip()
+                if not content:
+                    raise ValueError("empty response")
+                break
+            except Exception as e:
+                if attempt == SECTION_MAX_ATTEMPTS:
+                    raise
+                logger.warning(f"{self.name} {suffix} attempt {attempt}/{SECTION_MAX_ATTEMPTS} failed: {e}")
+                await asyncio.sleep(2 ** (attempt - 1))
+
+        await response_cache.set(cache_key, model, content)
+        return content
+
+    async def generate(self, context: str, document_name: str, use_cache: bool = True, on_partial: Optional[PartialCallback] = None) -> str:
+        """
+        Generate the document.
+
+        Args:
+            context: The input every call sees (project details, or the BRD for a PRD)
+            document_name: Name written under the title, usually the project name
+            use_cache: Reuse cached outline and sections generated from the same input
+            on_partial: Called with the document so far each time the next section in order is ready
+
+        Returns:
+            str: The stitched markdown document
+        """
+        headings = "\n".join(f"- {heading}: {guidance}" for heading, guidance in self.sections)
+        outline = await self._run(
+            "Outline", self.outline_instructions, f"{context}\n\nSections:\n{headings}", use_cache
+        )
+
+        header = f"# {self.title}\n\n## {document_name}"
+        done: dict[int, str] = {}
+        semaphore = asyncio.Semaphore(SECTIONED_MAX_CONCURRENCY)
+
+        async def write(index: int, heading: str, guidance: str) -> None:
+            prompt = (
+                f"{context}\n\nDocument outline:\n{outline}\n\n"
+                f"Write the section \"{'#' * self.level} {heading}\": {guidance}."
+            )
+            async with semaphore:
+                content = await self._run(f"Section{index + 1}", self.section_instructions, prompt, use_cache)
+            done[index] = normalize_section(content, heading, self.level)
+
+            if on_partial is not None:
+                # Only the sections ready in order, so partial output only ever grows
+                ready = []
+                for i in range(len(self.sections)):
+                    if i not in done:
+                        break
+                    ready.append(done[i])
+                if index < len(ready):
+                    await on_partial("\n\n".join([header, *ready]))
+
+        await asyncio.gather(*(write(i, heading, guidance) for i, (heading, guidance) in enumerate(self.sections)))
+        return "\n\n".join([header, *(done[i] for i in range(len(self.sections)))])
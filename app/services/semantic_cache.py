@@ -0,0 +1,125 @@
+"""
+Semantic cache of BRDs and market reports.
+
+Many projects share nearly the same objective. Before a BRD or market
+validation run, the project's objective is embedded and compared with earlier
+projects (``migrations/semantic_cache.sql``). The closest completed document
+above ``SEMANTIC_CACHE_THRESHOLD`` is either reused as is (draft mode) or
+passed to the model as a compact reference, which shortens generation.
+
+Only the same user's projects are matched unless ``SEMANTIC_CACHE_SHARED`` is
+enabled. Errors are logged and treated as misses.
+"""
+import re
+import time
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from .config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_SHARED,
+    SEMANTIC_CACHE_REFERENCE_CHARS,
+)
+from .embeddings import embed_text, embedding_model
+
+logger = logging.getLogger(__name__)
+
+
+def _project_embeddings():
+    # Imported on use, app.config builds the services before the repositories can load
+    from ..repositories import embeddings
+    return embeddings
+
+
+def compact_reference(markdown: str, max_chars: int = SEMANTIC_CACHE_REFERENCE_CHARS) -> str:
+    """Shorten a document for use as a prompt reference, keeping whole lines up to ``max_chars``"""
+    lines = []
+    size = 0
+    for line in markdown.splitlines():
+        line = line.rstrip()
+        # Blank lines and table separators carry no content
+        if not line.strip() or re.fullmatch(r"\s*\|?[\s:|-]+\|?\s*", line):
+            continue
+        if size + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+class SemanticCache:
+    """Finds completed documents of projects with a similar objective"""
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: {'lookups': 0, 'hits': 0, 'errors': 0, 'latency_ms': 0.0})
+
+    async def find(self, project_id: str, objective: str, kind: str, search: bool = True) -> Optional[dict]:
+        """
+        Store the project's objective embedding and find the most similar earlier project.
+
+        Args:
+            project_id: Project being generated
+            objective: Its objective text
+            kind: Completed document to look for, 'brd' or 'market_research'
+            search: Only store the embedding when False
+
+        Returns:
+            Optional[dict]: ``project_id``, ``similarity`` and ``content`` of the match, None on a miss
+        """
+        if not SEMANTIC_CACHE_ENABLED or not objective:
+            return None
+
+        stats = self._stats[kind]
+        started = time.monotonic()
+        try:
+            embedding = await embed_text(objective)
+            if embedding is None:
+                return None
+
+            repository = _project_embeddings()
+            if not search:
+                await repository.save_project_embedding(project_id, embedding_model(), embedding)
+                return None
+
+            matches = await repository.match_similar_projects(
+                project_id, embedding_model(), embedding, kind, SEMANTIC_CACHE_THRESHOLD, 1, SEMANTIC_CACHE_SHARED
+            )
+        except Exception as e:
+            stats['errors'] += 1
+            logger.warning(f"Semantic cache lookup for project {project_id} failed: {e}")
+            return None
+
+        stats['lookups'] += 1
+        stats['latency_ms'] += (time.monotonic() - started) * 1000
+        if not matches:
+            return None
+
+        stats['hits'] += 1
+        match = matches[0]
+        logger.info(
+            f"Project {project_id} {kind} matches project {match['project_id']} "
+            f"(similarity {float(match['similarity']):.3f})"
+        )
+        return match
+
+    def stats(self) -> dict:
+        """Lookups, hits and average embedding plus search latency per kind for this process"""
+        return {
+            kind: {
+                'lookups': s['lookups'],
+                'hits': s['hits'],
+                'hit_rate': round(s['hits'] / s['lookups'], 4) if s['lookups'] else 0.0,
+                'avg_latency_ms': round(s['latency_ms'] / s['lookups'], 2) if s['lookups'] else 0.0,
+                'errors': s['errors'],
+            }
+            for kind, s in self._stats.items()
+        }
+
+
+semantic_cache = SemanticCache()
+
+
+def get_semantic_cache_stats() -> dict:
+    return semantic_cache.stats()
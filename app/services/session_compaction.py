@@ -0,0 +1,286 @@
+"""
+Compaction of the agent session storage.
+
+Every agent and team shares ``ai.agent_sessions``, with one session per
+project and document (``f"{project_id}_brd"``). agno appends every run, with
+its full prompt and response messages, to the session's ``memory`` and reads
+and rewrites the whole row on each run, so every regeneration made the row,
+and each later load and save of it, larger. agno also copies the user
+memories it holds into every session it saves, although they are stored in
+``ai.user_memories``.
+
+``CompactingPostgresStorage`` saves sessions with only their newest
+``SESSION_KEEP_RUNS`` runs and without the memory copy. ``SessionCompactor``
+does the same to the rows already stored and deletes sessions not updated for
+``SESSION_RETENTION_DAYS``; the worker runs it every
+``SESSION_COMPACTION_INTERVAL`` seconds, and ``python maintenance.py
+compact-sessions`` runs it on demand and reports the bytes reclaimed and the
+session load and save latency before and after. With ``SESSION_ARCHIVE``
+enabled, the runs and sessions removed are first stored as zlib-compressed
+JSON in ``ai.agent_sessions_archive`` (``migrations/session_compaction.sql``).
+"""
+import json
+import time
+import zlib
+import logging
+import statistics
+from typing import Any, Optional
+
+from agno.storage.postgres import PostgresStorage
+from sqlalchemy import BigInteger, Column, DateTime, Integer, LargeBinary, MetaData, String, Table, Text, func, text
+
+from .config import SESSION_COMPACTION_ENABLED, SESSION_KEEP_RUNS, SESSION_RETENTION_DAYS, SESSION_ARCHIVE
+
+logger = logging.getLogger(__name__)
+
+archive_table = Table(
+    "agent_sessions_archive",
+    MetaData(schema="ai"),
+    Column("id", BigInteger, primary_key=True, autoincrement=True),
+    Column("session_id", String, nullable=False),
+    Column("user_id", String),
+    Column("reason", Text, nullable=False),
+    Column("payload", LargeBinary, nullable=False),
+    Column("raw_bytes", Integer, nullable=False),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+def compact_session_memory(memory: Optional[dict], keep_runs: int = SESSION_KEEP_RUNS) -> tuple[Optional[dict], list]:
+    """
+    A session's memory with its newest ``keep_runs`` runs and without the user memory copy.
+
+    Returns:
+        tuple: The compacted memory, and the runs removed from it
+    """
+    if not memory:
+        return memory, []
+    compacted = {key: value for key, value in memory.items() if key != 'memories'}
+    runs = compacted.get('runs')
+    removed = []
+    if isinstance(runs, list) and len(runs) > keep_runs:
+        removed = runs[:len(runs) - keep_runs]
+        compacted['runs'] = runs[len(runs) - keep_runs:]
+    return compacted, removed
+
+
+def _archive_row(session_id: str, user_id: Optional[str], reason: str, payload: Any) -> dict:
+    raw = json.dumps(payload, default=str).encode()
+    return {
+        'session_id': session_id,
+        'user_id': user_id,
+        'reason': reason,
+        'payload': zlib.compress(raw),
+        'raw_bytes': len(raw),
+    }
+
+
+class CompactingPostgresStorage(PostgresStorage):
+    """Session storage that saves sessions compacted"""
+
+    def __init__(self, *args, keep_runs: int = SESSION_KEEP_RUNS, archive: bool = SESSION_ARCHIVE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keep_runs = keep_runs
+        self.archive = archive
+        self._archive_ready = False
+        self._stats = {'saves': 0, 'runs_removed': 0, 'archived': 0, 'archive_errors': 0}
+
+    def upsert(self, session, create_and_retry: bool = True):
+        if SESSION_COMPACTION_ENABLED and session.memory:
+            session.memory, removed = compact_session_memory(session.memory, self.keep_runs)
+            self._stats['saves'] += 1
+            self._stats['runs_removed'] += len(removed)
+            if removed and self.archive:
+                # agno reloads the session before each run, so a run is removed, and archived, once
+                try:
+                    self.write_archive([_archive_row(session.session_id, session.user_id, 'runs', removed)])
+                except Exception as e:
+                    self._stats['archive_errors'] += 1
+                    logger.error(f"Archiving {len(removed)} runs of session {session.session_id} failed: {e}")
+        return super().upsert(session, create_and_retry)
+
+    def write_archive(self, rows: list[dict], sess=None) -> None:
+        """Store compressed archive rows, in the transaction of ``sess`` if given, creating the table on first use"""
+        if not rows:
+            return
+        if not self._archive_ready:
+            archive_table.create(self.db_engine, checkfirst=True)
+            self._archive_ready = True
+        if sess is not None:
+            sess.execute(archive_table.insert(), rows)
+        else:
+            with self.Session() as sess, sess.begin():
+                sess.execute(archive_table.insert(), rows)
+        self._stats['archived'] += len(rows)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+class SessionCompactor:
+    """Compacts stored sessions and deletes expired ones"""
+
+    def __init__(
+        self,
+        storage: CompactingPostgresStorage,
+        keep_runs: int = SESSION_KEEP_RUNS,
+        retention_days: int = SESSION_RETENTION_DAYS,
+        archive: bool = SESSION_ARCHIVE,
+        batch_size: int = 100,
+    ):
+        self.storage = storage
+        self.keep_runs = keep_runs
+        self.retention_days = retention_days
+        self.archive = archive
+        self.batch_size = batch_size
+
+    @property
+    def _table(self) -> str:
+        return f'"{self.storage.schema}"."{self.storage.table_name}"'
+
+    def measure(self) -> dict:
+        """Sessions, the bytes of their rows, and the size of the table with its TOAST data and indexes"""
+        with self.storage.Session() as sess:
+            rows, row_bytes, table_bytes = sess.execute(text(
+                f"SELECT count(*), COALESCE(sum(pg_column_size(t.*)), 0), pg_total_relation_size('{self._table}') "
+                f"FROM {self._table} t"
+            )).one()
+        return {'sessions': rows, 'row_bytes': int(row_bytes), 'table_bytes': int(table_bytes)}
+
+    def largest_sessions(self, limit: int) -> list[str]:
+        with self.storage.Session() as sess:
+            return list(sess.execute(text(
+                f"SELECT session_id FROM {self._table} ORDER BY pg_column_size(memory) DESC NULLS LAST LIMIT :limit"
+            ), {'limit': limit}).scalars())
+
+    def time_sessions(self, session_ids: list[str]) -> dict:
+        """
+        Median milliseconds to load the sessions as agno does and to save them back.
+
+        The saves are rolled back, so measuring changes nothing.
+        """
+        table = self.storage.table
+        reads, writes = [], []
+        for session_id in session_ids:
+            started = time.perf_counter()
+            session = self.storage.read(session_id)
+            reads.append((time.perf_counter() - started) * 1000)
+            if session is None:
+                continue
+            with self.storage.Session() as sess:
+                started = time.perf_counter()
+                sess.execute(
+                    table.update().where(table.c.session_id == session_id)
+                    .values(memory=session.memory, session_data=session.session_data)
+                )
+                sess.flush()
+                writes.append((time.perf_counter() - started) * 1000)
+                sess.rollback()
+        return {
+            'sessions': len(reads),
+            'read_ms': round(statistics.median(reads), 2) if reads else 0.0,
+            'write_ms': round(statistics.median(writes), 2) if writes else 0.0,
+        }
+
+    def _retention_cutoff(self) -> int:
+        """Epoch seconds before which a session is expired"""
+        return int(time.time()) - self.retention_days * 86400
+
+    def expire(self, dry_run: bool = False) -> dict:
+        """Delete the sessions not updated for ``retention_days``, archiving them first if enabled"""
+        result = {'expired': 0, 'archived': 0}
+        if self.retention_days <= 0:
+            return result
+        cutoff = self._retention_cutoff()
+        where = "COALESCE(updated_at, created_at) < :cutoff"
+
+        with self.storage.Session() as sess:
+            if dry_run:
+                result['expired'] = sess.execute(
+                    text(f"SELECT count(*) FROM {self._table} WHERE {where}"), {'cutoff': cutoff}
+                ).scalar()
+                return result
+            while True:
+                with sess.begin():
+                    deleted = sess.execute(text(
+                        f"DELETE FROM {self._table} WHERE session_id IN ("
+                        f"SELECT session_id FROM {self._table} WHERE {where} LIMIT :limit FOR UPDATE SKIP LOCKED) "
+                        f"RETURNING session_id, user_id, memory, session_data"
+                    ), {'cutoff': cutoff, 'limit': self.batch_size}).mappings().all()
+                    if self.archive and deleted:
+                        self.storage.write_archive([
+                            _archive_row(row['session_id'], row['user_id'], 'expired', dict(row)) for row in deleted
+                        ], sess)
+                        result['archived'] += len(deleted)
+                result['expired'] += len(deleted)
+                if len(deleted) < self.batch_size:
+                    return result
+
+    def compact(self, dry_run: bool = False) -> dict:
+        """Compact the stored sessions with more than ``keep_runs`` runs or a memory copy"""
+        result = {'compacted': 0, 'runs_removed': 0, 'archived': 0, 'estimated_bytes': 0}
+        table = self.storage.table
+        needs_compaction = (
+            "(CASE WHEN jsonb_typeof(memory->'runs') = 'array' THEN jsonb_array_length(memory->'runs') ELSE 0 END > :keep "
+            "OR memory ? 'memories')"
+        )
+        params = {'keep': self.keep_runs, 'limit': self.batch_size}
+        if self.retention_days > 0:
+            # Leave the sessions expire() deletes, so a dry run does not count them twice
+            needs_compaction += " AND COALESCE(updated_at, created_at) >= :cutoff"
+            params['cutoff'] = self._retention_cutoff()
+        last = ""
+        while True:
+            with self.storage.Session() as sess, sess.begin():
+                rows = sess.execute(text(
+                    f"SELECT session_id, user_id, memory FROM {self._table} "
+                    f"WHERE session_id > :last AND {needs_compaction} ORDER BY session_id LIMIT :limit FOR UPDATE"
+                ), {**params, 'last': last}).mappings().all()
+                archive = []
+                for row in rows:
+                    memory, removed = compact_session_memory(row['memory'], self.keep_runs)
+                    result['compacted'] += 1
+                    result['runs_removed'] += len(removed)
+                    if dry_run:
+                        result['estimated_bytes'] += len(json.dumps(row['memory'], default=str)) - len(json.dumps(memory, default=str))
+                        continue
+                    sess.execute(table.update().where(table.c.session_id == row['session_id']).values(memory=memory))
+                    if removed and self.archive:
+                        archive.append(_archive_row(row['session_id'], row['user_id'], 'runs', removed))
+                # Archived in the same transaction, so no run is removed without its copy
+                self.storage.write_archive(archive, sess)
+                result['archived'] += len(archive)
+            if len(rows) < self.batch_size:
+                return result
+            last = rows[-1]['session_id']
+
+    def run(self, dry_run: bool = False, sample: int = 0) -> dict:
+        """
+        Expire and compact the stored sessions.
+
+        Args:
+            dry_run: Only count what would be removed
+            sample: Time loading and saving this many of the largest sessions before and after
+
+        Returns:
+            dict: The table before and after, what was removed, and the latencies when sampled. A dry
+            run reports the bytes compaction would remove from the sessions' JSON instead
+        """
+        report = {'before': self.measure()}
+        session_ids = self.largest_sessions(sample) if sample > 0 else []
+        if session_ids:
+            report['before']['latency'] = self.time_sessions(session_ids)
+
+        expired, compacted = self.expire(dry_run), self.compact(dry_run)
+        report.update(expired)
+        report.update(compacted)
+        report['archived'] = expired['archived'] + compacted['archived']
+        if not dry_run:
+            del report['estimated_bytes']
+
+        if not dry_run:
+            report['after'] = self.measure()
+            if session_ids:
+                report['after']['latency'] = self.time_sessions(session_ids)
+            report['reclaimed_bytes'] = report['before']['row_bytes'] - report['after']['row_bytes']
+        return report
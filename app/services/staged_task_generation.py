@@ -0,0 +1,191 @@
+"""
+Staged task hierarchy generation.
+
+Asking for the whole epic / feature / task tree in one JSON completion runs
+into output token limits on large PRDs, and one malformed item fails the whole
+run. In staged mode the epics are generated first, then the features of every
+epic concurrently, then the tasks of every feature concurrently.
+
+Each call returns a short JSON list that is validated with the ``Epic``,
+``Feature`` or ``Task`` model on its own and retried on its own, and validated
+responses are cached, so a retried job only regenerates the stages that
+failed. Ids, positions and parents are assigned while merging, depth first,
+and the merged items are validated as a ``TaskHierarchy``.
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+
+from agno.agent import Agent
+from pydantic import ValidationError
+
+from .config import TASK_STAGE_MAX_CONCURRENCY, TASK_STAGE_MAX_ATTEMPTS, ENABLE_DEBUG_MODE
+from .model_registry import get_model
+from .response_cache import response_cache
+from .models import Epic, Feature, Task, TaskHierarchy, BaseTaskItem, TaskType
+from ..utils.ai_utils import extract_json
+
+logger = logging.getLogger(__name__)
+
+_ITEM_FORMAT = """
+Output JSON format:
+{{
+  "items": [
+    {{"title": "{kind} title", "description": "{description}"{extra}}}
+  ]
+}}
+
+Guidelines:
+- Output ONLY valid JSON.
+- Every item must contain: title, description{required}.
+- List the items in the order they should be worked on.
+"""
+
+EPIC_INSTRUCTIONS = """
+You are TaskFlow, an expert technical project planner. Based on the provided Product Requirements Document (PRD),
+list the epics of the project: large bodies of work that together deliver the whole product.
+""" + _ITEM_FORMAT.format(kind="Epic", description="Description of the epic", extra="", required="")
+
+FEATURE_INSTRUCTIONS = """
+You are TaskFlow, an expert technical project planner. Based on the provided Product Requirements Document (PRD)
+and its list of epics, break the given epic down into the features that deliver it. Only cover the given epic.
+""" + _ITEM_FORMAT.format(kind="Feature", description="Description of the feature", extra="", required="")
+
+TASK_INSTRUCTIONS = """
+You are TaskFlow, an expert technical project planner. Based on the provided Product Requirements Document (PRD),
+break the given feature down into concrete development tasks. Only cover the given feature.
+""" + _ITEM_FORMAT.format(
+    kind="Task",
+    description="Short one or two sentence summary of the task.",
+    extra=', "estimated_hours": 8',
+    required=", estimated_hours (integer)",
+)
+
+
+class StagedTaskGenerator:
+    """Generates a task hierarchy as epics, then features per epic, then tasks per feature"""
+
+    def __init__(self, model_type: str, model_id: str):
+        self.model_type = model_type
+        self.model_id = model_id
+
+    def _agent(self, name: str, instructions: str) -> Agent:
+        # A fresh agent per call, agents keep per-run state and these calls run concurrently
+        return Agent(
+            model=get_model(self.model_type, self.model_id),
+            name=name,
+            instructions=instructions,
+            add_datetime_to_instructions=True,
+            debug_mode=ENABLE_DEBUG_MODE,
+        )
+
+    async def _stage(
+        self,
+        name: str,
+        instructions: str,
+        prompt: str,
+        model_class: type[BaseTaskItem],
+        task_type: TaskType,
+        parent_id: Optional[str],
+        use_cache: bool,
+        semaphore: asyncio.Semaphore,
+    ) -> list[dict]:
+        """
+        Run one stage call and validate its items, retrying only this call.
+
+        Returns:
+            list[dict]: The items, with ``task_type`` and ``parent_id`` filled in
+        """
+        model = f"{self.model_type}:{self.model_id}"
+        cache_key = response_cache.key(model, instructions, prompt)
+
+        for attempt in range(1, TASK_STAGE_MAX_ATTEMPTS + 1):
+            # A cached response is only trusted on the first attempt
+            content = await response_cache.get(cache_key, model, use_cache and attempt == 1)
+            cached = content is not None
+            try:
+                if not cached:
+                    async with semaphore:
+                        response = await self._agent(name, instructions).arun(prompt)
+                    content = (response.content or "").strip()
+
+                raw_items = extract_json(content).get('items') or []
+                if not raw_items:
+                    raise ValueError("no items returned")
+                items = [
+                    model_class(**{
+                        **item,
+                        # Unique within the run, replaced while merging
+                        'id': f"{parent_id}/{name}_{index}" if parent_id else f"{name}_{index}",
+                        'task_type': task_type,
+                        'position': index,
+                        'parent_id': parent_id,
+                    }).model_dump(mode='json')
+                    for index, item in enumerate(raw_items, start=1)
+                ]
+            except (ValueError, TypeError, AttributeError, ValidationError) as e:
+                if attempt == TASK_STAGE_MAX_ATTEMPTS:
+                    raise ValueError(f"{name} failed after {attempt} attempts: {e}")
+                logger.warning(f"{name} attempt {attempt}/{TASK_STAGE_MAX_ATTEMPTS} returned invalid items: {e}")
+                continue
+
+            # Only responses that validate are cached
+            if not cached:
+                await response_cache.set(cache_key, model, content)
+            return items
+
+    async def generate(self, prd_content: str, use_cache: bool = True) -> dict[str, Any]:
+        """
+        Generate and validate the task hierarchy of a PRD.
+
+        Args:
+            prd_content: Content of the PRD document
+            use_cache: Reuse cached stage responses generated from the same input
+
+        Returns:
+            dict: ``TaskHierarchy`` dump with epics, features and tasks in depth first order
+        """
+        prd = f"PRD:\n```markdown\n{prd_content}\n```"
+        semaphore = asyncio.Semaphore(TASK_STAGE_MAX_CONCURRENCY)
+
+        epics = await self._stage("epic", EPIC_INSTRUCTIONS, prd, Epic, TaskType.EPIC, None, use_cache, semaphore)
+        epic_list = "\n".join(f"- {epic['title']}: {epic['description']}" for epic in epics)
+        logger.info(f"Generated {len(epics)} epics, generating their features")
+
+        async def tasks_of(epic: dict, feature: dict) -> list[dict]:
+            prompt = (
+                f"{prd}\n\nEpic: {epic['title']}: {epic['description']}\n"
+                f"Feature to break down: {feature['title']}: {feature['description']}"
+            )
+            return await self._stage(
+                "task", TASK_INSTRUCTIONS, prompt, Task, TaskType.TASK, feature['id'], use_cache, semaphore
+            )
+
+        async def expand(epic: dict) -> list[dict]:
+            prompt = f"{prd}\n\nEpics:\n{epic_list}\n\nEpic to break down: {epic['title']}: {epic['description']}"
+            features = await self._stage(
+                "feature", FEATURE_INSTRUCTIONS, prompt, Feature, TaskType.FEATURE, epic['id'], use_cache, semaphore
+            )
+            # Each epic's tasks start as soon as its own features are ready
+            feature_tasks = await asyncio.gather(*(tasks_of(epic, feature) for feature in features))
+            return [epic, *(item for feature, tasks in zip(features, feature_tasks) for item in (feature, *tasks))]
+
+        subtrees = await asyncio.gather(*(expand(epic) for epic in epics))
+        return TaskHierarchy(items=_renumber([item for subtree in subtrees for item in subtree])).model_dump()
+
+
+def _renumber(items: list[dict]) -> list[dict]:
+    """Give merged items unique ``epic_n`` / ``feature_n`` / ``task_n`` ids in order"""
+    counters = {task_type: 0 for task_type in TaskType}
+    ids = {}
+    renumbered = []
+    for item in items:
+        task_type = TaskType(item['task_type'])
+        counters[task_type] += 1
+        ids[item['id']] = f"{task_type.value}_{counters[task_type]}"
+        renumbered.append({
+            **item,
+            'id': ids[item['id']],
+            'parent_id': ids[item['parent_id']] if item['parent_id'] else None,
+        })
+    return renumbered
@@ -0,0 +1,38 @@
+"""
+Streaming runs of agno agents and teams.
+"""
+from typing import Any, Awaitable, Callable, Optional
+
+from agno.run.response import RunEvent
+
+# Receives the content generated so far, after every streamed chunk
+PartialCallback = Callable[[str], Awaitable[None]]
+
+
+async def run_with_partials(runner: Any, prompt: str, on_partial: Optional[PartialCallback] = None, **kwargs) -> str:
+    """
+    Run an agno agent or team and return the content of its response.
+
+    Without ``on_partial`` the run is not streamed. With it, the response is
+    streamed and ``on_partial`` is awaited with the accumulated content after
+    each chunk.
+
+    Args:
+        runner: An agno ``Agent`` or ``Team``
+        prompt: The message to run
+        on_partial: Optional callback for the content generated so far
+        **kwargs: Passed to ``arun`` (user_id, session_id, ...)
+
+    Returns:
+        str: The full response content
+    """
+    if on_partial is None:
+        response = await runner.arun(prompt, **kwargs)
+        return response.content
+
+    content = ""
+    async for event in await runner.arun(prompt, stream=True, **kwargs):
+        if event.event == RunEvent.run_response and isinstance(event.content, str):
+            content += event.content
+            await on_partial(content)
+    return content
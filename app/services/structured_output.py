@@ -0,0 +1,101 @@
+"""
+Structured output for agents that return a JSON document.
+
+With ``STRUCTURED_OUTPUT`` enabled, agents whose model supports it are given
+the document's schema as ``response_model``, so the provider constrains the
+completion to the schema (OpenAI, Gemini and Mistral structured outputs) and
+agno returns it already validated. Providers without that support, cached
+responses and structured responses agno could not parse come back as text,
+which is parsed with the tolerant JSON parser and validated against the same
+schema.
+
+The counters record which path each response took and how many failed
+validation, a failure being a generation that has to run again.
+"""
+import json
+import logging
+from typing import Any, TypeVar
+
+from agno.agent import Agent
+from pydantic import BaseModel
+
+from .config import STRUCTURED_OUTPUT
+from ..utils.json_repair import parse_json
+
+logger = logging.getLogger(__name__)
+
+SchemaT = TypeVar('SchemaT', bound=BaseModel)
+
+_stats = {'structured': 0, 'json': 0, 'repaired': 0, 'failed': 0}
+
+
+def supports_structured_output(model) -> bool:
+    """Whether the provider can constrain the model's output to a JSON schema"""
+    return bool(
+        getattr(model, 'supports_native_structured_outputs', False)
+        or getattr(model, 'supports_json_schema_outputs', False)
+    )
+
+
+def use_structured_output(agent: Agent, schema: type[BaseModel], enabled: bool = STRUCTURED_OUTPUT) -> bool:
+    """
+    Ask the agent's provider for ``schema`` when enabled and supported.
+
+    Returns:
+        bool: Whether the agent now returns structured output
+    """
+    if enabled and supports_structured_output(agent.model):
+        agent.response_model = schema
+        return True
+    return False
+
+
+def parse_structured(content: Any, schema: type[SchemaT]) -> SchemaT:
+    """
+    Validate an agent response as ``schema``.
+
+    Args:
+        content: The response content, a ``schema`` instance from structured
+            output or the text of the response
+        schema: The pydantic model the response must match
+
+    Returns:
+        The validated ``schema`` instance
+
+    Raises:
+        ValueError: If the response cannot be parsed or does not match the schema
+    """
+    if isinstance(content, schema):
+        _stats['structured'] += 1
+        return content
+
+    try:
+        if isinstance(content, BaseModel):
+            content = content.model_dump_json()
+        if not isinstance(content, str):
+            raise ValueError(f"Unexpected response type: {type(content).__name__}")
+        text = content.strip()
+        try:
+            data, path = json.loads(text), 'json'
+        except ValueError:
+            data, path = parse_json(text), 'repaired'
+        result = schema.model_validate(data)
+    except ValueError as e:
+        # pydantic's ValidationError is a ValueError
+        _stats['failed'] += 1
+        raise ValueError(f"Response does not match {schema.__name__}: {e}")
+
+    _stats[path] += 1
+    if path == 'repaired':
+        logger.info(f"Parsed {schema.__name__} from a response that needed JSON repair")
+    return result
+
+
+def get_structured_output_stats() -> dict:
+    """How the responses of this process were parsed, with the share that failed"""
+    total = sum(_stats.values())
+    return {
+        **_stats,
+        'enabled': STRUCTURED_OUTPUT,
+        'failure_rate': round(_stats['failed'] / total, 4) if total else None,
+    }
@@ -2,29 +2,28 @@
 TaskGenerator service for generating task hierarchies from PRD.
 """
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.models.google import Gemini
-from agno.models.openai import OpenAIChat
-from agno.models.mistral import MistralChat
-from agno.models.openai.like import OpenAILike
 from agno.memory.v2.schema import UserMemory
 
 from app.services.memory_storage_service import get_memory, get_storage
+from app.services.memory_writer import memory_writer
+from .model_registry import get_model
+from .response_cache import response_cache
 
 from .config import (
     TASK_MODEL_TYPE,
     TASK_MODEL_ID,
+    TASK_GENERATION_MODE,
+    STRUCTURED_OUTPUT,
     ENABLE_DEBUG_MODE,
     ENABLE_SHOW_TOOL_CALLS,
     ENABLE_MARKDOWN,
-    OPENAI_LIKE_BASE_URL,
-    OPENAI_LIKE_API_KEY,
 )
 from .models import TaskHierarchy
-from ..utils.ai_utils import extract_json
+from .staged_task_generation import StagedTaskGenerator
+from .structured_output import use_structured_output, parse_structured
 
 # Set up logging
 logging.basicConfig(
@@ -37,28 +36,20 @@ logger = logging.getLogger(__name__)
 class TaskGeneratorService:
     """Service for generating task hierarchies from PRD documents."""
 
-    def __init__(self, model_type: str = None, model_id: str = None):
+    def __init__(self, model_type: str = None, model_id: str = None, structured_output: Optional[bool] = None):
         """
         Initialize the TaskGenerator service.
         
         Args:
             model_type: The model provider to use ('groq', 'gemini', 'openai', 'openai_like', or 'mistral')
             model_id: The model ID to use
+            structured_output: Use the provider's structured output if supported, defaults to ``STRUCTURED_OUTPUT``
         """
         self.model_type = model_type or TASK_MODEL_TYPE
         self.model_id = model_id or TASK_MODEL_ID
         
-        # Initialize the model based on provider
-        if self.model_type.lower() == "gemini":
-            self.model = Gemini(id=self.model_id)
-        elif self.model_type.lower() == "openai":
-            self.model = OpenAIChat(id=self.model_id)
-        elif self.model_type.lower() == "openai_like":
-            self.model = OpenAILike(id=self.model_id, base_url=OPENAI_LIKE_BASE_URL, api_key=OPENAI_LIKE_API_KEY)
-        elif self.model_type.lower() == "mistral":
-            self.model = MistralChat(id=self.model_id)
-        else:  # Default to groq
-            self.model = Groq(id=self.model_id)
+        # Shared pooled client for the provider, rate limited
+        self.model = get_model(self.model_type, self.model_id)
         
         self.memory = get_memory()
         self.storage = get_storage()
@@ -116,15 +107,24 @@ Guidelines:
             debug_mode=ENABLE_DEBUG_MODE,
             markdown=ENABLE_MARKDOWN
         )
+        # The provider returns a validated TaskHierarchy where supported, text otherwise
+        self.structured_output = use_structured_output(
+            self.agent, TaskHierarchy, STRUCTURED_OUTPUT if structured_output is None else structured_output
+        )
+            
+        # Epics, then features, then tasks, used in staged mode
+        self.staged = StagedTaskGenerator(self.model_type, self.model_id)
             
         logger.info(f"Initialized Task Generator with {self.model_type} model (ID: {self.model_id})")
 
-    async def generate_tasks(self, prd_content: str, user_id: str = None) -> Dict[str, Any]:
+    async def generate_tasks(self, prd_content: str, user_id: str = None, use_cache: bool = True, staged: Optional[bool] = None) -> Dict[str, Any]:
         """
         Generate task hierarchy from PRD content.
         
         Args:
             prd_content: Content of the PRD document
+            use_cache: Reuse a cached task hierarchy generated from the same PRD, if any
+            staged: Generate epics, features and tasks in separate stages, defaults to ``TASK_GENERATION_MODE``
             
         Returns:
             Task hierarchy in dictionary format (validated)
@@ -133,27 +133,17 @@ Guidelines:
             ValueError: If task hierarchy generation fails
         """
         logger.info("🧠 Generating task hierarchy from PRD...")
-
-        response = await self.agent.arun(
-            f"""
-            PRD:
-            ```markdown
-            {prd_content}
-            ```
-            """,
-            user_id=user_id,
-            session_id=f"{user_id}_task_generator" if user_id else None
-        )
+        if staged is None:
+            staged = TASK_GENERATION_MODE == "staged"
 
         try:
-            content = response.content.strip()
-            raw_result = extract_json(content)
+            if staged:
+                # Each stage validates, retries and caches its own calls
+                result_dict = await self.staged.generate(prd_content, use_cache)
+            else:
+                result_dict = await self._generate_single(prd_content, user_id, use_cache)
 
-            # Validate with Pydantic
-            validated_data = TaskHierarchy(**raw_result)
-            result_dict = validated_data.model_dump()
-
-            self.memory.add_user_memory(
+            memory_writer.add(
                 user_id=user_id,
                 memory=UserMemory(
                     memory=f"Project Tasks: {result_dict}",
@@ -170,3 +160,35 @@ Guidelines:
         except Exception as e:
             logger.error(f"❌ Validation error: {e}")
             raise ValueError(f"Failed to generate task hierarchy: {str(e)}")
+
+    async def _generate_single(self, prd_content: str, user_id: str = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Generate and validate the whole task hierarchy in one completion"""
+        prompt = f"""
+            PRD:
+            ```markdown
+            {prd_content}
+            ```
+            """
+        model = f"{self.model_type}:{self.model_id}"
+        cache_key = response_cache.key(model, self.agent.instructions, prompt)
+
+        content = await response_cache.get(cache_key, model, use_cache)
+        cached = content is not None
+        if cached:
+            logger.info("Using cached task hierarchy generated from the same PRD")
+        else:
+            response = await self.agent.arun(
+                prompt,
+                user_id=user_id,
+                session_id=f"{user_id}_task_generator" if user_id else None
+            )
+            content = response.content
+
+        # Structured output, or text parsed with JSON repair, validated with Pydantic
+        validated_data = parse_structured(content, TaskHierarchy)
+        result_dict = validated_data.model_dump()
+
+        # Only responses that validate are cached
+        if not cached:
+            await response_cache.set(cache_key, model, validated_data.model_dump_json())
+        return result_dict
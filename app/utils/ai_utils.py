@@ -3,7 +3,6 @@ Utility functions for AI services.
 """
 import os
 import json
-import re
 import logging
 import datetime
 from typing import Dict, Any, List
@@ -11,6 +10,8 @@ from uuid import uuid4
 
 # Import the RESULTS_DIR from services config
 from ..services.config import RESULTS_DIR
+from .ranking import initial_rank
+from .json_repair import parse_json
 
 # Set up logging
 logging.basicConfig(
@@ -23,6 +24,9 @@ logger = logging.getLogger(__name__)
 def extract_json(content: str) -> Dict[str, Any]:
     """
     Extract JSON from content that may contain markdown or extra text.
+
+    Content that is not valid JSON as is goes through ``repair_json``, which
+    also drops surrounding prose and fixes common defects of model output.
     
     Args:
         content: The string content that may contain JSON
@@ -34,28 +38,11 @@ def extract_json(content: str) -> Dict[str, Any]:
         ValueError: If JSON cannot be extracted or parsed
     """
     logger.info("🔍 Attempting to extract JSON from response...")
-    json_match = re.search(r"```json\s*({.*?})\s*```", content, re.DOTALL)
-
-    if json_match:
-        logger.info("✅ Found JSON inside ```json block.")
-        json_str = json_match.group(1).strip()
-    else:
-        # Try to find JSON without markdown formatting
-        json_pattern = r"\{(?:[^{}]|(?:\{(?:[^{}]|(?:\{[^{}]*\}))*\}))*\}"
-        json_match = re.search(json_pattern, content)
-        if json_match:
-            logger.info("⚠️ Found JSON without markdown formatting.")
-            json_str = json_match.group(0).strip()
-        else:
-            logger.warning("⚠️ No JSON block found, using raw content as-is.")
-            json_str = content.strip()
-
     try:
-        return json.loads(json_str)
-    except json.JSONDecodeError as e:
-        logger.error(f"❌ Failed to parse extracted JSON: {e}\nRaw string:\n{json_str}")
-        raise ValueError(f"Invalid JSON after extraction: {e}\nRaw JSON string:\n{json_str}")
-    
+        return parse_json(content.strip())
+    except ValueError as e:
+        logger.error(f"❌ Failed to parse extracted JSON: {e}\nRaw string:\n{content}")
+        raise ValueError(f"Invalid JSON after extraction: {e}")
 
 
 def llm_to_tasks(generated_tasks: List[Dict[str, Any]], project_id: str) -> List[Dict[str, Any]]:
@@ -88,6 +75,7 @@ def llm_to_tasks(generated_tasks: List[Dict[str, Any]], project_id: str) -> List
             'status': 'backlog',  # Force all tasks to backlog status
             # 'position': task['position'],
             'position': position_counter,  # Use incremental position
+            'rank': initial_rank(position_counter),  # Evenly spaced rank in the same order
             'story_point': 0,  # Set story point to 0
             'parent_id': id_mapping.get(task['parent_id']) if task['parent_id'] else None,
         }
@@ -1,198 +1,236 @@
 """
 Background task functions for AI generation services.
+
+These run inside the job worker (see ``app/worker.py``). They read their
+inputs from the database so a retried or resumed job always works on current
+data, raise on failure so the queue can retry them, and leave marking records
+as failed to the ``mark_*_failed`` handlers, which run once a job has no
+attempts left.
 """
-from ..config import supabase, brd_service, prd_service, task_service, market_validation_service, github_setup_service, preview_service
+from typing import Optional
+
+from ..config import brd_service, prd_service, task_service, market_validation_service, github_setup_service, preview_service
+from ..repositories import projects, documents, tasks
+from ..services.rate_limiter import set_llm_user
+from ..services.semantic_cache import semantic_cache, compact_reference
 from .ai_utils import llm_to_tasks
+from .github_utils import get_github_token
+from .streaming import DraftWriter
+
+
+class JobFailed(Exception):
+    """A generation step returned an error result"""
+
+
+async def _get_project(project_id: str) -> dict:
+    project = await projects.get_project(project_id)
+    if not project:
+        raise ValueError("Project not found")
+    # LLM calls made by this job queue fairly against other users' calls
+    set_llm_user(project['user_id'])
+    return project
+
 
-async def generate_brd_background(project_id: str, project_data: dict):
-    """Background task to generate BRD"""
-    try:
+async def generate_brd_background(project_id: str, use_cache: bool = True, draft: bool = False):
+    """Background task to generate BRD, draft mode reuses the BRD of a similar project"""
+    project_data = await _get_project(project_id)
+
+    # The BRD of a project with a similar objective is used as is for a draft,
+    # otherwise it is passed to the model as a reference
+    match = await semantic_cache.find(project_id, project_data['objective'], 'brd', search=use_cache)
+    if match and draft:
+        brd_content = match['content']
+    else:
         brd_result = await brd_service.generate_brd({
             'project_name': project_data['name'],
             'project_description': project_data['objective'],
             'start_date': project_data['start_date'],
             'end_date': project_data['end_date'],
-        }, project_id)
-        
-        if brd_result['status'] == 'success':
-            # Update the BRD record with the content and 'completed' status
-            supabase.table('brd').update({
-                'brd_markdown': brd_result['content'],
-                'status': 'completed'
-            }).eq('project_id', project_id).execute()
-        else:
-            # Update the status to 'failed'
-            supabase.table('brd').update({'status': 'failed'}).eq('project_id', project_id).execute()
-    except Exception as e:
-        # Update the status to 'failed'
-        supabase.table('brd').update({'status': 'failed'}).eq('project_id', project_id).execute()
-
-async def generate_prd_background(project_id: str, brd_content: str, project_name: str):
+        }, project_id, use_cache=use_cache, reference=compact_reference(match['content']) if match else None,
+            on_partial=DraftWriter('brd', project_id))
+
+        if brd_result['status'] != 'success':
+            raise JobFailed(brd_result.get('error', 'BRD generation failed'))
+        brd_content = brd_result['content']
+
+    # Update the BRD record with the content and 'completed' status
+    await documents.update_document('brd', project_id, {
+        'brd_markdown': brd_content,
+        'status': 'completed'
+    })
+    await documents.delete_draft('brd', project_id)
+
+async def generate_prd_background(project_id: str, use_cache: bool = True):
     """Background task to generate PRD"""
-    try:
-        prd_result = await prd_service.generate_prd(
-            brd_content,
-            project_name,
-            project_id
-        )
-        
-        if prd_result['status'] == 'success':
-            # Update the PRD record with the content and 'completed' status
-            supabase.table('prd').update({
-                'prd_markdown': prd_result['content'],
-                'status': 'completed'
-            }).eq('project_id', project_id).execute()
-        else:
-            # Update the status to 'failed'
-            supabase.table('prd').update({'status': 'failed'}).eq('project_id', project_id).execute()
-    except Exception as e:
-        # Update the status to 'failed'
-        supabase.table('prd').update({'status': 'failed'}).eq('project_id', project_id).execute()
+    project_data = await _get_project(project_id)
+    brd = await documents.get_document('brd', project_id)
+
+    if not brd or brd['status'] != 'completed':
+        raise ValueError("BRD not found or not completed")
+
+    prd_result = await prd_service.generate_prd(
+        brd['brd_markdown'],
+        project_data['name'],
+        project_id,
+        use_cache=use_cache,
+        on_partial=DraftWriter('prd', project_id)
+    )
+
+    if prd_result['status'] != 'success':
+        raise JobFailed(prd_result.get('error', 'PRD generation failed'))
+
+    # Update the PRD record with the content and 'completed' status
+    await documents.update_document('prd', project_id, {
+        'prd_markdown': prd_result['content'],
+        'status': 'completed'
+    })
+    await documents.delete_draft('prd', project_id)
 
 # Generate BRD than PRD
-async def generate_brd_and_prd_background(project_id: str, project_data: dict):
+async def generate_brd_and_prd_background(project_id: str, use_cache: bool = True, draft: bool = False):
     """Background task to generate BRD and then PRD"""
-    # Generate BRD first
-    await generate_brd_background(project_id, project_data)
-    
-    # Get the BRD result to check if we should proceed with PRD
-    brd_result = supabase.table('brd').select('*').eq('project_id', project_id).maybe_single().execute()
-    
-    # Only generate PRD if BRD completed successfully
-    if brd_result and brd_result.data['status'] == 'completed':
-        await generate_prd_background(
-            project_id,
-            brd_result.data['brd_markdown'],
-            project_data['name']
-        )
-    else:
-        supabase.table('prd').update({'status': 'failed'}).eq('project_id', project_id).execute()
+    # Generate BRD first, unless a previous attempt already finished it
+    brd = await documents.get_document('brd', project_id, 'status')
+    if not brd or brd['status'] != 'completed':
+        await generate_brd_background(project_id, use_cache, draft)
 
+    await generate_prd_background(project_id, use_cache)
 
-async def generate_tasks_background(project_id: str, prd_content: str):
+
+async def generate_tasks_background(project_id: str, use_cache: bool = True):
     """Background task to generate tasks"""
-    try:
-        # Update project status to in_progress
-        supabase.table('projects').update({
-            'tasks_generation_status': 'in_progress'
-        }).eq('id', project_id).execute()
-        
-        task_result = await task_service.generate_tasks(prd_content, project_id)
-        
-        if 'items' in task_result:
-            # Convert LLM generated tasks to task records
-            task_records = llm_to_tasks(task_result['items'], project_id)
-            
-            # Insert tasks into the database
-            supabase.table('tasks').insert(task_records).execute()
-            
-            # Update project status to completed and store raw tasks
-            supabase.table('projects').update({
-                'tasks_generation_status': 'completed',
-                'tasks_generated': task_records
-            }).eq('id', project_id).execute()
-        else:
-            # Update project status to failed
-            supabase.table('projects').update({
-                'tasks_generation_status': 'failed'
-            }).eq('id', project_id).execute()
-    except Exception as e:
-        # Update project status to failed
-        supabase.table('projects').update({
-            'tasks_generation_status': 'failed'
-        }).eq('id', project_id).execute()
-
-async def validate_market_background(project_id: str, project_objective: str):
-    """Background task to validate market"""
-    try:
-        market_result = await market_validation_service.run_market_validation(project_objective, project_id)
-        
-        if market_result['status'] == 'success':
-            # Update the market research record with the content and 'completed' status
-            supabase.table('market_research').update({
-                'report_markdown': market_result['content'],
-                'status': 'completed'
-            }).eq('project_id', project_id).execute()
-        else:
-            # Update the status to 'failed'
-            supabase.table('market_research').update({'status': 'failed'}).eq('project_id', project_id).execute()
-    except Exception as e:
-        # Update the status to 'failed'
-        supabase.table('market_research').update({'status': 'failed'}).eq('project_id', project_id).execute()
-
-async def setup_github_repository_background(project_id: str, github_token: str):
-    """Background task to set up GitHub repository"""
-    try:
-        # Get project details and PRD content
-        project = supabase.table('projects').select('*').eq('id', project_id).single().execute()
-        prd = supabase.table('prd').select('*').eq('project_id', project_id).single().execute()
-        
-        if not project.data or not prd.data or prd.data['status'] != 'completed':
-            raise ValueError("Project or PRD not found or PRD not completed")
-        
-        # Update github_setup status to in_progress
-        supabase.table('github_setup').update({
-            'status': 'in_progress'
-        }).eq('project_id', project_id).execute()
-        
-        # Run repository setup
-        result = await github_setup_service.setup_repository(
-            project_details=project.data,
-            prd_content=prd.data['prd_markdown'],
-            github_token=github_token,
-            project_id=project_id
+    await _get_project(project_id)
+    prd = await documents.get_document('prd', project_id)
+
+    if not prd or prd['status'] != 'completed':
+        raise ValueError("PRD not found or not completed")
+
+    task_result = await task_service.generate_tasks(prd['prd_markdown'], project_id, use_cache=use_cache)
+
+    if 'items' not in task_result:
+        raise JobFailed("Task generation returned no items")
+
+    # Convert LLM generated tasks to task records
+    task_records = llm_to_tasks(task_result['items'], project_id)
+
+    # Insert tasks, store raw tasks and mark the project completed in one transaction
+    await tasks.import_generated_tasks(project_id, task_records)
+
+async def validate_market_background(project_id: str, use_cache: bool = True, draft: bool = False):
+    """Background task to validate market, draft mode reuses the report of a similar project"""
+    project_data = await _get_project(project_id)
+
+    # Same reuse of a similar project's document as for the BRD
+    match = await semantic_cache.find(project_id, project_data['objective'], 'market_research', search=use_cache)
+    if match and draft:
+        report_content = match['content']
+    else:
+        market_result = await market_validation_service.run_market_validation(
+            project_data['objective'],
+            project_id,
+            reference=compact_reference(match['content']) if match else None,
+            on_partial=DraftWriter('market_research', project_id)
         )
-        
-        if result['status'] == 'success':
-            # Update github_setup record with results
-            supabase.table('github_setup').update({
-                'repository_url': result['repository_url'],
-                'status': 'completed'
-            }).eq('project_id', project_id).execute()
-        else:
-            # Update status to failed
-            supabase.table('github_setup').update({
-                'status': 'failed'
-            }).eq('project_id', project_id).execute()
-            
-    except Exception as e:
-        # Update status to failed
-        supabase.table('github_setup').update({
-            'status': 'failed'
-        }).eq('project_id', project_id).execute()
+
+        if market_result['status'] != 'success':
+            raise JobFailed(market_result.get('error', 'Market validation failed'))
+        report_content = market_result['content']
+
+    # Update the market research record with the content and 'completed' status
+    await documents.update_document('market_research', project_id, {
+        'report_markdown': report_content,
+        'status': 'completed'
+    })
+    await documents.delete_draft('market_research', project_id)
+
+async def setup_github_repository_background(project_id: str, user_id: Optional[str] = None):
+    """Background task to set up GitHub repository, as the project owner unless user_id is given"""
+    # Get project details and PRD content
+    project = await _get_project(project_id)
+    prd = await documents.get_document('prd', project_id)
+
+    if not prd or prd['status'] != 'completed':
+        raise ValueError("PRD not found or not completed")
+
+    # The token is looked up at run time so it is never stored in the job payload
+    github_token = await get_github_token(user_id or project['user_id'])
+    if not github_token:
+        raise ValueError("GitHub account is not connected")
+
+    # Run repository setup
+    result = await github_setup_service.setup_repository(
+        project_details=project,
+        prd_content=prd['prd_markdown'],
+        github_token=github_token,
+        project_id=project_id
+    )
+
+    if result['status'] != 'success':
+        raise JobFailed(result.get('error', 'GitHub repository setup failed'))
+
+    # Update github_setup record with results
+    await documents.update_document('github_setup', project_id, {
+        'repository_url': result['repository_url'],
+        'status': 'completed'
+    })
 
 async def generate_preview_background(project_id: str):
     """Background task to generate preview/mockup"""
-    try:
-        # Get project details and BRD content
-        project = supabase.table('projects').select('*').eq('id', project_id).single().execute()
-        brd = supabase.table('brd').select('*').eq('project_id', project_id).single().execute()
-        
-        if not project.data or not brd.data or brd.data['status'] != 'completed':
-            raise ValueError("Project or BRD not found or BRD not completed")
-        
-        # Run preview generation
-        result = await preview_service.generate_preview(
-            project_details=project.data,
-            brd_content=brd.data['brd_markdown'],
-            user_id=project_id
-        )
-        
-        if result['status'] == 'success':
-            # Update mockup record with results
-            supabase.table('mockup').update({
-                'preview_url': result['preview_url'],
-                'tool_used': 'lovable',
-                'status': 'completed'
-            }).eq('project_id', project_id).execute()
-        else:
-            # Update status to failed
-            supabase.table('mockup').update({
-                'status': 'failed'
-            }).eq('project_id', project_id).execute()
-            
-    except Exception as e:
-        # Update status to failed
-        supabase.table('mockup').update({
-            'status': 'failed'
-        }).eq('project_id', project_id).execute() 
\ No newline at end of file
+    # Get project details and BRD content
+    project = await _get_project(project_id)
+    brd = await documents.get_document('brd', project_id)
+
+    if not brd or brd['status'] != 'completed':
+        raise ValueError("BRD not found or not completed")
+
+    # Run preview generation
+    result = await preview_service.generate_preview(
+        project_details=project,
+        brd_content=brd['brd_markdown'],
+        user_id=project_id
+    )
+
+    if result['status'] != 'success':
+        raise JobFailed(result.get('error', 'Preview generation failed'))
+
+    # Update mockup record with results
+    await documents.update_document('mockup', project_id, {
+        'preview_url': result['preview_url'],
+        'tool_used': 'lovable',
+        'status': 'completed'
+    })
+
+
+# Failure handlers, run once a job has used all of its attempts
+
+async def mark_brd_failed(project_id: str, **_):
+    await documents.set_document_status('brd', project_id, 'failed')
+    await documents.delete_draft('brd', project_id)
+
+async def mark_prd_failed(project_id: str, **_):
+    await documents.set_document_status('prd', project_id, 'failed')
+    await documents.delete_draft('prd', project_id)
+
+async def mark_brd_and_prd_failed(project_id: str, **_):
+    # Keep a BRD that was completed before the PRD step failed
+    brd = await documents.get_document('brd', project_id, 'status')
+    if not brd or brd['status'] != 'completed':
+        await documents.set_document_status('brd', project_id, 'failed')
+        await documents.delete_draft('brd', project_id)
+    await documents.set_document_status('prd', project_id, 'failed')
+    await documents.delete_draft('prd', project_id)
+
+async def mark_tasks_failed(project_id: str, **_):
+    await projects.update_project(project_id, {
+        'tasks_generation_status': 'failed'
+    })
+
+async def mark_market_failed(project_id: str, **_):
+    await documents.set_document_status('market_research', project_id, 'failed')
+    await documents.delete_draft('market_research', project_id)
+
+async def mark_github_setup_failed(project_id: str, **_):
+    await documents.set_document_status('github_setup', project_id, 'failed')
+
+async def mark_preview_failed(project_id: str, **_):
+    await documents.set_document_status('mockup', project_id, 'failed')
@@ -0,0 +1,86 @@
+"""
+In-process caching helpers.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after a fixed TTL.
+
+    Hit, miss and eviction counters are kept so callers can confirm the cache
+    is actually saving work.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid after it was stored
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` when missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop ``key`` from the cache, returning whether it was present"""
+        with self._lock:
+            self.invalidations += 1
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
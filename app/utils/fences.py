@@ -0,0 +1,200 @@
+"""
+Code fence scanning of model output.
+
+Models wrap documents in a ```markdown fence and JSON in a ```json fence,
+often with prose around it, and reports contain fenced mermaid or code blocks
+of their own. ``FenceScanner`` reads the output line by line, once, keeping
+only counters, so it can be fed the chunks of a streamed response as they
+arrive and asked for the unwrapped document at any point.
+
+The document wrapper is the first ```markdown / ```md fence, or a bare ```
+fence on the first line. Blocks opened inside it carry a language and are
+closed by the next bare fence, or come in pairs of bare fences, so with no
+language block open the wrapper is closed after an odd number of bare
+fences, by the last of them. A language fence met in that state opens a
+block after the wrapper, in trailing prose, so the wrapper ends at the bare
+fence before it and the rest of the output is not tracked. A wrapper left
+open by a truncated response runs to the end of the output.
+"""
+import copy
+import json
+from typing import Any, Optional
+
+FENCE = "```"
+MARKDOWN_INFO = ("markdown", "md")
+# Only the start of a line is kept, enough to tell a fence and its language
+_LINE_PREFIX = 256
+
+
+class FenceScanner:
+    """Incremental scanner of the fenced blocks of a growing text"""
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._text: Optional[str] = ""
+        self.length = 0
+        # Start offset and contents of the line not terminated yet
+        self._line_start = 0
+        self._line = ""
+        self._seen_content = False
+
+        # Document wrapper: offset its body starts and ends at, the end None until it is
+        # known, whether a language block or an odd run of bare fences is open in it,
+        # and the last bare fence
+        self.wrapper_start: Optional[int] = None
+        self.wrapper_end: Optional[int] = None
+        self._inner_open = False
+        self._bare_open = False
+        self._last_bare: Optional[int] = None
+
+        # First ```json block: body start and end, the end None while open
+        self.json_start: Optional[int] = None
+        self.json_end: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+        return self._text
+
+    def feed(self, chunk: str) -> "FenceScanner":
+        """Scan the next chunk of the text"""
+        if not chunk:
+            return self
+        self._chunks.append(chunk)
+        self._text = None
+        offset = self.length
+        self.length += len(chunk)
+
+        pos = 0
+        if self._line_start < offset:
+            # Finish the line the previous chunk ended in
+            newline = chunk.find("\n")
+            if newline < 0:
+                self._keep(chunk[:_LINE_PREFIX])
+                return self
+            self._keep(chunk[:min(newline, _LINE_PREFIX)])
+            self._end_line(offset + newline + 1)
+            pos = newline + 1
+
+        # Only lines holding a fence are looked at, the rest is skipped at C speed
+        while True:
+            fence = chunk.find(FENCE, pos)
+            end = len(chunk) if fence < 0 else fence
+            line_start = chunk.rfind("\n", pos, end) + 1 or pos
+            if not self._seen_content and not chunk[pos:line_start].isspace() and line_start > pos:
+                self._seen_content = True
+            if fence < 0:
+                self._line_start, self._line = offset + line_start, chunk[line_start:line_start + _LINE_PREFIX]
+                return self
+
+            newline = chunk.find("\n", fence)
+            self._line_start = offset + line_start
+            if newline < 0:
+                self._line = chunk[line_start:line_start + _LINE_PREFIX]
+                return self
+            # A fence in the middle of a line is text, _end_line tells them apart
+            self._line = chunk[line_start:min(newline, line_start + _LINE_PREFIX)]
+            self._end_line(offset + newline + 1)
+            pos = newline + 1
+
+    def _keep(self, part: str) -> None:
+        if len(self._line) < _LINE_PREFIX:
+            self._line = (self._line + part)[:_LINE_PREFIX]
+
+    def _end_line(self, next_line_start: int) -> None:
+        line, line_start = self._line.strip(), self._line_start
+        self._line, self._line_start = "", next_line_start
+
+        if not line.startswith(FENCE):
+            if line:
+                self._seen_content = True
+            return
+        info = line[len(FENCE):].strip().lower()
+        first_line = not self._seen_content
+        self._seen_content = True
+
+        if self.wrapper_start is None:
+            if info in MARKDOWN_INFO or (not info and first_line):
+                self.wrapper_start = next_line_start
+        elif self.wrapper_end is not None:
+            pass
+        elif self._inner_open:
+            self._inner_open = bool(info)
+        elif info:
+            if self._bare_open:
+                self.wrapper_end = self._last_bare
+            else:
+                self._inner_open = True
+        else:
+            self._bare_open = not self._bare_open
+            self._last_bare = line_start
+
+        if self.json_start is None:
+            if info == "json":
+                self.json_start = next_line_start
+        elif self.json_end is None and not info:
+            self.json_end = line_start
+
+    def _settled(self) -> "FenceScanner":
+        """The scanner with a trailing unterminated fence line counted, the text may end on one"""
+        if not self._line.strip().startswith(FENCE):
+            return self
+        settled = copy.copy(self)
+        settled._end_line(self.length)
+        return settled
+
+    @property
+    def wrapper_closed(self) -> bool:
+        return self.wrapper_start is not None and (self.wrapper_end is not None or self._bare_open)
+
+    def markdown(self) -> str:
+        """
+        The document without its wrapper fence.
+
+        While streaming this is the document so far, including the line being
+        written. Without a wrapper the whole text is the document.
+        """
+        text = self.text
+        scanner = self._settled()
+        if scanner.wrapper_start is None:
+            return text.strip()
+        if scanner.wrapper_end is not None:
+            end = scanner.wrapper_end
+        else:
+            end = scanner._last_bare if scanner.wrapper_closed else len(text)
+        return text[scanner.wrapper_start:end].strip()
+
+    def json_text(self) -> str:
+        """Body of the first ```json block, or the whole text without one"""
+        text = self.text
+        scanner = self._settled()
+        if scanner.json_start is None:
+            return text
+        end = scanner.json_end if scanner.json_end is not None else len(text)
+        return text[scanner.json_start:end]
+
+
+def extract_markdown(content: str) -> str:
+    """The document in model output, without the fence the model may have wrapped it in"""
+    return FenceScanner().feed(content).markdown()
+
+
+def decode_json(content: str) -> Any:
+    """
+    Decode the first JSON object or array in model output, at any depth.
+
+    The value is looked for in the first ```json block, or in the whole text
+    without one, and decoded from its first ``{`` or ``[`` to wherever it
+    ends, so prose after it is ignored.
+
+    Raises:
+        ValueError: If there is no valid JSON value there
+    """
+    text = FenceScanner().feed(content).json_text()
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object or array found")
+    value, _ = json.JSONDecoder().raw_decode(text, min(starts))
+    return value
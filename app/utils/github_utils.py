@@ -1,17 +1,20 @@
 import httpx
 from fastapi import HTTPException
-from ..config import supabase
+from ..repositories import users
 
-def get_github_token(user_id: str):
+# Scopes the repository setup needs
+GITHUB_REQUIRED_SCOPES = {'repo', 'admin:repo_hook', 'read:user', 'user:email'}
+
+async def get_github_token(user_id: str):
     """Get GitHub access token for a user from the database"""
-    github_token = supabase.table('users').select('github_access_token').eq('id', user_id).maybe_single().execute().data
+    github_token = await users.get_user(user_id, 'github_access_token')
     
     if not github_token or not github_token['github_access_token']:
         return None
     
     return github_token['github_access_token']
 
-def validate_github_token(token: str, required_scopes: set = None):
+async def validate_github_token(token: str, required_scopes: set = None):
     """
     Validate GitHub token and check if it has required scopes.
     Returns user info if valid, raises HTTPException otherwise.
@@ -20,9 +23,10 @@ def validate_github_token(token: str, required_scopes: set = None):
         raise HTTPException(status_code=400, detail="GitHub token not found")
     
     # Check if token is valid by making a request to GitHub API
-    user_info_response = httpx.get("https://api.github.com/user", headers={
-        "Authorization": f"Bearer {token}"
-    })
+    async with httpx.AsyncClient() as client:
+        user_info_response = await client.get("https://api.github.com/user", headers={
+            "Authorization": f"Bearer {token}"
+        })
     
     if user_info_response.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid GitHub token")
@@ -38,4 +42,15 @@ def validate_github_token(token: str, required_scopes: set = None):
                 detail=f"GitHub token has insufficient permissions. Missing scopes: {', '.join(missing_scopes)}"
             )
     
-    return user_info_response.json() 
\ No newline at end of file
+    return user_info_response.json()
+
+async def has_github_access(user_id: str) -> bool:
+    """Whether the user connected a valid GitHub token with ``GITHUB_REQUIRED_SCOPES``"""
+    token = await get_github_token(user_id)
+    if not token:
+        return False
+    try:
+        await validate_github_token(token, GITHUB_REQUIRED_SCOPES)
+    except (HTTPException, httpx.HTTPError):
+        return False
+    return True
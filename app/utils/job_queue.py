@@ -0,0 +1,53 @@
+"""
+AI job types and queueing helpers.
+
+Request handlers call ``enqueue_job`` and return immediately, the work itself
+is done by ``app/worker.py``.
+"""
+import random
+from typing import Optional
+
+from ..config import JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_DELAY, JOB_RETRY_MAX_DELAY
+from ..repositories import jobs
+from . import background_tasks
+
+# Job type -> (handler, failure handler)
+JOB_HANDLERS = {
+    'brd': (background_tasks.generate_brd_background, background_tasks.mark_brd_failed),
+    'prd': (background_tasks.generate_prd_background, background_tasks.mark_prd_failed),
+    'brd_and_prd': (background_tasks.generate_brd_and_prd_background, background_tasks.mark_brd_and_prd_failed),
+    'tasks': (background_tasks.generate_tasks_background, background_tasks.mark_tasks_failed),
+    'market_validation': (background_tasks.validate_market_background, background_tasks.mark_market_failed),
+    'github_setup': (background_tasks.setup_github_repository_background, background_tasks.mark_github_setup_failed),
+    'preview': (background_tasks.generate_preview_background, background_tasks.mark_preview_failed),
+}
+
+# Job types run once: a retried preview would start another Lovable project, and
+# an earlier attempt's project cannot be found again
+SINGLE_ATTEMPT_JOBS = {'preview'}
+
+
+async def enqueue_job(job_type: str, project_id: str, **payload) -> Optional[str]:
+    """
+    Queue an AI generation job for a project.
+
+    Args:
+        job_type: One of ``JOB_HANDLERS``
+        project_id: Project the job works on
+        **payload: Extra keyword arguments for the handler, must be JSON serializable
+
+    Jobs are retried up to ``JOB_MAX_ATTEMPTS`` times, except ``SINGLE_ATTEMPT_JOBS``.
+
+    Returns:
+        Optional[str]: The job id, None if the same job is already queued or running
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    max_attempts = 1 if job_type in SINGLE_ATTEMPT_JOBS else JOB_MAX_ATTEMPTS
+    return await jobs.enqueue_job(job_type, project_id, payload, max_attempts)
+
+
+def retry_delay(attempt: int) -> int:
+    """Exponential backoff with full jitter for the given (1-based) attempt, in seconds"""
+    ceiling = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return random.randint(JOB_RETRY_BASE_DELAY // 2, max(JOB_RETRY_BASE_DELAY // 2, ceiling))
@@ -0,0 +1,262 @@
+"""
+Tolerant JSON parsing for model output.
+
+Models asked for JSON without provider-enforced structured output often wrap
+it in a code fence or prose, leave trailing commas, use single quotes or
+Python literals, forget to escape quotes and newlines inside strings, or get
+cut off by the output token limit. ``repair_json`` rewrites such output into
+valid JSON in one pass over the text, with a stack of open containers instead
+of regex backtracking, so a response with a small defect no longer fails the
+whole generation.
+"""
+import json
+from typing import Any
+
+from .fences import decode_json
+
+_LITERALS = {
+    'true': 'true', 'false': 'false', 'null': 'null',
+    'True': 'true', 'False': 'false', 'None': 'null',
+    'NaN': 'null', 'Infinity': 'null',
+}
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_STRUCTURAL_START = set('"\'{[-0123456789')
+_VALUE_START = _STRUCTURAL_START | {key[0] for key in _LITERALS}
+_NUMBER_CHARS = set('+-0123456789.eE')
+_NUMBER_START = set('+-0123456789.')
+_COMMENTS = ('//', '/*')
+
+
+def _next_significant(text: str, i: int) -> int:
+    """Index of the first non-whitespace character at or after ``i``"""
+    n = len(text)
+    while i < n and text[i].isspace():
+        i += 1
+    return i
+
+
+def _find_start(text: str) -> int:
+    """Index of the first ``{`` or ``[`` that opens JSON rather than prose like ``[Project Name]``"""
+    for i, char in enumerate(text):
+        if char in '{[':
+            j = _next_significant(text, i + 1)
+            if char == '{' or j == len(text) or text[j] in _VALUE_START or text[j] in '}]':
+                return i
+    return -1
+
+
+def _closes_string(text: str, i: int) -> bool:
+    """Whether the quote at ``i`` ends the string, rather than being an unescaped quote inside it"""
+    j = _next_significant(text, i + 1)
+    if j == len(text) or text[j] in ':}]' or text[j] == '`' or text.startswith(_COMMENTS, j):
+        return True
+    if text[j] == ',':
+        k = _next_significant(text, j + 1)
+        if k == len(text) or text[k] in _STRUCTURAL_START or text[k] in '}]' or text.startswith(_COMMENTS, k):
+            return True
+        # A literal or a bare key, rather than prose following a quoted word
+        m = k
+        while m < len(text) and (text[m].isalnum() or text[m] in '_$'):
+            m += 1
+        after = _next_significant(text, m)
+        if m == k or after == len(text):
+            return m > k
+        return text[after] == ':' or (text[k:m] in _LITERALS and text[after] in ',}]')
+    return False
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite model output into valid JSON.
+
+    The first object or array is taken and anything after it is dropped.
+    Comments and stray characters are skipped, missing commas and colons are
+    added, trailing commas removed, single quoted strings, bare keys and
+    Python literals converted, control characters and unescaped quotes inside
+    strings escaped, and containers left open by a truncated response closed.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        str: JSON text, not guaranteed to parse if the output is too damaged
+
+    Raises:
+        ValueError: If the text contains no object or array
+    """
+    start = _find_start(text)
+    if start < 0:
+        raise ValueError("No JSON object or array found")
+
+    out: list[str] = []
+    # Open containers as [opener, state, count], the state being what is expected next:
+    # 'key', 'colon' or 'value' (objects), 'value' (arrays), or 'after' a complete entry
+    stack: list[list] = []
+    n = len(text)
+    i = start
+
+    def begin_value() -> bool:
+        """Emit what the next token needs before it, returns whether the token is an object key"""
+        if not stack:
+            return False
+        top = stack[-1]
+        if top[0] == '{':
+            if top[1] in ('key', 'after'):
+                if top[2]:
+                    out.append(',')
+                top[1] = 'key'
+                return True
+            if top[1] == 'colon':
+                out.append(':')
+                top[1] = 'value'
+        elif top[2]:
+            out.append(',')
+        return False
+
+    def end_value(is_key: bool) -> None:
+        if stack:
+            top = stack[-1]
+            if is_key:
+                top[1] = 'colon'
+            else:
+                top[1] = 'after'
+                top[2] += 1
+
+    def close_top() -> None:
+        opener, state, _ = stack.pop()
+        if opener == '{':
+            if state == 'colon':
+                out.append(':null')
+            elif state == 'value':
+                out.append('null')
+        out.append('}' if opener == '{' else ']')
+        end_value(False)
+
+    while i < n:
+        char = text[i]
+
+        if char in '"\'':
+            is_key = begin_value()
+            quote = char
+            out.append('"')
+            i += 1
+            closed = False
+            while i < n:
+                char = text[i]
+                if char == '\\' and i + 1 < n:
+                    escaped = text[i + 1]
+                    if escaped in _VALID_ESCAPES:
+                        out.append(char + escaped)
+                    elif escaped == "'":
+                        out.append("'")
+                    else:
+                        out.append('\\\\' + escaped)
+                    i += 2
+                    continue
+                if char == quote and _closes_string(text, i):
+                    closed = True
+                    i += 1
+                    break
+                if char in '"\\':
+                    out.append('\\' + char)
+                elif char in _ESCAPES:
+                    out.append(_ESCAPES[char])
+                elif char < ' ':
+                    out.append(f'\\u{ord(char):04x}')
+                else:
+                    out.append(char)
+                i += 1
+            out.append('"')
+            end_value(is_key)
+            if not closed:
+                break
+            continue
+
+        if char in '{[':
+            begin_value()
+            stack.append([char, 'key' if char == '{' else 'value', 0])
+            out.append(char)
+        elif char in '}]':
+            opener = '{' if char == '}' else '['
+            if any(entry[0] == opener for entry in stack):
+                # Close anything left open inside the container as well
+                while stack[-1][0] != opener:
+                    close_top()
+                close_top()
+                if not stack:
+                    break
+        elif char == ':':
+            if stack and stack[-1][0] == '{' and stack[-1][1] == 'colon':
+                out.append(':')
+                stack[-1][1] = 'value'
+        elif char == ',':
+            if stack and stack[-1][1] == 'after':
+                stack[-1][1] = 'key' if stack[-1][0] == '{' else 'value'
+        elif char == '/' and text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        elif char == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        elif char == '`':
+            # Closing code fence of a truncated response
+            break
+        elif char in _NUMBER_START:
+            j = i
+            while j < n and text[j] in _NUMBER_CHARS:
+                j += 1
+            number = text[i:j].lstrip('+').rstrip('.eE+-')
+            # Skips stray dashes and ellipses
+            if any(c.isdigit() for c in number) and not (stack and stack[-1][0] == '{' and stack[-1][1] in ('key', 'after')):
+                begin_value()
+                if number.startswith('-.'):
+                    number = '-0' + number[1:]
+                elif number.startswith('.'):
+                    number = '0' + number
+                out.append(number)
+                end_value(False)
+            i = j
+            continue
+        elif char.isalpha() or char in '_$':
+            is_key = begin_value()
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in '_$-'):
+                j += 1
+            word = text[i:j]
+            if is_key:
+                out.append(json.dumps(word))
+            else:
+                out.append(_LITERALS.get(word, json.dumps(word)))
+            end_value(is_key)
+            i = j
+            continue
+        i += 1
+
+    while stack:
+        close_top()
+    return ''.join(out)
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parse model output as JSON, repairing it if it is not valid as is.
+
+    Raises:
+        ValueError: If the output cannot be repaired into valid JSON
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        # Valid JSON in a fence or prose, decoded at C speed
+        return decode_json(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON after repair: {e}")
@@ -0,0 +1,151 @@
+"""
+Local verification of Supabase access tokens.
+
+Tokens are checked in-process against the project's signing keys so that
+authenticated requests do not need a round trip to GoTrue. Keys are fetched
+once from the JWKS endpoint (or taken from the shared JWT secret for HS256
+projects), cached, and refreshed when a token carries an unknown ``kid``.
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+from jose import jwt
+from jose.exceptions import JWTError
+
+logger = logging.getLogger(__name__)
+
+# Asymmetric algorithms Supabase may sign with when using JWT signing keys, python-jose
+# cannot build EdDSA (OKP) keys so those tokens are left to GoTrue
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256"}
+
+
+class TokenVerificationUnavailable(Exception):
+    """Raised when a token cannot be checked locally and the caller should fall back to GoTrue."""
+
+
+class SupabaseJWTVerifier:
+    """Verify Supabase JWTs locally using cached signing keys."""
+
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str = None,
+        jwt_secret: str = None,
+        audience: str = "authenticated",
+        jwks_ttl: int = 3600,
+        min_refresh_interval: int = 30,
+    ):
+        """
+        Initialize the verifier.
+
+        Args:
+            supabase_url: Base URL of the Supabase project
+            supabase_key: API key sent along with the JWKS request
+            jwt_secret: Shared JWT secret for projects signing with HS256
+            audience: Expected ``aud`` claim
+            jwks_ttl: Seconds after which the cached key set is refreshed
+            min_refresh_interval: Minimum seconds between two JWKS fetches,
+                so tokens with bogus ``kid`` values cannot hammer GoTrue
+        """
+        self.jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        self.supabase_key = supabase_key
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.jwks_ttl = jwks_ttl
+        self.min_refresh_interval = min_refresh_interval
+
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _fetch_jwks(self) -> None:
+        """Fetch the key set from GoTrue and replace the cache"""
+        if not self.jwks_url:
+            raise TokenVerificationUnavailable("JWKS URL is not configured")
+
+        headers = {"apikey": self.supabase_key} if self.supabase_key else {}
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.get(self.jwks_url, headers=headers)
+            response.raise_for_status()
+            keys = response.json().get("keys", [])
+        except (httpx.HTTPError, ValueError) as e:
+            raise TokenVerificationUnavailable(f"Failed to fetch JWKS: {e}")
+        finally:
+            # Record the attempt even on failure so we back off properly
+            self._fetched_at = time.monotonic()
+
+        self._keys = {key["kid"]: key for key in keys if key.get("kid")}
+        logger.info(f"Loaded {len(self._keys)} signing key(s) from JWKS")
+
+    async def _get_signing_key(self, kid: Optional[str]) -> Dict[str, Any]:
+        """Return the JWK for ``kid``, refreshing the cache on a miss or once it expires"""
+        age = time.monotonic() - self._fetched_at
+        key = self._keys.get(kid) if kid else None
+        if key and age < self.jwks_ttl:
+            return key
+
+        async with self._lock:
+            # Another request may have refreshed the keys while we waited
+            age = time.monotonic() - self._fetched_at
+            key = self._keys.get(kid) if kid else None
+            if key and age < self.jwks_ttl:
+                return key
+
+            if age >= self.min_refresh_interval:
+                await self._fetch_jwks()
+                key = self._keys.get(kid) if kid else None
+
+        if not key:
+            raise TokenVerificationUnavailable(f"Unknown signing key id: {kid}")
+        return key
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token and return its claims.
+
+        Args:
+            token: Raw bearer token
+
+        Returns:
+            Decoded and validated claims
+
+        Raises:
+            JWTError: If the token is invalid (bad signature, expired, wrong audience)
+            TokenVerificationUnavailable: If the token cannot be checked locally
+        """
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise TokenVerificationUnavailable("SUPABASE_JWT_SECRET is not configured")
+            key = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self._get_signing_key(header.get("kid"))
+        else:
+            raise TokenVerificationUnavailable(f"Unsupported signing algorithm: {algorithm}")
+
+        claims = jwt.decode(token, key, algorithms=[algorithm], audience=self.audience)
+        if not claims.get("sub"):
+            raise JWTError("Token has no subject")
+        return claims
+
+
+def claims_to_user(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape verified claims like the payload returned by ``supabase.auth.get_user``"""
+    return {
+        "user": {
+            "id": claims["sub"],
+            "aud": claims.get("aud"),
+            "role": claims.get("role"),
+            "email": claims.get("email"),
+            "phone": claims.get("phone"),
+            "app_metadata": claims.get("app_metadata", {}),
+            "user_metadata": claims.get("user_metadata", {}),
+            "is_anonymous": claims.get("is_anonymous", False),
+        }
+    }
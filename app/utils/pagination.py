@@ -0,0 +1,49 @@
+"""
+Keyset (cursor) pagination helpers.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        created_at: ``created_at`` value of the last row
+        row_id: ``id`` of the last row, used as the tie breaker
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise ValueError("Invalid cursor")
+
+    # Both values end up inside a PostgREST filter string, so only accept
+    # a real timestamp and UUID
+    try:
+        datetime.fromisoformat(created_at)
+        row_id = str(uuid.UUID(row_id))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
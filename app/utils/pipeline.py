@@ -0,0 +1,131 @@
+"""
+Project generation pipeline.
+
+Declares every AI generation stage of a project together with the stages whose
+output it needs. A stage starts as soon as all of its inputs are completed, so
+independent branches (market validation next to the BRD, the preview next to
+the PRD) run at the same time. Each stage runs as its own job, so the worker's
+``WORKER_CONCURRENCY`` bounds how many run in parallel, and every stage keeps
+the queue's retries and leases.
+
+Stages are keyed by the record that holds their status: the document tables,
+plus ``tasks`` for ``projects.tasks_generation_status``.
+"""
+import asyncio
+from typing import Iterable
+
+from ..config import PIPELINE_STAGES
+from ..repositories import projects, documents, jobs
+from .job_queue import enqueue_job
+
+# Stage -> job that produces it and the stages it waits for
+PIPELINE = {
+    'brd': {'job_type': 'brd', 'after': ()},
+    'market_research': {'job_type': 'market_validation', 'after': ()},
+    'prd': {'job_type': 'prd', 'after': ('brd',)},
+    'mockup': {'job_type': 'preview', 'after': ('brd',)},
+    'tasks': {'job_type': 'tasks', 'after': ('prd',)},
+    'github_setup': {'job_type': 'github_setup', 'after': ('tasks',)},
+}
+
+# Stages that can reuse the document of a project with a similar objective in draft mode
+DRAFT_STAGES = ('brd', 'market_research')
+
+_unknown = set(PIPELINE_STAGES) - set(PIPELINE)
+if _unknown:
+    raise ValueError(f"Unknown pipeline stages in PIPELINE_STAGES: {', '.join(sorted(_unknown))}")
+
+
+def plan_stages(stages: Iterable[str] = PIPELINE_STAGES) -> list[str]:
+    """
+    Order the requested stages and drop any whose inputs are not part of the run.
+
+    Args:
+        stages: Stage names from ``PIPELINE``
+
+    Returns:
+        list[str]: Runnable stages in ``PIPELINE`` order
+    """
+    requested = set(stages)
+    planned = []
+    for name, stage in PIPELINE.items():
+        if name in requested and all(dep in planned for dep in stage['after']):
+            planned.append(name)
+    return planned
+
+
+async def get_stage_statuses(project_id: str) -> dict:
+    """Get the status of every stage of a project in one request, None for missing records"""
+    project = await projects.get_project(project_id, projects.STATUS_SELECT)
+    if not project:
+        return {}
+
+    statuses = projects.flatten_statuses(project)
+    del statuses['id']
+    return statuses
+
+
+async def start_pipeline(project_id: str, stages: Iterable[str] = PIPELINE_STAGES, draft: bool = False) -> list[str]:
+    """
+    Start the generation pipeline of a new project.
+
+    Creates a ``not_started`` record for every planned stage, then queues the
+    stages that have no inputs. With ``draft`` the ``DRAFT_STAGES`` reuse the
+    documents of a similar project when there is one.
+
+    Returns:
+        list[str]: The planned stages
+    """
+    planned = plan_stages(stages)
+    await asyncio.gather(*(
+        documents.create_document(name, project_id, 'not_started')
+        for name in planned if name != 'tasks'
+    ))
+    await advance_pipeline(project_id, planned, draft)
+    return planned
+
+
+async def pipeline_payload(project_id: str) -> dict:
+    """
+    Job payload for a stage started by hand, so it continues the project's pipeline.
+
+    Without it the stages waiting on a stage that failed for good would stay
+    ``not_started`` after the stage is generated again. Empty for projects
+    created without a pipeline.
+    """
+    stages = await jobs.get_pipeline(project_id)
+    return {'pipeline': stages} if stages else {}
+
+
+async def advance_pipeline(project_id: str, stages: Iterable[str], draft: bool = False) -> list[str]:
+    """
+    Queue every planned stage that has not started and whose inputs are completed.
+
+    Called after a pipeline job succeeds. Running it twice is harmless, the
+    queue keeps only one pending job per stage.
+
+    Returns:
+        list[str]: The stages that were started
+    """
+    stages = list(stages)
+    statuses = await get_stage_statuses(project_id)
+
+    ready = [
+        name for name in stages
+        if statuses.get(name) == 'not_started'
+        and all(statuses.get(dep) == 'completed' for dep in PIPELINE[name]['after'])
+    ]
+    await asyncio.gather(*(_start_stage(name, project_id, stages, draft) for name in ready))
+    return ready
+
+
+async def _start_stage(name: str, project_id: str, stages: list[str], draft: bool) -> None:
+    if name == 'tasks':
+        await projects.update_project(project_id, {'tasks_generation_status': 'in_progress'})
+    else:
+        await documents.set_document_status(name, project_id, 'in_progress')
+
+    payload = {'pipeline': stages}
+    if draft and name in DRAFT_STAGES:
+        payload['draft'] = True
+    await enqueue_job(PIPELINE[name]['job_type'], project_id, **payload)
@@ -0,0 +1,102 @@
+"""
+Fractional rank keys for ordering tasks.
+
+A rank is a base-62 string read as the digits after a radix point, so any two
+ranks have room for another one between them. Moving a task only rewrites its
+own rank instead of shifting the position of every task after it.
+
+Keys never end in ``0`` (``"A"`` and ``"A0"`` would be the same value with no
+key in between) and compare correctly with byte ordering, which is why the
+``tasks.rank`` column uses the ``"C"`` collation.
+"""
+from typing import Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Evenly spaced keys are 8 digits wide with 62^4 free slots between neighbours.
+# Must match task_rank() in migrations/task_ranks.sql
+RANK_WIDTH = 8
+RANK_STEP = BASE ** 4
+
+# Keys longer than this trigger a rebalance of the whole status column
+RANK_MAX_LENGTH = 24
+
+
+def initial_rank(index: int) -> str:
+    """
+    Get the evenly spaced rank of the ``index``-th task (1-based) in a column.
+
+    Args:
+        index: 1-based position of the task
+
+    Returns:
+        str: Rank key
+    """
+    if index < 1 or index * RANK_STEP >= BASE ** RANK_WIDTH:
+        raise ValueError(f"Rank index out of range: {index}")
+
+    value = index * RANK_STEP
+    digits = []
+    for _ in range(RANK_WIDTH):
+        value, remainder = divmod(value, BASE)
+        digits.append(DIGITS[remainder])
+    return ''.join(reversed(digits)).rstrip('0')
+
+
+def _validate(key: str) -> None:
+    if not key or key.endswith('0') or any(ch not in DIGITS for ch in key):
+        raise ValueError(f"Invalid rank: {key!r}")
+
+
+def _midpoint(lower: str, upper: Optional[str]) -> str:
+    """Midpoint of two digit strings, ``lower`` may be empty and ``upper`` None for the ends"""
+    if upper is not None:
+        # Skip the shared prefix, padding lower with zeros
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else '0') == upper[n]:
+            n += 1
+        if n > 0:
+            return upper[:n] + _midpoint(lower[n:], upper[n:])
+
+    low = DIGITS.index(lower[0]) if lower else 0
+    high = DIGITS.index(upper[0]) if upper is not None else BASE
+
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+
+    # Adjacent first digits
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    return DIGITS[low] + _midpoint(lower[1:], None)
+
+
+def rank_between(lower: Optional[str], upper: Optional[str]) -> str:
+    """
+    Get a rank that sorts strictly between two ranks.
+
+    Args:
+        lower: Rank of the task above, None when moving to the top
+        upper: Rank of the task below, None when moving to the bottom
+
+    Returns:
+        str: New rank key
+
+    Raises:
+        ValueError: If a key is invalid or ``lower`` does not sort before ``upper``
+    """
+    if lower is not None:
+        _validate(lower)
+    if upper is not None:
+        _validate(upper)
+    if lower is not None and upper is not None and lower >= upper:
+        raise ValueError(f"Rank {lower!r} does not sort before {upper!r}")
+
+    if lower is None and upper is None:
+        return initial_rank(1)
+    return _midpoint(lower or '', upper)
+
+
+def needs_rebalance(rank: str) -> bool:
+    """Whether a key has grown long enough that its column should be respaced"""
+    return len(rank) > RANK_MAX_LENGTH
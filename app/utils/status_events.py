@@ -0,0 +1,242 @@
+"""
+Push channel for generation status changes.
+
+Status changes of the generation tables are recorded in ``status_events`` and
+announced with Postgres NOTIFY (``migrations/status_events.sql``). Each API
+process keeps one LISTEN connection, started with the first subscriber, and
+fans the events out to the Server-Sent Events connections of the user they
+belong to, so clients no longer need to poll project details for status.
+
+Clients reconnecting with ``Last-Event-ID`` get the events they missed from
+the table. The same replay covers a connection that fell behind its buffer or
+a LISTEN connection that had to reconnect.
+
+The same connection LISTENs for draft writes (``migrations/document_drafts.sql``),
+and ``watch`` wakes the ``/stream`` endpoints of a project on its status and
+draft changes, so they read the draft when it changes instead of polling it.
+"""
+import re
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from typing import AsyncIterator, Optional
+
+import psycopg
+
+from ..config import STATUS_EVENTS_DB_URL, STATUS_EVENT_QUEUE_SIZE, STREAM_HEARTBEAT_INTERVAL
+from ..repositories import status_events
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'generation_status'
+DRAFT_CHANNEL = 'document_draft'
+# Reconnect delay of the LISTEN connection, doubled up to the maximum
+_RETRY_DELAY = 1.0
+_MAX_RETRY_DELAY = 30.0
+
+# Put in a subscriber's queue when events may have been missed
+RESYNC = None
+
+
+def _dsn(url: str) -> str:
+    # POSTGRES_CONNECTION is a SQLAlchemy URL, psycopg expects a plain one
+    return re.sub(r"^postgresql\+\w+://", "postgresql://", url)
+
+
+class StatusHub:
+    """One LISTEN connection per process, fanned out to per-user subscriber queues"""
+
+    def __init__(self, db_url: Optional[str] = STATUS_EVENTS_DB_URL, queue_size: int = STATUS_EVENT_QUEUE_SIZE):
+        self.db_url = db_url
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._watchers: dict[str, set[asyncio.Event]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+        self._stats = {'notifications': 0, 'delivered': 0, 'overflows': 0, 'reconnects': 0, 'draft_notifications': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_url)
+
+    def _start(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Register a queue receiving the user's events, starting the listener if needed"""
+        self._start()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def watch(self, project_id: str) -> asyncio.Event:
+        """Register an event set on every status or draft change of the project, starting the listener if needed"""
+        self._start()
+        event = asyncio.Event()
+        self._watchers[project_id].add(event)
+        return event
+
+    def unwatch(self, project_id: str, event: asyncio.Event) -> None:
+        events = self._watchers.get(project_id)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del self._watchers[project_id]
+
+    def _wake(self, project_id: Optional[str]) -> None:
+        for event in self._watchers.get(project_id, ()):
+            event.set()
+
+    def _dispatch_draft(self, payload: str) -> None:
+        self._stats['draft_notifications'] += 1
+        try:
+            self._wake(json.loads(payload).get('project_id'))
+        except ValueError:
+            logger.warning(f"Ignoring malformed draft notification: {payload[:200]}")
+
+    def _dispatch(self, payload: str) -> None:
+        self._stats['notifications'] += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed status notification: {payload[:200]}")
+            return
+
+        self._wake(event.get('project_id'))
+        for queue in self._subscribers.get(event.get('user_id'), ()):
+            try:
+                queue.put_nowait(event)
+                self._stats['delivered'] += 1
+            except asyncio.QueueFull:
+                # A slow client catches up from the table instead of growing the buffer
+                self._stats['overflows'] += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _resync_all(self) -> None:
+        for events in self._watchers.values():
+            for event in events:
+                event.set()
+        for queues in self._subscribers.values():
+            for queue in queues:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def _listen(self) -> None:
+        delay = _RETRY_DELAY
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(_dsn(self.db_url), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    await conn.execute(f"LISTEN {DRAFT_CHANNEL}")
+                    if connected_before:
+                        # Notifications sent while disconnected are lost, replay them from the table
+                        self._stats['reconnects'] += 1
+                        self._resync_all()
+                    connected_before = True
+                    delay = _RETRY_DELAY
+                    while True:
+                        async for notify in conn.notifies(timeout=STREAM_HEARTBEAT_INTERVAL):
+                            if notify.channel == DRAFT_CHANNEL:
+                                self._dispatch_draft(notify.payload)
+                            else:
+                                self._dispatch(notify.payload)
+                        # Idle, make sure the connection is still alive
+                        await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status event listener disconnected: {e}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _MAX_RETRY_DELAY)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            'listening': self._listener is not None and not self._listener.done(),
+            'users': len(self._subscribers),
+            'connections': sum(len(queues) for queues in self._subscribers.values()),
+            'watchers': sum(len(events) for events in self._watchers.values()),
+        }
+
+    async def aclose(self) -> None:
+        """Stop the listener"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+status_hub = StatusHub()
+
+
+def _event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: status\ndata: {json.dumps(event)}\n\n"
+
+
+async def follow_status(user_id: str, project_id: Optional[str] = None, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Follow a user's generation status events as Server-Sent Events.
+
+    Each ``status`` event carries ``id``, ``project_id``, ``kind`` (the stage,
+    ``tasks`` for task generation), ``status`` and ``created_at``. With
+    ``last_event_id`` the events recorded after it are sent first. A comment
+    line is sent every ``STREAM_HEARTBEAT_INTERVAL`` seconds without events.
+
+    Args:
+        user_id: Owner of the projects to follow
+        project_id: Only follow this project
+        last_event_id: Id of the last event the client received
+    """
+    # Subscribe before replaying so nothing falls between the two
+    queue = status_hub.subscribe(user_id)
+    last_id = last_event_id
+    sent: set[int] = set()
+
+    async def replay():
+        nonlocal last_id
+        for event in await status_events.list_events(user_id, last_id, project_id):
+            sent.add(event['id'])
+            last_id = max(last_id, event['id'])
+            yield _event(event)
+
+    try:
+        yield f"retry: {int(STREAM_HEARTBEAT_INTERVAL * 1000)}\n\n"
+        if last_id is not None:
+            async for chunk in replay():
+                yield chunk
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if event is RESYNC:
+                if last_id is not None:
+                    async for chunk in replay():
+                        yield chunk
+                continue
+
+            # Events can commit out of id order, only skip the ones already replayed
+            if event['id'] in sent or (project_id and event['project_id'] != project_id):
+                continue
+            last_id = event['id'] if last_id is None else max(last_id, event['id'])
+            yield _event(event)
+    finally:
+        status_hub.unsubscribe(user_id, queue)
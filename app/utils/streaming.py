@@ -0,0 +1,121 @@
+"""
+Streaming of documents that are still being generated.
+
+The worker streams BRD, PRD and market report generation and a ``DraftWriter``
+stores the partial output in ``document_drafts`` at most once every
+``STREAM_FLUSH_INTERVAL`` seconds, so a long generation costs a handful of
+writes instead of one per chunk. ``tail_document`` follows the draft and the
+document status for the ``/project/{id}/{kind}/stream`` Server-Sent Events
+endpoint, ending with the saved document once generation finishes. It reads
+them when ``status_hub`` relays a status or draft NOTIFY for the project, and
+otherwise once every ``STREAM_HEARTBEAT_INTERVAL`` in case one was missed.
+Without a LISTEN connection it polls every ``STREAM_POLL_INTERVAL``.
+"""
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator
+
+from ..config import STREAM_FLUSH_INTERVAL, STREAM_POLL_INTERVAL, STREAM_HEARTBEAT_INTERVAL
+from ..repositories import documents
+from ..repositories.documents import DOCUMENT_CONTENT_COLUMNS
+from .fences import FenceScanner
+from .status_events import status_hub
+
+logger = logging.getLogger(__name__)
+
+# Documents whose generation is streamed
+STREAMED_DOCUMENTS = tuple(DOCUMENT_CONTENT_COLUMNS)
+
+
+class DraftWriter:
+    """Partial output callback that stores the draft of a document at bounded intervals"""
+
+    def __init__(self, table: str, project_id: str, interval: float = STREAM_FLUSH_INTERVAL):
+        self.table = table
+        self.project_id = project_id
+        self.interval = interval
+        self.writes = 0
+        self._flushed_at = None
+        # Partial output grows by appending, so each flush only scans what is new
+        self._scanner = FenceScanner()
+
+    async def __call__(self, content: str) -> None:
+        now = time.monotonic()
+        # The first chunk is written right away, later ones at most once per interval
+        if self._flushed_at is not None and now - self._flushed_at < self.interval:
+            return
+        self._flushed_at = now
+        if len(content) < self._scanner.length:
+            self._scanner = FenceScanner()
+        self._scanner.feed(content[self._scanner.length:])
+        try:
+            # Models often wrap the whole document in a ```markdown fence
+            await documents.save_draft(self.table, self.project_id, self._scanner.markdown())
+            self.writes += 1
+        except Exception as e:
+            # A lost draft only delays what the client sees, the generation goes on
+            logger.warning(f"Saving the {self.table} draft of project {self.project_id} failed: {e}")
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def tail_document(table: str, project_id: str) -> AsyncIterator[str]:
+    """
+    Follow a document's generation as Server-Sent Events.
+
+    Events:
+        ``delta``: ``{"content": ...}`` text appended to the draft
+        ``reset``: ``{"content": ...}`` the whole draft, when it no longer extends what was sent
+        ``completed`` / ``failed``: ``{"status", "content"}`` the saved document, then the stream ends
+        ``error``: ``{"detail": ...}`` the document does not exist, then the stream ends
+
+    A comment line is sent every ``STREAM_HEARTBEAT_INTERVAL`` seconds without events.
+    """
+    column = DOCUMENT_CONTENT_COLUMNS[table]
+    sent = ""
+    last_event = time.monotonic()
+    # Watched before the first read so no change falls between the two
+    changed = status_hub.watch(project_id) if status_hub.enabled else None
+
+    try:
+        while True:
+            if changed is not None:
+                changed.clear()
+
+            record = await documents.get_document(table, project_id, 'status')
+            if not record:
+                yield _event('error', {'detail': f"{table} not found"})
+                return
+
+            if record['status'] in ('completed', 'failed'):
+                final = await documents.get_document(table, project_id, f"status,{column}")
+                yield _event(record['status'], {'status': record['status'], 'content': (final or {}).get(column)})
+                return
+
+            draft = await documents.get_draft(table, project_id)
+            content = draft['content'] if draft else ""
+            if content != sent:
+                if content.startswith(sent):
+                    yield _event('delta', {'content': content[len(sent):]})
+                else:
+                    yield _event('reset', {'content': content})
+                sent = content
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event >= STREAM_HEARTBEAT_INTERVAL:
+                yield ": keepalive\n\n"
+                last_event = time.monotonic()
+
+            if changed is None:
+                await asyncio.sleep(STREAM_POLL_INTERVAL)
+            else:
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=STREAM_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        if changed is not None:
+            status_hub.unwatch(project_id, changed)
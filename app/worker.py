@@ -0,0 +1,301 @@
+"""
+AI job worker.
+
+Claims jobs from the ``ai_jobs`` queue and runs them outside the web process.
+Run it with ``python worker.py`` and scale it independently of the API.
+
+Each claimed job is held under a lease that a heartbeat keeps extending while
+the handler runs. If the worker dies the lease runs out and another worker
+picks the job up again, and a worker that finds its lease lost stops the
+handler, so a job never runs on two workers at once. Failed attempts are retried with exponential backoff
+until the job's attempts are used up, then its failure handler marks the
+project records as failed. Jobs started by the generation pipeline carry the
+planned stages in their payload, and the stages they unblock are queued as
+soon as they complete (see ``app/utils/pipeline.py``).
+
+The worker also runs the stale generation reaper every ``REAPER_INTERVAL``
+seconds, which re-queues or fails status rows left ``in_progress`` without a
+live job (see ``migrations/generation_reaper.sql``) and prunes generation
+status events older than ``STATUS_EVENT_RETENTION`` seconds, and compacts the
+agent session storage every ``SESSION_COMPACTION_INTERVAL`` seconds (see
+``app/services/session_compaction.py``). It logs the request counters and
+connection pool usage of its model clients every ``MODEL_STATS_INTERVAL`` seconds.
+"""
+import os
+import socket
+import signal
+import asyncio
+import logging
+from typing import Optional
+from uuid import uuid4
+
+from .config import (
+    WORKER_CONCURRENCY, JOB_POLL_INTERVAL, JOB_LEASE_SECONDS, JOB_HEARTBEAT_INTERVAL,
+    JOB_MAX_ATTEMPTS, REAPER_INTERVAL, REAPER_STALE_SECONDS, MODEL_STATS_INTERVAL, STATUS_EVENT_RETENTION,
+    SESSION_COMPACTION_INTERVAL
+)
+from .repositories import jobs, status_events, close_db
+from .services.model_registry import registry
+from .services.memory_writer import memory_writer
+from .services.memory_retrieval import memory_retriever
+from .services.memory_storage_service import get_storage
+from .services.session_compaction import SessionCompactor
+from .utils.job_queue import JOB_HANDLERS, retry_delay
+from .utils.pipeline import advance_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Polls the job queue and runs up to ``concurrency`` jobs at a time"""
+
+    def __init__(self, worker_id: Optional[str] = None, concurrency: int = WORKER_CONCURRENCY):
+        """
+        Initialize the worker.
+
+        Args:
+            worker_id: Identifier stored on leased jobs, defaults to host, pid and a random suffix
+            concurrency: Maximum number of jobs run at the same time
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self._running: set[asyncio.Task] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self._next_reap = 0.0
+        self._next_stats = 0.0
+        self._next_compaction = 0.0
+
+    def stop(self) -> None:
+        """Stop claiming new jobs, running jobs are allowed to finish"""
+        logger.info(f"Worker {self.worker_id} stopping, waiting for {len(self._running)} running job(s)")
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Run until stopped with SIGINT or SIGTERM"""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                # Signal handlers are unavailable on some platforms (e.g. Windows)
+                pass
+
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            while not self._stopping.is_set():
+                claimed = await self._poll()
+
+                # Poll again right away while there is both work and capacity
+                if claimed and len(self._running) < self.concurrency:
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+        finally:
+            self._log_model_stats()
+            # Write the memories still queued by finished jobs
+            await memory_writer.aclose()
+            await registry.aclose()
+            await close_db()
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    async def _poll(self) -> int:
+        """Fail abandoned jobs and claim as many ready jobs as there are free slots"""
+        await self._reap()
+        await self._compact_sessions()
+        if MODEL_STATS_INTERVAL > 0 and asyncio.get_running_loop().time() >= self._next_stats:
+            self._next_stats = asyncio.get_running_loop().time() + MODEL_STATS_INTERVAL
+            self._log_model_stats()
+        try:
+            for job in await jobs.expire_jobs():
+                logger.warning(f"Job {job['id']} ({job['job_type']}) lease expired with no attempts left")
+                await self._on_failure(job)
+
+            free = self.concurrency - len(self._running)
+            if free <= 0:
+                return 0
+
+            claimed = await jobs.claim_jobs(self.worker_id, free, JOB_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"Polling the job queue failed: {e}")
+            return 0
+
+        for job in claimed:
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        return len(claimed)
+
+    async def _reap(self) -> None:
+        """Recover stale in_progress generation rows and prune old status events at most once per ``REAPER_INTERVAL``"""
+        now = asyncio.get_running_loop().time()
+        if now < self._next_reap:
+            return
+        self._next_reap = now + REAPER_INTERVAL
+
+        try:
+            pruned = await status_events.prune_events(STATUS_EVENT_RETENTION)
+            if pruned:
+                logger.info(f"Pruned {pruned} status event(s)")
+        except Exception as e:
+            logger.error(f"Pruning status events failed: {e}")
+
+        try:
+            recovered = await jobs.reap_stale_generations(REAPER_STALE_SECONDS, JOB_MAX_ATTEMPTS)
+        except Exception as e:
+            logger.error(f"Reaping stale generations failed: {e}")
+            return
+
+        if recovered:
+            resumed = sum(1 for r in recovered if r['action'] == 'resumed')
+            logger.warning(
+                f"Recovered {len(recovered)} stale generation(s): "
+                f"{resumed} resumed, {len(recovered) - resumed} marked failed"
+            )
+
+    async def _compact_sessions(self) -> None:
+        """Expire and compact the agent session storage at most once per ``SESSION_COMPACTION_INTERVAL``"""
+        now = asyncio.get_running_loop().time()
+        if SESSION_COMPACTION_INTERVAL <= 0 or now < self._next_compaction:
+            return
+        self._next_compaction = now + SESSION_COMPACTION_INTERVAL
+
+        try:
+            result = await asyncio.to_thread(SessionCompactor(get_storage()).run)
+        except Exception as e:
+            logger.error(f"Compacting agent sessions failed: {e}")
+            return
+        if result['expired'] or result['compacted']:
+            logger.info(
+                f"Agent sessions: {result['expired']} expired, {result['compacted']} compacted "
+                f"({result['runs_removed']} runs removed, {result['archived']} archived), "
+                f"{result['reclaimed_bytes']} bytes reclaimed"
+            )
+
+    def _log_model_stats(self) -> None:
+        """Log the request counters and pooled connections of each model client, and the memory write and recall counters"""
+        stats = registry.stats()
+        pool = stats['pool']
+        clients = ', '.join(
+            f"{key}: {c['requests']} requests, {c['errors']} errors, "
+            f"{c['connections']} connections ({c['idle_connections']} idle)"
+            for key, c in stats['clients'].items()
+        )
+        logger.info(
+            f"Model clients: {pool['connections']}/{pool['max_connections']} pooled connections "
+            f"({pool['idle_connections']} idle){'; ' + clients if clients else ''}"
+        )
+        memories = memory_writer.stats()
+        logger.info(
+            f"User memories: {memories['written']} written in {memories['batches']} batches, "
+            f"{memories['deduplicated']} deduplicated, {memories['evicted']} evicted, "
+            f"{memories['pending']} pending, {memories['errors']} errors"
+        )
+        recall = memory_retriever.stats()
+        logger.info(
+            f"Memory recall: {recall['recalls']} recalls ({recall['avg_recall_ms']} ms avg), "
+            f"{recall['fallbacks']} recent-memory fallbacks, {recall['avg_tokens']} memory tokens per prompt "
+            f"instead of {recall['avg_full_tokens']}, {recall['indexed']} memories indexed, "
+            f"{recall['errors'] + recall['index_errors']} errors"
+        )
+
+    async def _execute(self, job: dict) -> None:
+        """Run a claimed job while keeping its lease alive, stopping it if the lease is lost"""
+        job_id, job_type = job['id'], job['job_type']
+        logger.info(f"Running job {job_id} ({job_type}) attempt {job['attempts']}/{job['max_attempts']}")
+        run: Optional[asyncio.Task] = None
+        heartbeat: Optional[asyncio.Task] = None
+
+        try:
+            if job_type not in JOB_HANDLERS:
+                raise ValueError(f"Unknown job type: {job_type}")
+            handler, _ = JOB_HANDLERS[job_type]
+            payload = dict(job['payload'])
+            stages = payload.pop('pipeline', None)
+            run = asyncio.create_task(handler(job['project_id'], **payload))
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, run))
+            await run
+        except asyncio.CancelledError:
+            if heartbeat is not None and heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                # Another worker may be running the job now, leave its record to that worker
+                logger.warning(f"Job {job_id} ({job_type}) stopped after losing its lease")
+                return
+            if heartbeat is not None:
+                heartbeat.cancel()
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job_type}) failed")
+            if heartbeat is not None:
+                heartbeat.cancel()
+            try:
+                status = await jobs.fail_job(job_id, self.worker_id, str(e)[:2000], retry_delay(job['attempts']))
+                if status == 'failed':
+                    await self._on_failure(job)
+            except Exception as report_error:
+                # The lease will expire and the job will be picked up again
+                logger.error(f"Could not record failure of job {job_id}: {report_error}")
+        else:
+            heartbeat.cancel()
+            try:
+                completed = await jobs.complete_job(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"Could not mark job {job_id} completed: {e}")
+                return
+            if not completed:
+                # The lease expired between heartbeats and the job was claimed again
+                logger.warning(f"Job {job_id} ({job_type}) finished after losing its lease")
+                return
+            logger.info(f"Job {job_id} ({job_type}) completed")
+
+            # Start the pipeline stages this job unblocked
+            if stages:
+                try:
+                    started = await advance_pipeline(job['project_id'], stages)
+                    if started:
+                        logger.info(f"Project {job['project_id']} pipeline started: {', '.join(started)}")
+                except Exception as e:
+                    logger.error(f"Could not advance the pipeline of project {job['project_id']}: {e}")
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task) -> bool:
+        """
+        Extend the lease of a running job until cancelled.
+
+        Returns:
+            bool: True once the lease was lost and ``run`` cancelled
+        """
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                alive = await jobs.heartbeat_job(job_id, self.worker_id, JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Heartbeat for job {job_id} failed: {e}")
+                continue
+            if not alive:
+                logger.warning(f"Lost the lease on job {job_id}, stopping it")
+                run.cancel()
+                return True
+
+    async def _on_failure(self, job: dict) -> None:
+        """Run the failure handler of a job that has no attempts left"""
+        if job['job_type'] not in JOB_HANDLERS:
+            return
+        _, on_failure = JOB_HANDLERS[job['job_type']]
+        try:
+            await on_failure(job['project_id'], **job['payload'])
+        except Exception as e:
+            logger.error(f"Failure handler of job {job['id']} failed: {e}")
+
+
+def main() -> None:
+    """Entry point for ``python worker.py``"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(Worker().run())
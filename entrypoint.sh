@@ -1,9 +1,20 @@
 #!/bin/bash
 
+# Run the AI job worker instead of the API with: ./entrypoint.sh worker
+if [ "$1" = "worker" ]; then
+    exec python worker.py
+fi
+
+# Run a maintenance command with: ./entrypoint.sh maintenance compact-sessions [options]
+if [ "$1" = "maintenance" ]; then
+    shift
+    exec python maintenance.py "$@"
+fi
+
 # Calculate optimal thread count
 # WORKER_COUNT=$(($(nproc) * 2 + 1))
 WORKER_COUNT=1
 THREAD_COUNT=$(( $(nproc) * 2 < 8 ? $(nproc) * 2 : 8 ))
 
 # Run gunicorn with calculated thread count
-exec gunicorn --bind 0.0.0.0:8000 --workers $WORKER_COUNT --threads $THREAD_COUNT --worker-class uvicorn.workers.UvicornWorker --timeout 120 app.main:app 
\ No newline at end of file
+exec gunicorn --bind 0.0.0.0:8000 --workers $WORKER_COUNT --threads $THREAD_COUNT --worker-class uvicorn.workers.UvicornWorker --timeout 120 app.main:app
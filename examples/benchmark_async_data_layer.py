@@ -0,0 +1,80 @@
+"""
+Async Data Layer Benchmark
+
+Fires concurrent "list projects" style reads at the configured Supabase project
+and compares requests/second of the old pattern (synchronous ``.execute()``
+called from inside async code, which blocks the event loop) against the pooled
+async repository layer.
+
+Usage:
+    python examples/benchmark_async_data_layer.py [user_id] [concurrency] [requests]
+
+Arguments:
+    user_id     - User whose projects are listed (default: a random UUID, which
+                  still exercises the full round trip with an empty result)
+    concurrency - Number of in-flight requests (default: 50)
+    requests    - Total requests per pattern (default: 500)
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import statistics
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import supabase, DB_POOL_MAX_CONNECTIONS, DB_HTTP2
+from app.repositories import projects, close_db
+
+
+async def run(label: str, call, concurrency: int, total: int):
+    """Run ``total`` calls with at most ``concurrency`` in flight and print throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    # Warm-up so connection setup is not counted
+    await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    rps = total / elapsed
+    print(f"{label:<26} {rps:8.1f} req/s  p50={statistics.median(timings):8.1f}ms  p95={p95:8.1f}ms")
+    return rps
+
+
+async def main():
+    user_id = sys.argv[1] if len(sys.argv) > 1 else str(uuid.uuid4())
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    total = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    print(f"Concurrency: {concurrency}  Requests: {total}  "
+          f"Pool: {DB_POOL_MAX_CONNECTIONS} connections  HTTP/2: {DB_HTTP2}\n")
+
+    async def blocking_call():
+        # What the handlers used to do: a synchronous call inside a coroutine
+        supabase.table('projects').select('*').eq('user_id', user_id).execute()
+
+    async def async_call():
+        await projects.list_projects(user_id)
+
+    sync_rps = await run("sync .execute() in async", blocking_call, concurrency, total)
+    async_rps = await run("async pooled repository", async_call, concurrency, total)
+    print(f"\nAsync repository throughput is {async_rps / sync_rps:.1f}x the blocking pattern")
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
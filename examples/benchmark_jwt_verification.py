@@ -0,0 +1,85 @@
+"""
+JWT Verification Benchmark
+
+Compares the latency of verifying an access token locally (cached signing keys)
+against asking GoTrue with ``supabase.auth.get_user``.
+
+Usage:
+    python examples/benchmark_jwt_verification.py <access_token> [iterations]
+
+Arguments:
+    access_token - A valid user access token. If omitted and SUPABASE_JWT_SECRET
+                   is set, an HS256 token is minted locally and only the local
+                   path is measured.
+    iterations   - Number of verifications per path (default: 200)
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import statistics
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+
+from app.config import supabase, SUPABASE_JWT_SECRET, SUPABASE_JWT_AUDIENCE
+from app.middleware.auth import jwt_verifier
+
+
+def mint_token() -> str:
+    """Create a short-lived HS256 token signed with the project secret"""
+    now = int(time.time())
+    return jwt.encode({
+        "sub": str(uuid.uuid4()),
+        "aud": SUPABASE_JWT_AUDIENCE,
+        "role": "authenticated",
+        "iat": now,
+        "exp": now + 3600,
+    }, SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+def measure(label: str, func, iterations: int):
+    """Run ``func`` repeatedly and print latency percentiles in milliseconds"""
+    # Warm-up call so key fetching / connection setup is not counted
+    func()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<22} mean={statistics.mean(timings):8.3f}ms  p50={statistics.median(timings):8.3f}ms  p95={p95:8.3f}ms")
+    return statistics.median(timings)
+
+
+def main():
+    token = sys.argv[1] if len(sys.argv) > 1 else None
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    remote = True
+    if not token:
+        if not SUPABASE_JWT_SECRET:
+            print("Error: pass an access token or set SUPABASE_JWT_SECRET")
+            sys.exit(1)
+        token = mint_token()
+        remote = False
+        print("Using a locally minted token, skipping the GoTrue path")
+
+    print(f"Iterations per path: {iterations}\n")
+    loop = asyncio.new_event_loop()
+    local_p50 = measure("local (cached keys)", lambda: loop.run_until_complete(jwt_verifier.verify(token)), iterations)
+    loop.close()
+
+    if remote:
+        remote_p50 = measure("remote (get_user)", lambda: supabase.auth.get_user(token), iterations)
+        print(f"\nLocal verification is {remote_p50 / local_p50:.1f}x faster at p50")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Memory Retrieval Benchmark
+
+Stores the documents of ``examples/data`` (project description, BRD, PRD and
+tasks) as the memories of a new project, then generates the project's PRD
+with every memory in the agent's prompt ('full') and with the chunks recalled
+for the prompt ('retrieval'), and reports per mode:
+
+- memory tokens put in the prompt (estimated, four characters per token)
+- prompt tokens reported by the provider
+- generation latency, and the recall latency it includes
+
+The response cache is bypassed so every run calls the configured model. With
+``runs`` set to 0 only the memory tokens and recall latency are measured, and
+no generation model is called. The memories and their chunks are deleted
+afterwards.
+
+Usage:
+    python examples/benchmark_memory_retrieval.py [runs]
+
+Arguments:
+    runs - Generations per mode (default: 1)
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import statistics
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agno.memory.v2.schema import UserMemory
+from sqlalchemy import delete
+
+from app.services.prd_generator import PRDGeneratorService
+from app.services.memory_storage_service import get_memory
+from app.services.memory_writer import memory_writer
+from app.services.memory_retrieval import memory_retriever, count_tokens
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MEMORIES = [
+    ("sample_project_description.txt", ["Project Description"]),
+    ("sample_brd.md", ["BRD", "Business Requirements Document"]),
+    ("sample_prd.md", ["PRD", "Product Requirements Document"]),
+    ("sample_tasks.json", ["Tasks", "Project Tasks"]),
+]
+
+
+def read(name: str) -> str:
+    with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def prompt_memory_tokens(project_id: str) -> int:
+    """Tokens of the memories the agent's system message would hold now"""
+    memories = get_memory().get_user_memories(user_id=project_id)
+    return sum(count_tokens(memory.memory) for memory in memories)
+
+
+async def measure(label: str, service: PRDGeneratorService, brd: str, project_id: str, runs: int) -> None:
+    memory_retriever.enabled = label == "retrieval"
+    start = time.perf_counter()
+    await memory_retriever.recall(project_id, brd)
+    recall_ms = (time.perf_counter() - start) * 1000
+    print(f"{label:<10} memory tokens in the prompt: {prompt_memory_tokens(project_id)}"
+          + (f", recalled in {recall_ms:.0f} ms" if memory_retriever.enabled else ""))
+
+    timings, prompt_tokens = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await service.generate_prd(brd, "Benchmark", user_id=project_id, use_cache=False, sectioned=False)
+        elapsed = time.perf_counter() - start
+        if result['status'] != 'success':
+            print(f"{label:<10} failed: {result.get('error')}")
+            continue
+        timings.append(elapsed)
+        metrics = service.agent.run_response.metrics or {}
+        prompt_tokens.append(sum(metrics.get('input_tokens', [])))
+        print(f"{label:<10} {elapsed:7.1f}s  {prompt_tokens[-1]:7d} prompt tokens")
+    if timings:
+        print(f"{label:<10} median {statistics.median(timings):.1f}s, {statistics.median(prompt_tokens):.0f} prompt tokens")
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    project_id = str(uuid.uuid4())
+    brd = read("sample_brd.md")
+
+    for name, topics in MEMORIES:
+        memory_writer.add(user_id=project_id, memory=UserMemory(memory=read(name), topics=topics))
+    await memory_writer.flush()
+    print(f"Project {project_id}: {len(MEMORIES)} memories, {memory_retriever.stats()['indexed']} indexed")
+
+    service = PRDGeneratorService()
+    try:
+        await measure("full", service, brd, project_id, runs)
+        await measure("retrieval", service, brd, project_id, runs)
+    finally:
+        await memory_writer.aclose()
+        db = get_memory().db
+        with db.Session() as sess, sess.begin():
+            sess.execute(delete(db.table).where(db.table.c.user_id == project_id))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
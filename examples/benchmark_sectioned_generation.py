@@ -0,0 +1,96 @@
+"""
+Sectioned Generation Benchmark
+
+Generates a BRD from ``examples/data/sample_project_description.txt`` and a
+PRD from ``examples/data/sample_brd.md`` in both generation modes and compares
+wall-clock latency: one agent call writing the whole document ('single')
+against an outline pass followed by concurrent per-section calls ('sectioned').
+
+The response cache is bypassed so every run calls the configured models.
+Sectioned mode runs under the same provider rate limits (LLM_RATE_LIMITS), so
+tight limits will hide part of the gain.
+
+Usage:
+    python examples/benchmark_sectioned_generation.py [runs] [brd|prd|both]
+
+Arguments:
+    runs     - Runs per mode and document (default: 1)
+    document - Which document to benchmark (default: both)
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import statistics
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.brd_generator import BRDGeneratorService
+from app.services.prd_generator import PRDGeneratorService
+from app.services.config import SECTIONED_MAX_CONCURRENCY
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def read(name: str) -> str:
+    with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def measure(label: str, generate, runs: int) -> list[float]:
+    """Run ``generate`` ``runs`` times and print latency and output size"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await generate()
+        elapsed = time.perf_counter() - start
+        if result['status'] != 'success':
+            print(f"{label:<16} failed: {result.get('error')}")
+            continue
+        timings.append(elapsed)
+        content = result['content']
+        headings = len(re.findall(r"^#{2,3} ", content, re.MULTILINE))
+        print(f"{label:<16} {elapsed:7.1f}s  {len(content):6d} chars  {headings:3d} headings")
+    return timings
+
+
+async def compare(document: str, generate, runs: int) -> None:
+    print(f"\n{document}")
+    single = await measure("single", lambda: generate(False), runs)
+    sectioned = await measure("sectioned", lambda: generate(True), runs)
+    if single and sectioned:
+        print(
+            f"median single {statistics.median(single):.1f}s, sectioned {statistics.median(sectioned):.1f}s "
+            f"({statistics.median(single) / statistics.median(sectioned):.1f}x)"
+        )
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    document = sys.argv[2] if len(sys.argv) > 2 else "both"
+    print(f"Runs: {runs}  Section concurrency: {SECTIONED_MAX_CONCURRENCY}")
+
+    if document in ("brd", "both"):
+        brd_service = BRDGeneratorService()
+        project_details = {
+            'project_name': 'TeleCare Connect',
+            'project_description': read("sample_project_description.txt").strip(),
+            'start_date': '01/07/2025',
+            'end_date': '31/12/2025',
+        }
+        await compare("BRD", lambda sectioned: brd_service.generate_brd(
+            project_details, use_cache=False, sectioned=sectioned
+        ), runs)
+
+    if document in ("prd", "both"):
+        prd_service = PRDGeneratorService()
+        brd_content = read("sample_brd.md")
+        await compare("PRD", lambda sectioned: prd_service.generate_prd(
+            brd_content, "TeleCare Connect", use_cache=False, sectioned=sectioned
+        ), runs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Structured Output Benchmark
+
+Generates the task hierarchy of ``examples/data/sample_prd.md`` repeatedly
+with the provider's structured output ('structured') and with the text
+completion parsed by the tolerant JSON parser ('text'), and reports per mode:
+
+- latency of the successful runs
+- how the responses were parsed (structured, plain JSON, or after JSON repair)
+- the failure rate, each failure being a job that has to regenerate everything
+- the expected time to a usable hierarchy, counting those regenerations
+
+The response cache is bypassed so every run calls the configured model. For
+providers without structured output support both modes take the text path.
+
+Usage:
+    python examples/benchmark_structured_output.py [runs] [model_type] [model_id]
+
+Arguments:
+    runs       - Runs per mode (default: 5)
+    model_type - Provider to benchmark (default: TASK_MODEL_TYPE)
+    model_id   - Model to benchmark (default: TASK_MODEL_ID)
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.task_generator import TaskGeneratorService
+from app.services.structured_output import get_structured_output_stats
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+async def measure(label: str, service: TaskGeneratorService, prd_content: str, runs: int) -> None:
+    before = get_structured_output_stats()
+    timings, failures = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            result = await service.generate_tasks(prd_content, use_cache=False, staged=False)
+        except ValueError as e:
+            failures += 1
+            print(f"{label:<11} failed after {time.perf_counter() - start:6.1f}s: {str(e)[:120]}")
+            continue
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        print(f"{label:<11} {elapsed:6.1f}s  {len(result['items']):4d} items")
+
+    after = get_structured_output_stats()
+    paths = {path: after[path] - before[path] for path in ('structured', 'json', 'repaired', 'failed')}
+    print(f"{label:<11} parsed: {paths}")
+    if timings:
+        success_rate = len(timings) / runs
+        mean = statistics.mean(timings)
+        print(
+            f"{label:<11} median {statistics.median(timings):.1f}s, failure rate {failures / runs:.0%}, "
+            f"expected time to a usable hierarchy {mean / success_rate:.1f}s"
+        )
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    model_type = sys.argv[2] if len(sys.argv) > 2 else None
+    model_id = sys.argv[3] if len(sys.argv) > 3 else None
+
+    with open(os.path.join(DATA_DIR, "sample_prd.md"), "r", encoding="utf-8") as f:
+        prd_content = f.read()
+
+    structured = TaskGeneratorService(model_type, model_id, structured_output=True)
+    text = TaskGeneratorService(model_type, model_id, structured_output=False)
+    print(f"Model: {structured.model_type}:{structured.model_id}  Runs: {runs}")
+    if not structured.structured_output:
+        print("The provider has no structured output support, both modes parse text")
+
+    await measure("structured", structured, prd_content, runs)
+    await measure("text", text, prd_content, runs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Generated Task Import Benchmark
+
+Times inserting AI generated tasks into a project two ways:
+
+1. The previous path: one bulk insert through PostgREST (the position trigger
+   still runs per row) followed by a separate project update.
+2. The import_generated_tasks RPC: positions and ranks assigned set-wise,
+   trigger skipped, project update in the same transaction.
+
+The project's tasks are deleted before every run, so use a scratch project.
+
+Usage:
+    python examples/benchmark_task_import.py <project_id> [sizes]
+
+Arguments:
+    project_id - UUID of an existing scratch project
+    sizes      - Comma-separated task counts (default: 100,1000,10000)
+"""
+import os
+import sys
+import time
+import asyncio
+from uuid import uuid4
+
+# Add the project root directory to the Python path if running as script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.repositories import get_db, close_db, projects, tasks
+from app.utils.ai_utils import llm_to_tasks
+
+
+def generate_items(count: int) -> list[dict]:
+    """Build task hierarchy items shaped like the task generator output"""
+    items = []
+    epic_id = feature_id = None
+    for i in range(count):
+        if i % 50 == 0:
+            task_type, parent_id = 'epic', None
+            epic_id = str(uuid4())
+            item_id = epic_id
+        elif i % 10 == 0:
+            task_type, parent_id = 'feature', epic_id
+            feature_id = str(uuid4())
+            item_id = feature_id
+        else:
+            task_type, parent_id = 'task', feature_id or epic_id
+            item_id = str(uuid4())
+        items.append({
+            'id': item_id,
+            'title': f"Generated task {i + 1}",
+            'description': "Benchmark task",
+            'task_type': task_type,
+            'parent_id': parent_id,
+        })
+    return items
+
+
+async def clear_tasks(project_id: str) -> None:
+    """Remove every task of the project"""
+    await get_db().table('tasks').delete().eq('project_id', project_id).execute()
+
+
+async def run_previous(project_id: str, records: list[dict]) -> float:
+    """Bulk insert through the trigger, then update the project"""
+    start = time.perf_counter()
+    await tasks.create_tasks(records)
+    await projects.update_project(project_id, {
+        'tasks_generation_status': 'completed',
+        'tasks_generated': records
+    })
+    return time.perf_counter() - start
+
+
+async def run_import(project_id: str, records: list[dict]) -> float:
+    """Single import_generated_tasks call"""
+    start = time.perf_counter()
+    await tasks.import_generated_tasks(project_id, records)
+    return time.perf_counter() - start
+
+
+async def main():
+    if len(sys.argv) < 2:
+        print("Error: pass the UUID of a scratch project")
+        sys.exit(1)
+
+    project_id = sys.argv[1]
+    sizes = [int(size) for size in sys.argv[2].split(',')] if len(sys.argv) > 2 else [100, 1000, 10000]
+
+    print(f"{'tasks':>8}  {'trigger insert':>15}  {'bulk import':>12}  {'speedup':>8}")
+    for size in sizes:
+        await clear_tasks(project_id)
+        previous = await run_previous(project_id, llm_to_tasks(generate_items(size), project_id))
+
+        await clear_tasks(project_id)
+        imported = await run_import(project_id, llm_to_tasks(generate_items(size), project_id))
+
+        print(f"{size:>8}  {previous * 1000:>13.0f}ms  {imported * 1000:>10.0f}ms  {previous / imported:>7.1f}x")
+
+    await clear_tasks(project_id)
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+from app.maintenance import main
+
+if __name__ == "__main__":
+    # Maintenance commands, e.g. python maintenance.py compact-sessions (see app/maintenance.py)
+    main()
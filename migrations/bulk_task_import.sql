@@ -0,0 +1,71 @@
+-- Bulk import of AI generated tasks
+--
+-- Inserting generated tasks row by row through before_task_insert runs a
+-- MAX(position) scan and a shifting UPDATE per task. import_generated_tasks()
+-- assigns positions and ranks set-wise, inserts every task in one statement
+-- with the trigger skipped, and stores the raw output on the project in the
+-- same transaction.
+
+-- Skip the insert trigger while taskflow.skip_position_trigger is on
+CREATE OR REPLACE TRIGGER before_task_insert
+    BEFORE INSERT ON tasks
+    FOR EACH ROW
+    WHEN (COALESCE(current_setting('taskflow.skip_position_trigger', true), '') <> 'on')
+    EXECUTE FUNCTION adjust_task_positions();
+
+-- Function: import_generated_tasks(project_id, tasks)
+-- tasks: [{"id": uuid, "title": text, "description": text, "task_type": task_type,
+--          "status": task_status, "story_point": int, "parent_id": uuid}] in display order
+-- Returns one row with the number of tasks inserted
+CREATE OR REPLACE FUNCTION import_generated_tasks(p_project_id UUID, p_tasks JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    inserted_count INTEGER;
+BEGIN
+    PERFORM set_config('taskflow.skip_position_trigger', 'on', true);
+
+    -- New tasks go after any existing ones in their status column
+    WITH input AS (
+        SELECT t.*, COALESCE(t.status, 'backlog') AS task_status,
+            ROW_NUMBER() OVER (PARTITION BY COALESCE(t.status, 'backlog') ORDER BY t.ord) AS idx
+        FROM ROWS FROM (
+            jsonb_to_recordset(p_tasks) AS (
+                id UUID, parent_id UUID, title VARCHAR(200), description TEXT,
+                task_type task_type, status task_status, story_point INTEGER
+            )
+        ) WITH ORDINALITY AS t(id, parent_id, title, description, task_type, status, story_point, ord)
+    ),
+    existing AS (
+        SELECT status, MAX(position) AS max_position, MAX(rank) AS max_rank
+            FROM tasks
+            WHERE project_id = p_project_id
+            GROUP BY status
+    )
+    INSERT INTO tasks (id, project_id, parent_id, title, description, task_type, status, position, rank, story_point)
+        SELECT
+            COALESCE(i.id, uuid_generate_v4()),
+            p_project_id,
+            i.parent_id,
+            i.title,
+            i.description,
+            i.task_type,
+            i.task_status,
+            COALESCE(e.max_position, 0) + i.idx,
+            -- Successor of the current last rank as a prefix, then evenly spaced keys
+            COALESCE(task_rank_after(e.max_rank), '') || task_rank(i.idx),
+            COALESCE(i.story_point, 0)
+        FROM input i
+        LEFT JOIN existing e ON e.status = i.task_status
+        ORDER BY i.ord;
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+
+    UPDATE projects
+        SET tasks_generation_status = 'completed',
+            tasks_generated = p_tasks
+        WHERE id = p_project_id;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'off', true);
+
+    RETURN NEXT inserted_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -4,21 +4,67 @@ DROP TRIGGER IF EXISTS update_projects_modtime ON projects;
 DROP TRIGGER IF EXISTS update_tasks_modtime ON tasks;
 DROP TRIGGER IF EXISTS update_market_research_modtime ON market_research;
 DROP TRIGGER IF EXISTS update_mockup_modtime ON mockup;
+DROP TRIGGER IF EXISTS update_brd_modtime ON brd;
 DROP TRIGGER IF EXISTS update_prd_modtime ON prd;
 DROP TRIGGER IF EXISTS update_github_setup_modtime ON github_setup;
 DROP TRIGGER IF EXISTS update_feedback_modtime ON feedback;
 DROP TRIGGER IF EXISTS before_task_insert ON tasks;
 DROP TRIGGER IF EXISTS before_task_position_update ON tasks;
+DROP TRIGGER IF EXISTS update_ai_jobs_modtime ON ai_jobs;
+DROP TRIGGER IF EXISTS update_project_embeddings_modtime ON project_embeddings;
+DROP TRIGGER IF EXISTS notify_brd_status ON brd;
+DROP TRIGGER IF EXISTS notify_prd_status ON prd;
+DROP TRIGGER IF EXISTS notify_market_research_status ON market_research;
+DROP TRIGGER IF EXISTS notify_mockup_status ON mockup;
+DROP TRIGGER IF EXISTS notify_github_setup_status ON github_setup;
+DROP TRIGGER IF EXISTS notify_tasks_status ON projects;
+DROP TRIGGER IF EXISTS notify_document_draft ON document_drafts;
 
 -- Drop functions
 DROP FUNCTION IF EXISTS public.handle_new_user();
 DROP FUNCTION IF EXISTS update_updated_at_column();
 DROP FUNCTION IF EXISTS adjust_task_positions();
 DROP FUNCTION IF EXISTS handle_task_position_update();
+DROP FUNCTION IF EXISTS reorder_tasks(UUID, UUID, JSONB);
+DROP FUNCTION IF EXISTS rebalance_task_ranks(UUID, task_status);
+DROP FUNCTION IF EXISTS import_generated_tasks(UUID, JSONB);
+DROP FUNCTION IF EXISTS task_rank_after(TEXT);
+DROP FUNCTION IF EXISTS task_rank(BIGINT);
 DROP FUNCTION IF EXISTS update_feedback_modtime();
+DROP FUNCTION IF EXISTS enqueue_ai_job(VARCHAR, UUID, JSONB, INTEGER);
+DROP FUNCTION IF EXISTS claim_ai_jobs(TEXT, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS heartbeat_ai_job(UUID, TEXT, INTEGER);
+DROP FUNCTION IF EXISTS complete_ai_job(UUID, TEXT);
+DROP FUNCTION IF EXISTS fail_ai_job(UUID, TEXT, TEXT, INTEGER);
+DROP FUNCTION IF EXISTS expire_ai_jobs();
+DROP FUNCTION IF EXISTS reap_stale_generations(INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS ai_job_metrics(TIMESTAMPTZ);
+DROP FUNCTION IF EXISTS take_llm_capacity(TEXT, INTEGER, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS settle_llm_tokens(TEXT, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS block_llm_key(TEXT, DOUBLE PRECISION);
+DROP FUNCTION IF EXISTS get_llm_cache_entry(TEXT, TEXT);
+DROP FUNCTION IF EXISTS put_llm_cache_entry(TEXT, TEXT, TEXT, INTEGER, BIGINT);
+DROP FUNCTION IF EXISTS llm_cache_stats();
+DROP FUNCTION IF EXISTS match_similar_projects(UUID, TEXT, vector, TEXT, DOUBLE PRECISION, INTEGER, BOOLEAN);
+DROP FUNCTION IF EXISTS save_project_embedding(UUID, TEXT, vector);
+DROP FUNCTION IF EXISTS semantic_cache_stats();
+DROP FUNCTION IF EXISTS save_memory_chunks(VARCHAR, VARCHAR, TEXT, JSONB);
+DROP FUNCTION IF EXISTS match_memory_chunks(VARCHAR, TEXT, vector, INTEGER);
+DROP FUNCTION IF EXISTS notify_generation_status();
+DROP FUNCTION IF EXISTS notify_document_draft();
+DROP FUNCTION IF EXISTS prune_status_events(INTEGER);
 
 -- Drop tables in correct order (respecting foreign key constraints)
 DROP TABLE IF EXISTS activity_logs;
+DROP TABLE IF EXISTS ai_generation_recoveries;
+DROP TABLE IF EXISTS llm_rate_limits;
+DROP TABLE IF EXISTS llm_response_cache;
+DROP TABLE IF EXISTS llm_response_cache_counters;
+DROP TABLE IF EXISTS project_embeddings;
+DROP TABLE IF EXISTS semantic_cache_counters;
+DROP TABLE IF EXISTS document_drafts;
+DROP TABLE IF EXISTS status_events;
+DROP TABLE IF EXISTS ai_jobs;
 DROP TABLE IF EXISTS mockup;
 DROP TABLE IF EXISTS prd;
 DROP TABLE IF EXISTS brd;
@@ -29,6 +75,8 @@ DROP TABLE IF EXISTS projects;
 DROP TABLE IF EXISTS users;
 DROP TABLE IF EXISTS feedback;
 DROP TABLE IF EXISTS ai.agent_sessions;
+DROP TABLE IF EXISTS ai.agent_sessions_archive;
+DROP TABLE IF EXISTS ai.memory_chunks;
 DROP TABLE IF EXISTS ai.user_memories;
 
 -- Drop types
@@ -36,6 +84,7 @@ DROP TYPE IF EXISTS user_role;
 DROP TYPE IF EXISTS task_type;
 DROP TYPE IF EXISTS task_status;
 DROP TYPE IF EXISTS ai_generation_status;
+DROP TYPE IF EXISTS ai_job_status;
 -- Drop extensions (optional, comment out if you want to keep them)
 -- DROP EXTENSION IF EXISTS "uuid-ossp";
 -- DROP EXTENSION IF EXISTS vector; 
\ No newline at end of file
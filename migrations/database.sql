@@ -3,6 +3,7 @@ CREATE TYPE user_role AS ENUM ('user', 'admin', 'super');
 CREATE TYPE task_type AS ENUM ('epic', 'feature', 'task');
 CREATE TYPE task_status AS ENUM ('backlog', 'todo', 'in_progress', 'done');
 CREATE TYPE ai_generation_status AS ENUM ('not_started','in_progress', 'completed', 'failed');
+CREATE TYPE ai_job_status AS ENUM ('queued', 'running', 'completed', 'failed');
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -47,6 +48,7 @@ CREATE TABLE tasks (
     task_type task_type NOT NULL,
     status task_status DEFAULT 'backlog',
     position INTEGER NOT NULL,
+    rank TEXT COLLATE "C" NOT NULL, -- fractional order within a status, see app/utils/ranking.py
     story_point INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
@@ -103,6 +105,98 @@ CREATE TABLE mockup (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- AI job queue (see migrations/job_queue.sql)
+CREATE TABLE ai_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_type VARCHAR(50) NOT NULL,
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status ai_job_status NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    locked_until TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Stale generation recoveries (see migrations/generation_reaper.sql)
+CREATE TABLE ai_generation_recoveries (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    job_id UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Shared LLM provider rate limits (see migrations/llm_rate_limits.sql)
+CREATE TABLE llm_rate_limits (
+    key TEXT PRIMARY KEY,
+    request_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+    token_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+    refilled_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    blocked_until TIMESTAMPTZ
+);
+
+-- LLM response cache (see migrations/llm_response_cache.sql)
+CREATE TABLE llm_response_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE llm_response_cache_counters (
+    model TEXT PRIMARY KEY,
+    lookups BIGINT NOT NULL DEFAULT 0,
+    hits BIGINT NOT NULL DEFAULT 0,
+    writes BIGINT NOT NULL DEFAULT 0,
+    evictions BIGINT NOT NULL DEFAULT 0
+);
+
+-- Project objective embeddings (see migrations/semantic_cache.sql)
+CREATE TABLE project_embeddings (
+    project_id UUID PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    model TEXT NOT NULL,
+    embedding vector(768) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE semantic_cache_counters (
+    kind TEXT PRIMARY KEY,
+    lookups BIGINT NOT NULL DEFAULT 0,
+    hits BIGINT NOT NULL DEFAULT 0,
+    search_ms DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Streaming document drafts (see migrations/document_drafts.sql)
+CREATE TABLE document_drafts (
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (project_id, kind)
+);
+
+-- Generation status events (see migrations/status_events.sql)
+CREATE TABLE status_events (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    project_id UUID NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(50),
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Agno Memory and Storage table
 CREATE SCHEMA IF NOT EXISTS ai;
 CREATE TABLE ai.agent_sessions (
@@ -126,6 +220,28 @@ CREATE TABLE ai.user_memories (
   created_at TIMESTAMPTZ,
   updated_at TIMESTAMPTZ
 );
+-- Archive of compacted agent session runs and expired sessions (see migrations/session_compaction.sql)
+CREATE TABLE ai.agent_sessions_archive (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR NOT NULL,
+    user_id VARCHAR,
+    reason TEXT NOT NULL,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+-- Memory chunk embeddings (see migrations/memory_retrieval.sql)
+CREATE TABLE ai.memory_chunks (
+    memory_id VARCHAR NOT NULL REFERENCES ai.user_memories(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    user_id VARCHAR NOT NULL,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    embedding vector(768) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (memory_id, chunk_index)
+);
 
 -- Feedback table, cek bener apa ndak --
 -- Feedback table
@@ -168,6 +284,23 @@ CREATE INDEX idx_tasks_project_id ON tasks(project_id);
 CREATE INDEX idx_tasks_parent_id ON tasks(parent_id);
 CREATE INDEX idx_tasks_status ON tasks(status);
 CREATE INDEX idx_tasks_project_status_pos ON tasks(project_id, status, position);
+CREATE INDEX idx_tasks_project_status_rank ON tasks(project_id, status, rank);
+-- Keyset pagination of a user's projects
+CREATE INDEX idx_projects_user_created ON projects(user_id, created_at DESC, id DESC);
+-- AI job queue claim scans
+CREATE INDEX idx_ai_jobs_ready ON ai_jobs(run_at) WHERE status = 'queued';
+CREATE INDEX idx_ai_jobs_lease ON ai_jobs(locked_until) WHERE status = 'running';
+-- At most one pending or running job of a kind per project
+CREATE UNIQUE INDEX idx_ai_jobs_active ON ai_jobs(job_type, project_id) WHERE status IN ('queued', 'running');
+CREATE INDEX idx_ai_generation_recoveries_created ON ai_generation_recoveries(created_at);
+CREATE INDEX idx_llm_response_cache_last_used ON llm_response_cache(last_used_at);
+CREATE INDEX idx_project_embeddings_hnsw ON project_embeddings USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX idx_status_events_user ON status_events(user_id, id);
+CREATE INDEX idx_status_events_created ON status_events(created_at);
+CREATE INDEX idx_memory_chunks_user ON ai.memory_chunks(user_id, model);
+-- Retention scans of idle agent sessions
+CREATE INDEX idx_agent_sessions_updated ON ai.agent_sessions(updated_at);
+CREATE INDEX idx_agent_sessions_archive_session ON ai.agent_sessions_archive(session_id, archived_at);
 
 -- Update timestamp trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -199,6 +332,11 @@ CREATE OR REPLACE TRIGGER update_mockup_modtime
     FOR EACH ROW
     EXECUTE PROCEDURE update_updated_at_column();
 
+CREATE OR REPLACE TRIGGER update_brd_modtime
+    BEFORE UPDATE ON brd
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
 CREATE OR REPLACE TRIGGER update_prd_modtime
     BEFORE UPDATE ON prd
     FOR EACH ROW
@@ -209,8 +347,66 @@ CREATE OR REPLACE TRIGGER update_github_setup_modtime
     FOR EACH ROW
     EXECUTE PROCEDURE update_updated_at_column();
 
+CREATE OR REPLACE TRIGGER update_project_embeddings_modtime
+    BEFORE UPDATE ON project_embeddings
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
+CREATE OR REPLACE TRIGGER update_ai_jobs_modtime
+    BEFORE UPDATE ON ai_jobs
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
+
+-- Function: task_rank(index)
+-- Evenly spaced rank of the index-th task (1-based), 8 base-62 digits with trailing zeros removed
+CREATE OR REPLACE FUNCTION task_rank(idx BIGINT)
+RETURNS TEXT AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    value  BIGINT := idx * 14776336; -- 62^4
+    key    TEXT := '';
+BEGIN
+    IF idx < 1 OR idx >= 14776336 THEN
+        RAISE EXCEPTION 'Rank index out of range: %', idx;
+    END IF;
+
+    FOR i IN 1..8 LOOP
+        key := substr(digits, (value % 62)::INTEGER + 1, 1) || key;
+        value := value / 62;
+    END LOOP;
+
+    RETURN rtrim(key, '0');
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Function: task_rank_after(key)
+-- A rank sorting after key (the first rank when key is NULL)
+CREATE OR REPLACE FUNCTION task_rank_after(key TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    digit  INTEGER;
+BEGIN
+    IF key IS NULL THEN
+        RETURN task_rank(1);
+    END IF;
+
+    -- Raise the first digit with room before the end, dropping the rest
+    FOR i IN 1..length(key) LOOP
+        digit := strpos(digits, substr(key, i, 1)) - 1;
+        IF digit < 61 THEN
+            RETURN substr(key, 1, i - 1) || substr(digits, (digit + 62) / 2 + 1, 1);
+        END IF;
+    END LOOP;
+
+    RETURN key || 'V';
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
 
 -- Optimized function to adjust task positions
+-- Inserts with a rank only append a position, no sibling is shifted.
+-- Inserts without a rank keep the old shifting behaviour and are ranked last.
 CREATE OR REPLACE FUNCTION adjust_task_positions()
 RETURNS TRIGGER AS $$
 DECLARE
@@ -229,6 +425,18 @@ BEGIN
         WHERE project_id = NEW.project_id
         AND status = status_key;
 
+    IF NEW.rank IS NOT NULL THEN
+        NEW.position := max_position + 1;
+        RETURN NEW;
+    END IF;
+
+    NEW.rank := task_rank_after((
+        SELECT MAX(rank)
+            FROM tasks
+            WHERE project_id = NEW.project_id
+            AND status = status_key
+    ));
+
     -- Assign or shift
     IF NEW.position IS NULL 
         OR NEW.position > max_position + 1 THEN
@@ -324,17 +532,876 @@ $$ LANGUAGE plpgsql;
 CREATE OR REPLACE TRIGGER before_task_insert
     BEFORE INSERT ON tasks
     FOR EACH ROW
+    -- Bulk imports such as import_generated_tasks() assign positions themselves
+    WHEN (COALESCE(current_setting('taskflow.skip_position_trigger', true), '') <> 'on')
     EXECUTE FUNCTION adjust_task_positions();
 
 CREATE OR REPLACE TRIGGER before_task_position_update
     BEFORE UPDATE OF position, status ON tasks
     FOR EACH ROW
     WHEN (
-        (OLD.position IS DISTINCT FROM NEW.position)
-        OR (OLD.status IS DISTINCT FROM NEW.status)
+        ((OLD.position IS DISTINCT FROM NEW.position)
+        OR (OLD.status IS DISTINCT FROM NEW.status))
+        -- Rank moves touch only their own row
+        AND OLD.rank IS NOT DISTINCT FROM NEW.rank
+        -- Bulk operations such as reorder_tasks() renumber positions themselves
+        AND COALESCE(current_setting('taskflow.skip_position_trigger', true), '') <> 'on'
     )
     EXECUTE FUNCTION handle_task_position_update();
 
+-- Function: reorder_tasks(project_id, user_id, orders)
+-- orders: [{"task_id": uuid, "position": int, "status": task_status (optional)}]
+-- Returns one row with the number of tasks moved, or no rows if the project is not owned by the user
+CREATE OR REPLACE FUNCTION reorder_tasks(p_project_id UUID, p_user_id UUID, p_orders JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    moved_count INTEGER;
+    touched     task_status[];
+BEGIN
+    -- Verify project ownership in the same call
+    PERFORM 1 FROM projects WHERE id = p_project_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    -- Statuses whose sequences change: where moved tasks come from and go to
+    SELECT ARRAY_AGG(DISTINCT s) INTO touched
+        FROM (
+            SELECT t.status AS s
+                FROM tasks t
+                JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = t.id
+                WHERE t.project_id = p_project_id
+            UNION
+            SELECT o.status
+                FROM jsonb_to_recordset(p_orders) AS o(status task_status)
+                WHERE o.status IS NOT NULL
+        ) statuses;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'on', true);
+
+    UPDATE tasks t
+        SET position = GREATEST(1, o.position),
+            status   = COALESCE(o.status, t.status)
+        FROM jsonb_to_recordset(p_orders) AS o(task_id UUID, position INTEGER, status task_status)
+        WHERE t.id = o.task_id
+        AND t.project_id = p_project_id;
+    GET DIAGNOSTICS moved_count = ROW_COUNT;
+
+    -- Abort the whole reorder on unknown, foreign or duplicated task ids
+    IF moved_count <> jsonb_array_length(p_orders) THEN
+        RAISE EXCEPTION 'Orders must reference distinct tasks of this project'
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    -- Renumber touched statuses to 1..n: moved tasks take their requested
+    -- slot, the others keep their rank order, and ranks are respaced to match
+    UPDATE tasks t
+        SET position = ranked.new_position,
+            rank     = task_rank(ranked.new_position)
+        FROM (
+            SELECT keyed.id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY keyed.status
+                    ORDER BY keyed.sort_key, keyed.moved DESC, keyed.rank, keyed.id
+                ) AS new_position
+            FROM (
+                SELECT tk.id, tk.status, tk.rank,
+                    (o.task_id IS NOT NULL) AS moved,
+                    CASE WHEN o.task_id IS NOT NULL THEN tk.position
+                        ELSE ROW_NUMBER() OVER (
+                            PARTITION BY tk.status, (o.task_id IS NULL)
+                            ORDER BY tk.rank, tk.id
+                        )
+                    END AS sort_key
+                FROM tasks tk
+                LEFT JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = tk.id
+                WHERE tk.project_id = p_project_id
+                AND tk.status = ANY(touched)
+            ) keyed
+        ) ranked
+        WHERE t.id = ranked.id
+        AND (t.position IS DISTINCT FROM ranked.new_position
+            OR t.rank IS DISTINCT FROM task_rank(ranked.new_position));
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'off', true);
+
+    RETURN NEXT moved_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: rebalance_task_ranks(project_id, status)
+-- Respaces the ranks of one status column once keys have grown too long
+-- Returns one row with the number of tasks respaced
+CREATE OR REPLACE FUNCTION rebalance_task_ranks(p_project_id UUID, p_status task_status)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    respaced INTEGER;
+BEGIN
+    UPDATE tasks t
+        SET rank = task_rank(ordered.idx)
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY rank, id) AS idx
+            FROM tasks
+            WHERE project_id = p_project_id
+            AND status = p_status
+        ) ordered
+        WHERE t.id = ordered.id;
+    GET DIAGNOSTICS respaced = ROW_COUNT;
+
+    RETURN NEXT respaced;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: import_generated_tasks(project_id, tasks)
+-- tasks: [{"id": uuid, "title": text, "description": text, "task_type": task_type,
+--          "status": task_status, "story_point": int, "parent_id": uuid}] in display order
+-- Returns one row with the number of tasks inserted
+CREATE OR REPLACE FUNCTION import_generated_tasks(p_project_id UUID, p_tasks JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    inserted_count INTEGER;
+BEGIN
+    PERFORM set_config('taskflow.skip_position_trigger', 'on', true);
+
+    -- New tasks go after any existing ones in their status column
+    WITH input AS (
+        SELECT t.*, COALESCE(t.status, 'backlog') AS task_status,
+            ROW_NUMBER() OVER (PARTITION BY COALESCE(t.status, 'backlog') ORDER BY t.ord) AS idx
+        FROM ROWS FROM (
+            jsonb_to_recordset(p_tasks) AS (
+                id UUID, parent_id UUID, title VARCHAR(200), description TEXT,
+                task_type task_type, status task_status, story_point INTEGER
+            )
+        ) WITH ORDINALITY AS t(id, parent_id, title, description, task_type, status, story_point, ord)
+    ),
+    existing AS (
+        SELECT status, MAX(position) AS max_position, MAX(rank) AS max_rank
+            FROM tasks
+            WHERE project_id = p_project_id
+            GROUP BY status
+    )
+    INSERT INTO tasks (id, project_id, parent_id, title, description, task_type, status, position, rank, story_point)
+        SELECT
+            COALESCE(i.id, uuid_generate_v4()),
+            p_project_id,
+            i.parent_id,
+            i.title,
+            i.description,
+            i.task_type,
+            i.task_status,
+            COALESCE(e.max_position, 0) + i.idx,
+            -- Successor of the current last rank as a prefix, then evenly spaced keys
+            COALESCE(task_rank_after(e.max_rank), '') || task_rank(i.idx),
+            COALESCE(i.story_point, 0)
+        FROM input i
+        LEFT JOIN existing e ON e.status = i.task_status
+        ORDER BY i.ord;
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+
+    UPDATE projects
+        SET tasks_generation_status = 'completed',
+            tasks_generated = p_tasks
+        WHERE id = p_project_id;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'off', true);
+
+    RETURN NEXT inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: enqueue_ai_job(job_type, project_id, payload, max_attempts)
+-- Returns the new job id, or no rows if the same job is already pending or running
+CREATE OR REPLACE FUNCTION enqueue_ai_job(p_job_type VARCHAR, p_project_id UUID, p_payload JSONB, p_max_attempts INTEGER)
+RETURNS SETOF UUID AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO ai_jobs (job_type, project_id, payload, max_attempts)
+            VALUES (p_job_type, p_project_id, COALESCE(p_payload, '{}'::jsonb), p_max_attempts)
+            ON CONFLICT (job_type, project_id) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: claim_ai_jobs(worker, limit, lease_seconds)
+-- Leases up to limit ready jobs (queued and due, or running with an expired lease)
+CREATE OR REPLACE FUNCTION claim_ai_jobs(p_worker TEXT, p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF ai_jobs AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_by = p_worker,
+                locked_until = NOW() + make_interval(secs => p_lease_seconds),
+                heartbeat_at = NOW()
+            WHERE j.id IN (
+                SELECT id
+                    FROM ai_jobs
+                    WHERE (status = 'queued' AND run_at <= NOW())
+                    OR (status = 'running' AND locked_until < NOW() AND attempts < max_attempts)
+                    ORDER BY run_at
+                    LIMIT p_limit
+                    FOR UPDATE SKIP LOCKED
+            )
+            RETURNING j.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: heartbeat_ai_job(job_id, worker, lease_seconds)
+-- Extends the lease, returns false if the worker no longer holds the job
+CREATE OR REPLACE FUNCTION heartbeat_ai_job(p_job_id UUID, p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE ai_jobs
+        SET locked_until = NOW() + make_interval(secs => p_lease_seconds),
+            heartbeat_at = NOW()
+        WHERE id = p_job_id
+        AND locked_by = p_worker
+        AND status = 'running';
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: complete_ai_job(job_id, worker)
+CREATE OR REPLACE FUNCTION complete_ai_job(p_job_id UUID, p_worker TEXT)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE ai_jobs
+        SET status = 'completed',
+            locked_by = NULL,
+            locked_until = NULL,
+            last_error = NULL
+        WHERE id = p_job_id
+        AND locked_by = p_worker
+        AND status = 'running';
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: fail_ai_job(job_id, worker, error, retry_delay_seconds)
+-- Requeues the job after the delay while attempts remain, otherwise marks it failed.
+-- Returns the resulting status, or no rows if the worker no longer holds the job
+CREATE OR REPLACE FUNCTION fail_ai_job(p_job_id UUID, p_worker TEXT, p_error TEXT, p_retry_delay_seconds INTEGER)
+RETURNS SETOF ai_job_status AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued'::ai_job_status ELSE 'failed'::ai_job_status END,
+                run_at = NOW() + make_interval(secs => p_retry_delay_seconds),
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = p_error
+            WHERE id = p_job_id
+            AND locked_by = p_worker
+            AND status = 'running'
+            RETURNING status;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: expire_ai_jobs()
+-- Marks running jobs whose lease expired with no attempts left as failed and returns them,
+-- so the worker can run their failure handling
+CREATE OR REPLACE FUNCTION expire_ai_jobs()
+RETURNS SETOF ai_jobs AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs
+            SET status = 'failed',
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = COALESCE(last_error, 'Lease expired')
+            WHERE id IN (
+                SELECT id
+                    FROM ai_jobs
+                    WHERE status = 'running'
+                    AND locked_until < NOW()
+                    AND attempts >= max_attempts
+                    FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: reap_stale_generations(stale_seconds, max_attempts)
+-- Recovers in_progress rows untouched for stale_seconds that have no queued or running job.
+-- Rows that never got a job are queued again ('resumed'), rows whose last job already
+-- finished or failed are marked failed ('failed'). Returns the recorded recoveries,
+-- or no rows if another worker is reaping at the same time
+CREATE OR REPLACE FUNCTION reap_stale_generations(p_stale_seconds INTEGER, p_max_attempts INTEGER)
+RETURNS SETOF ai_generation_recoveries AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := NOW() - make_interval(secs => p_stale_seconds);
+    r RECORD;
+    new_job_id UUID;
+    recovery ai_generation_recoveries;
+BEGIN
+    -- One reaper at a time across workers
+    IF NOT pg_try_advisory_xact_lock(hashtext('reap_stale_generations')) THEN
+        RETURN;
+    END IF;
+
+    FOR r IN
+        WITH kinds(kind, job_types, resume_type) AS (
+            VALUES
+                ('brd', ARRAY['brd', 'brd_and_prd'], 'brd'),
+                ('prd', ARRAY['prd', 'brd_and_prd'], 'prd'),
+                ('tasks', ARRAY['tasks'], 'tasks'),
+                ('market_research', ARRAY['market_validation'], 'market_validation'),
+                ('mockup', ARRAY['preview'], 'preview'),
+                ('github_setup', ARRAY['github_setup'], 'github_setup')
+        ),
+        stale AS (
+            SELECT 'brd' AS kind, d.project_id FROM brd d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'prd', d.project_id FROM prd d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'market_research', d.project_id FROM market_research d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'mockup', d.project_id FROM mockup d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'github_setup', d.project_id FROM github_setup d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'tasks', p.id FROM projects p WHERE p.tasks_generation_status = 'in_progress' AND p.updated_at < cutoff
+        )
+        SELECT s.kind,
+               s.project_id,
+               k.resume_type,
+               p.user_id,
+               (SELECT j.status
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.job_type = ANY(k.job_types)
+                    ORDER BY j.created_at DESC
+                    LIMIT 1) AS last_status,
+               -- Same lookup as jobs.get_pipeline, so the resumed stage continues the pipeline
+               (SELECT j.payload->'pipeline'
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.payload->'pipeline' IS NOT NULL
+                    ORDER BY j.created_at DESC
+                    LIMIT 1) AS pipeline,
+               EXISTS (SELECT 1 FROM stale b WHERE b.kind = 'brd' AND b.project_id = s.project_id) AS brd_stale
+            FROM stale s
+            JOIN kinds k ON k.kind = s.kind
+            JOIN projects p ON p.id = s.project_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.job_type = ANY(k.job_types)
+                    AND j.status IN ('queued', 'running')
+            )
+            ORDER BY s.project_id, s.kind
+    LOOP
+        IF r.last_status IS NULL THEN
+            -- A stale PRD waiting on a stale BRD is resumed by the BRD's brd_and_prd job
+            IF r.kind = 'prd' AND r.brd_stale THEN
+                CONTINUE;
+            END IF;
+
+            SELECT id INTO new_job_id
+                FROM enqueue_ai_job(
+                    CASE
+                        WHEN r.kind = 'brd' AND EXISTS (
+                            SELECT 1 FROM prd WHERE prd.project_id = r.project_id AND prd.status = 'in_progress'
+                        ) THEN 'brd_and_prd'
+                        ELSE r.resume_type
+                    END,
+                    r.project_id,
+                    CASE WHEN r.resume_type = 'github_setup' THEN jsonb_build_object('user_id', r.user_id) ELSE '{}'::jsonb END
+                        || CASE WHEN r.pipeline IS NULL THEN '{}'::jsonb ELSE jsonb_build_object('pipeline', r.pipeline) END,
+                    -- A retried preview would start another Lovable project, it runs once
+                    CASE WHEN r.resume_type = 'preview' THEN 1 ELSE p_max_attempts END
+                ) AS id;
+
+            INSERT INTO ai_generation_recoveries (project_id, kind, action, job_id)
+                VALUES (r.project_id, r.kind, 'resumed', new_job_id)
+                RETURNING * INTO recovery;
+        ELSE
+            IF r.kind = 'tasks' THEN
+                UPDATE projects
+                    SET tasks_generation_status = 'failed'
+                    WHERE id = r.project_id
+                    AND tasks_generation_status = 'in_progress';
+            ELSE
+                EXECUTE format('UPDATE %I SET status = ''failed'' WHERE project_id = $1 AND status = ''in_progress''', r.kind)
+                    USING r.project_id;
+            END IF;
+
+            INSERT INTO ai_generation_recoveries (project_id, kind, action)
+                VALUES (r.project_id, r.kind, 'failed')
+                RETURNING * INTO recovery;
+        END IF;
+
+        RETURN NEXT recovery;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: ai_job_metrics(since)
+-- Queue and recovery counters, finished jobs and recoveries are counted from since
+CREATE OR REPLACE FUNCTION ai_job_metrics(p_since TIMESTAMPTZ)
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'since', p_since,
+        'jobs', (
+            SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb)
+                FROM (
+                    SELECT status, count(*) AS n
+                        FROM ai_jobs
+                        WHERE status IN ('queued', 'running') OR updated_at >= p_since
+                        GROUP BY status
+                ) s
+        ),
+        'expired_leases', (
+            SELECT count(*) FROM ai_jobs WHERE status = 'running' AND locked_until < NOW()
+        ),
+        'retried_jobs', (
+            SELECT count(*) FROM ai_jobs WHERE attempts > 1 AND updated_at >= p_since
+        ),
+        'recoveries', (
+            SELECT COALESCE(jsonb_object_agg(action, n), '{}'::jsonb)
+                FROM (
+                    SELECT action, count(*) AS n
+                        FROM ai_generation_recoveries
+                        WHERE created_at >= p_since
+                        GROUP BY action
+                ) r
+        ),
+        'recoveries_by_kind', (
+            SELECT COALESCE(jsonb_object_agg(kind, actions), '{}'::jsonb)
+                FROM (
+                    SELECT kind, jsonb_object_agg(action, n) AS actions
+                        FROM (
+                            SELECT kind, action, count(*) AS n
+                                FROM ai_generation_recoveries
+                                WHERE created_at >= p_since
+                                GROUP BY kind, action
+                        ) c
+                        GROUP BY kind
+                ) k
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: take_llm_capacity(key, requests_per_minute, tokens_per_minute, tokens)
+-- Takes one request and the estimated tokens from the key's buckets (a limit of 0 means unlimited).
+-- Returns 0 when the call may go ahead, otherwise the seconds to wait before asking again
+CREATE OR REPLACE FUNCTION take_llm_capacity(p_key TEXT, p_requests_per_minute INTEGER, p_tokens_per_minute INTEGER, p_tokens INTEGER)
+RETURNS SETOF DOUBLE PRECISION AS $$
+DECLARE
+    bucket llm_rate_limits;
+    elapsed DOUBLE PRECISION;
+    needed DOUBLE PRECISION;
+    wait DOUBLE PRECISION := 0;
+BEGIN
+    INSERT INTO llm_rate_limits (key, request_tokens, token_tokens)
+        VALUES (p_key, p_requests_per_minute, p_tokens_per_minute)
+        ON CONFLICT (key) DO NOTHING;
+
+    SELECT * INTO bucket FROM llm_rate_limits WHERE key = p_key FOR UPDATE;
+
+    IF bucket.blocked_until > NOW() THEN
+        RETURN NEXT EXTRACT(EPOCH FROM bucket.blocked_until - NOW());
+        RETURN;
+    END IF;
+
+    elapsed := EXTRACT(EPOCH FROM NOW() - bucket.refilled_at);
+
+    IF p_requests_per_minute > 0 THEN
+        bucket.request_tokens := LEAST(p_requests_per_minute, bucket.request_tokens + elapsed * p_requests_per_minute / 60.0);
+        IF bucket.request_tokens < 1 THEN
+            wait := (1 - bucket.request_tokens) * 60.0 / p_requests_per_minute;
+        END IF;
+    END IF;
+
+    IF p_tokens_per_minute > 0 THEN
+        bucket.token_tokens := LEAST(p_tokens_per_minute, bucket.token_tokens + elapsed * p_tokens_per_minute / 60.0);
+        -- A call larger than the whole bucket only waits for a full bucket
+        needed := LEAST(p_tokens, p_tokens_per_minute);
+        IF bucket.token_tokens < needed THEN
+            wait := GREATEST(wait, (needed - bucket.token_tokens) * 60.0 / p_tokens_per_minute);
+        END IF;
+    END IF;
+
+    IF wait = 0 THEN
+        bucket.request_tokens := bucket.request_tokens - 1;
+        bucket.token_tokens := bucket.token_tokens - p_tokens;
+    END IF;
+
+    UPDATE llm_rate_limits
+        SET request_tokens = bucket.request_tokens,
+            token_tokens = bucket.token_tokens,
+            refilled_at = NOW()
+        WHERE key = p_key;
+
+    RETURN NEXT wait;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: settle_llm_tokens(key, tokens_per_minute, tokens)
+-- Corrects the token bucket once the real usage of a call is known
+-- (tokens > 0 charges more than the estimate, tokens < 0 refunds)
+CREATE OR REPLACE FUNCTION settle_llm_tokens(p_key TEXT, p_tokens_per_minute INTEGER, p_tokens INTEGER)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE llm_rate_limits
+        SET token_tokens = LEAST(p_tokens_per_minute, token_tokens - p_tokens)
+        WHERE key = p_key;
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: block_llm_key(key, seconds)
+-- Stops every process from calling the key for the given seconds (from a Retry-After header)
+CREATE OR REPLACE FUNCTION block_llm_key(p_key TEXT, p_seconds DOUBLE PRECISION)
+RETURNS SETOF TIMESTAMPTZ AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO llm_rate_limits (key, blocked_until)
+            VALUES (p_key, NOW() + make_interval(secs => p_seconds))
+            ON CONFLICT (key) DO UPDATE
+                SET blocked_until = GREATEST(llm_rate_limits.blocked_until, EXCLUDED.blocked_until)
+            RETURNING blocked_until;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: get_llm_cache_entry(key, model)
+-- Returns the cached content of key if it has not expired, and counts the lookup
+CREATE OR REPLACE FUNCTION get_llm_cache_entry(p_key TEXT, p_model TEXT)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    cached TEXT;
+BEGIN
+    UPDATE llm_response_cache
+        SET hits = hits + 1,
+            last_used_at = NOW()
+        WHERE key = p_key
+        AND expires_at > NOW()
+        RETURNING content INTO cached;
+
+    INSERT INTO llm_response_cache_counters (model, lookups, hits)
+        VALUES (p_model, 1, CASE WHEN cached IS NULL THEN 0 ELSE 1 END)
+        ON CONFLICT (model) DO UPDATE
+            SET lookups = llm_response_cache_counters.lookups + 1,
+                hits = llm_response_cache_counters.hits + EXCLUDED.hits;
+
+    IF cached IS NOT NULL THEN
+        RETURN NEXT cached;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: put_llm_cache_entry(key, model, content, ttl_seconds, max_bytes)
+-- Stores content under key, then drops expired entries and the least recently used
+-- ones beyond max_bytes of content. Returns the number of evicted entries
+CREATE OR REPLACE FUNCTION put_llm_cache_entry(p_key TEXT, p_model TEXT, p_content TEXT, p_ttl_seconds INTEGER, p_max_bytes BIGINT)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    evicted INTEGER;
+BEGIN
+    INSERT INTO llm_response_cache (key, model, content, size_bytes, expires_at)
+        VALUES (p_key, p_model, p_content, octet_length(p_content), NOW() + make_interval(secs => p_ttl_seconds))
+        ON CONFLICT (key) DO UPDATE
+            SET content = EXCLUDED.content,
+                size_bytes = EXCLUDED.size_bytes,
+                last_used_at = NOW(),
+                expires_at = EXCLUDED.expires_at;
+
+    DELETE FROM llm_response_cache
+        WHERE expires_at <= NOW()
+        OR key IN (
+            SELECT c.key
+                FROM (
+                    SELECT key, SUM(size_bytes) OVER (ORDER BY last_used_at DESC, key) AS running_bytes
+                        FROM llm_response_cache
+                ) c
+                WHERE c.running_bytes > p_max_bytes
+        );
+    GET DIAGNOSTICS evicted = ROW_COUNT;
+
+    INSERT INTO llm_response_cache_counters (model, writes, evictions)
+        VALUES (p_model, 1, evicted)
+        ON CONFLICT (model) DO UPDATE
+            SET writes = llm_response_cache_counters.writes + 1,
+                evictions = llm_response_cache_counters.evictions + EXCLUDED.evictions;
+
+    RETURN NEXT evicted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: llm_cache_stats()
+-- Entry count, stored bytes and per-model lookup, hit and eviction counters
+CREATE OR REPLACE FUNCTION llm_cache_stats()
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'entries', (SELECT count(*) FROM llm_response_cache WHERE expires_at > NOW()),
+        'size_bytes', (SELECT COALESCE(SUM(size_bytes), 0) FROM llm_response_cache WHERE expires_at > NOW()),
+        'models', (
+            SELECT COALESCE(jsonb_object_agg(model, jsonb_build_object(
+                'lookups', lookups,
+                'hits', hits,
+                'hit_rate', CASE WHEN lookups > 0 THEN round(hits::numeric / lookups, 4) ELSE 0 END,
+                'writes', writes,
+                'evictions', evictions
+            )), '{}'::jsonb)
+                FROM llm_response_cache_counters
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: save_project_embedding(project_id, model, embedding)
+-- Stores or replaces the objective embedding of a project
+CREATE OR REPLACE FUNCTION save_project_embedding(p_project_id UUID, p_model TEXT, p_embedding vector)
+RETURNS SETOF UUID AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO project_embeddings (project_id, model, embedding)
+            VALUES (p_project_id, p_model, p_embedding)
+            ON CONFLICT (project_id) DO UPDATE
+                SET model = EXCLUDED.model,
+                    embedding = EXCLUDED.embedding
+            RETURNING project_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: match_similar_projects(project_id, model, embedding, kind, threshold, limit, shared)
+-- Stores the project's embedding, then returns up to limit other projects with a completed
+-- 'brd' or 'market_research' document whose cosine similarity is at least threshold, most
+-- similar first. Only the same user's projects are searched unless shared is true
+CREATE OR REPLACE FUNCTION match_similar_projects(
+    p_project_id UUID,
+    p_model TEXT,
+    p_embedding vector,
+    p_kind TEXT,
+    p_threshold DOUBLE PRECISION,
+    p_limit INTEGER,
+    p_shared BOOLEAN
+)
+RETURNS TABLE (project_id UUID, similarity DOUBLE PRECISION, content TEXT) AS $$
+#variable_conflict use_column
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+    owner UUID;
+    found_count INTEGER;
+BEGIN
+    IF p_kind NOT IN ('brd', 'market_research') THEN
+        RAISE EXCEPTION 'Unknown document kind: %', p_kind;
+    END IF;
+
+    PERFORM save_project_embedding(p_project_id, p_model, p_embedding);
+    SELECT user_id INTO owner FROM projects WHERE id = p_project_id;
+
+    RETURN QUERY
+        SELECT m.project_id, m.similarity, m.content
+            FROM (
+                SELECT e.project_id,
+                       1 - (e.embedding <=> p_embedding) AS similarity,
+                       CASE WHEN p_kind = 'brd' THEN b.brd_markdown ELSE r.report_markdown END AS content
+                    FROM project_embeddings e
+                    JOIN projects p ON p.id = e.project_id
+                    LEFT JOIN brd b ON p_kind = 'brd' AND b.project_id = e.project_id AND b.status = 'completed'
+                    LEFT JOIN market_research r ON p_kind = 'market_research' AND r.project_id = e.project_id AND r.status = 'completed'
+                    WHERE e.project_id <> p_project_id
+                    AND e.model = p_model
+                    AND (p_shared OR p.user_id = owner)
+                    -- Nearest neighbours from the HNSW index, filtered below
+                    ORDER BY e.embedding <=> p_embedding
+                    LIMIT GREATEST(p_limit, 1) * 10
+            ) m
+            WHERE m.content IS NOT NULL
+            AND m.similarity >= p_threshold
+            ORDER BY m.similarity DESC
+            LIMIT p_limit;
+    GET DIAGNOSTICS found_count = ROW_COUNT;
+
+    INSERT INTO semantic_cache_counters (kind, lookups, hits, search_ms)
+        VALUES (p_kind, 1, CASE WHEN found_count > 0 THEN 1 ELSE 0 END, EXTRACT(EPOCH FROM clock_timestamp() - started) * 1000)
+        ON CONFLICT (kind) DO UPDATE
+            SET lookups = semantic_cache_counters.lookups + 1,
+                hits = semantic_cache_counters.hits + EXCLUDED.hits,
+                search_ms = semantic_cache_counters.search_ms + EXCLUDED.search_ms;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: semantic_cache_stats()
+-- Stored embeddings and per-kind lookup, hit and average search latency counters
+CREATE OR REPLACE FUNCTION semantic_cache_stats()
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'embeddings', (SELECT count(*) FROM project_embeddings),
+        'kinds', (
+            SELECT COALESCE(jsonb_object_agg(kind, jsonb_build_object(
+                'lookups', lookups,
+                'hits', hits,
+                'hit_rate', CASE WHEN lookups > 0 THEN round(hits::numeric / lookups, 4) ELSE 0 END,
+                'avg_search_ms', CASE WHEN lookups > 0 THEN round((search_ms / lookups)::numeric, 2) ELSE 0 END
+            )), '{}'::jsonb)
+                FROM semantic_cache_counters
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: save_memory_chunks(memory_id, user_id, model, chunks)
+-- chunks: [{"content": text, "tokens": int, "embedding": "[...]"}] in order
+-- Replaces the chunks of a memory, returns the number stored, or no rows if the
+-- memory has been deleted in the meantime
+CREATE OR REPLACE FUNCTION save_memory_chunks(p_memory_id VARCHAR, p_user_id VARCHAR, p_model TEXT, p_chunks JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    stored INTEGER;
+BEGIN
+    PERFORM 1 FROM ai.user_memories WHERE id = p_memory_id FOR SHARE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM ai.memory_chunks WHERE memory_id = p_memory_id;
+    INSERT INTO ai.memory_chunks (memory_id, chunk_index, user_id, model, content, tokens, embedding)
+        SELECT p_memory_id, c.ordinality - 1, p_user_id, p_model,
+               c.value->>'content', (c.value->>'tokens')::INTEGER, (c.value->>'embedding')::vector
+            FROM jsonb_array_elements(p_chunks) WITH ORDINALITY AS c(value, ordinality);
+    GET DIAGNOSTICS stored = ROW_COUNT;
+    RETURN NEXT stored;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: match_memory_chunks(user_id, model, embedding, limit)
+-- Returns up to limit chunks of the user's memories, most similar first, each row
+-- also carrying the tokens of all the user's chunks (what a full memory prompt costs)
+CREATE OR REPLACE FUNCTION match_memory_chunks(p_user_id VARCHAR, p_model TEXT, p_embedding vector, p_limit INTEGER)
+RETURNS TABLE (memory_id VARCHAR, chunk_index INTEGER, content TEXT, tokens INTEGER, similarity DOUBLE PRECISION, total_tokens BIGINT) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+        SELECT c.memory_id, c.chunk_index, c.content, c.tokens,
+               1 - (c.embedding <=> p_embedding) AS similarity,
+               sum(c.tokens) OVER () AS total_tokens
+            FROM ai.memory_chunks c
+            WHERE c.user_id = p_user_id
+            AND c.model = p_model
+            ORDER BY c.embedding <=> p_embedding
+            LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: notify_generation_status()
+-- Trigger recording a changed generation status and notifying listeners
+CREATE OR REPLACE FUNCTION notify_generation_status()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind TEXT := TG_TABLE_NAME;
+    v_status TEXT;
+    v_project UUID;
+    v_user UUID;
+    v_event status_events%ROWTYPE;
+BEGIN
+    IF TG_TABLE_NAME = 'projects' THEN
+        IF TG_OP = 'UPDATE' AND NEW.tasks_generation_status IS NOT DISTINCT FROM OLD.tasks_generation_status THEN
+            RETURN NULL;
+        END IF;
+        v_kind := 'tasks';
+        v_status := NEW.tasks_generation_status;
+        v_project := NEW.id;
+        v_user := NEW.user_id;
+    ELSE
+        IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+            RETURN NULL;
+        END IF;
+        v_status := NEW.status;
+        v_project := NEW.project_id;
+        SELECT user_id INTO v_user FROM projects WHERE id = v_project;
+    END IF;
+
+    IF v_user IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO status_events (user_id, project_id, kind, status)
+        VALUES (v_user, v_project, v_kind, v_status)
+        RETURNING * INTO v_event;
+
+    PERFORM pg_notify('generation_status', json_build_object(
+        'id', v_event.id,
+        'user_id', v_event.user_id,
+        'project_id', v_event.project_id,
+        'kind', v_event.kind,
+        'status', v_event.status,
+        'created_at', v_event.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: prune_status_events(retention_seconds)
+-- Deletes events older than retention_seconds, returns how many were deleted
+CREATE OR REPLACE FUNCTION prune_status_events(p_retention_seconds INTEGER)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    DELETE FROM status_events WHERE created_at < NOW() - make_interval(secs => p_retention_seconds);
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN NEXT deleted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: notify_document_draft()
+-- Trigger notifying the /stream endpoints that a draft was written
+CREATE OR REPLACE FUNCTION notify_document_draft()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('document_draft', json_build_object(
+        'project_id', NEW.project_id,
+        'kind', NEW.kind
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Generation status notifications, the triggers need notify_generation_status()
+CREATE OR REPLACE TRIGGER notify_brd_status
+    AFTER INSERT OR UPDATE OF status ON brd
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_prd_status
+    AFTER INSERT OR UPDATE OF status ON prd
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_market_research_status
+    AFTER INSERT OR UPDATE OF status ON market_research
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_mockup_status
+    AFTER INSERT OR UPDATE OF status ON mockup
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_github_setup_status
+    AFTER INSERT OR UPDATE OF status ON github_setup
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_tasks_status
+    AFTER UPDATE OF tasks_generation_status ON projects
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+-- Draft notifications for the /stream endpoints, the trigger needs notify_document_draft()
+CREATE OR REPLACE TRIGGER notify_document_draft
+    AFTER INSERT OR UPDATE ON document_drafts
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_document_draft();
+
 -- inserts a row into public.users
 create or replace function public.handle_new_user()
 returns trigger
@@ -0,0 +1,34 @@
+-- Streaming document drafts
+--
+-- While a BRD, PRD or market report is being generated, the partial output is
+-- written here at bounded intervals (STREAM_FLUSH_INTERVAL) and tailed by the
+-- /stream endpoints. The document row itself is only written once complete,
+-- and the draft is deleted then. Every write is announced with NOTIFY on the
+-- 'document_draft' channel, so the endpoints read the draft when it changes
+-- instead of polling it.
+
+CREATE TABLE document_drafts (
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (project_id, kind)
+);
+
+-- Function: notify_document_draft()
+-- Trigger notifying the /stream endpoints that a draft was written
+CREATE OR REPLACE FUNCTION notify_document_draft()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('document_draft', json_build_object(
+        'project_id', NEW.project_id,
+        'kind', NEW.kind
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notify_document_draft
+    AFTER INSERT OR UPDATE ON document_drafts
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_document_draft();
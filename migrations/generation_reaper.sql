@@ -0,0 +1,191 @@
+-- Stale generation reaper
+--
+-- A brd / prd / market_research / mockup / github_setup row or a project's
+-- tasks_generation_status can be left 'in_progress' when the process that set it
+-- died before a job was queued, or when a job ended without updating the row.
+-- The generate-* endpoints refuse to restart such runs. reap_stale_generations()
+-- finds in_progress rows with no queued or running job (a running job stays alive
+-- only while its worker heartbeats, see job_queue.sql) and either queues the
+-- generation again or marks the row failed. Every recovery is recorded in
+-- ai_generation_recoveries for ai_job_metrics().
+
+-- brd had no modtime trigger, so updated_at did not move when a run restarted
+CREATE OR REPLACE TRIGGER update_brd_modtime
+    BEFORE UPDATE ON brd
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
+CREATE TABLE ai_generation_recoveries (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    job_id UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_ai_generation_recoveries_created ON ai_generation_recoveries(created_at);
+
+-- Function: reap_stale_generations(stale_seconds, max_attempts)
+-- Recovers in_progress rows untouched for stale_seconds that have no queued or running job.
+-- Rows that never got a job are queued again ('resumed'), rows whose last job already
+-- finished or failed are marked failed ('failed'). Returns the recorded recoveries,
+-- or no rows if another worker is reaping at the same time
+CREATE OR REPLACE FUNCTION reap_stale_generations(p_stale_seconds INTEGER, p_max_attempts INTEGER)
+RETURNS SETOF ai_generation_recoveries AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := NOW() - make_interval(secs => p_stale_seconds);
+    r RECORD;
+    new_job_id UUID;
+    recovery ai_generation_recoveries;
+BEGIN
+    -- One reaper at a time across workers
+    IF NOT pg_try_advisory_xact_lock(hashtext('reap_stale_generations')) THEN
+        RETURN;
+    END IF;
+
+    FOR r IN
+        WITH kinds(kind, job_types, resume_type) AS (
+            VALUES
+                ('brd', ARRAY['brd', 'brd_and_prd'], 'brd'),
+                ('prd', ARRAY['prd', 'brd_and_prd'], 'prd'),
+                ('tasks', ARRAY['tasks'], 'tasks'),
+                ('market_research', ARRAY['market_validation'], 'market_validation'),
+                ('mockup', ARRAY['preview'], 'preview'),
+                ('github_setup', ARRAY['github_setup'], 'github_setup')
+        ),
+        stale AS (
+            SELECT 'brd' AS kind, d.project_id FROM brd d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'prd', d.project_id FROM prd d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'market_research', d.project_id FROM market_research d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'mockup', d.project_id FROM mockup d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'github_setup', d.project_id FROM github_setup d WHERE d.status = 'in_progress' AND d.updated_at < cutoff
+            UNION ALL
+            SELECT 'tasks', p.id FROM projects p WHERE p.tasks_generation_status = 'in_progress' AND p.updated_at < cutoff
+        )
+        SELECT s.kind,
+               s.project_id,
+               k.resume_type,
+               p.user_id,
+               (SELECT j.status
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.job_type = ANY(k.job_types)
+                    ORDER BY j.created_at DESC
+                    LIMIT 1) AS last_status,
+               -- Same lookup as jobs.get_pipeline, so the resumed stage continues the pipeline
+               (SELECT j.payload->'pipeline'
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.payload->'pipeline' IS NOT NULL
+                    ORDER BY j.created_at DESC
+                    LIMIT 1) AS pipeline,
+               EXISTS (SELECT 1 FROM stale b WHERE b.kind = 'brd' AND b.project_id = s.project_id) AS brd_stale
+            FROM stale s
+            JOIN kinds k ON k.kind = s.kind
+            JOIN projects p ON p.id = s.project_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                    FROM ai_jobs j
+                    WHERE j.project_id = s.project_id
+                    AND j.job_type = ANY(k.job_types)
+                    AND j.status IN ('queued', 'running')
+            )
+            ORDER BY s.project_id, s.kind
+    LOOP
+        IF r.last_status IS NULL THEN
+            -- A stale PRD waiting on a stale BRD is resumed by the BRD's brd_and_prd job
+            IF r.kind = 'prd' AND r.brd_stale THEN
+                CONTINUE;
+            END IF;
+
+            SELECT id INTO new_job_id
+                FROM enqueue_ai_job(
+                    CASE
+                        WHEN r.kind = 'brd' AND EXISTS (
+                            SELECT 1 FROM prd WHERE prd.project_id = r.project_id AND prd.status = 'in_progress'
+                        ) THEN 'brd_and_prd'
+                        ELSE r.resume_type
+                    END,
+                    r.project_id,
+                    CASE WHEN r.resume_type = 'github_setup' THEN jsonb_build_object('user_id', r.user_id) ELSE '{}'::jsonb END
+                        || CASE WHEN r.pipeline IS NULL THEN '{}'::jsonb ELSE jsonb_build_object('pipeline', r.pipeline) END,
+                    -- A retried preview would start another Lovable project, it runs once
+                    CASE WHEN r.resume_type = 'preview' THEN 1 ELSE p_max_attempts END
+                ) AS id;
+
+            INSERT INTO ai_generation_recoveries (project_id, kind, action, job_id)
+                VALUES (r.project_id, r.kind, 'resumed', new_job_id)
+                RETURNING * INTO recovery;
+        ELSE
+            IF r.kind = 'tasks' THEN
+                UPDATE projects
+                    SET tasks_generation_status = 'failed'
+                    WHERE id = r.project_id
+                    AND tasks_generation_status = 'in_progress';
+            ELSE
+                EXECUTE format('UPDATE %I SET status = ''failed'' WHERE project_id = $1 AND status = ''in_progress''', r.kind)
+                    USING r.project_id;
+            END IF;
+
+            INSERT INTO ai_generation_recoveries (project_id, kind, action)
+                VALUES (r.project_id, r.kind, 'failed')
+                RETURNING * INTO recovery;
+        END IF;
+
+        RETURN NEXT recovery;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: ai_job_metrics(since)
+-- Queue and recovery counters, finished jobs and recoveries are counted from since
+CREATE OR REPLACE FUNCTION ai_job_metrics(p_since TIMESTAMPTZ)
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'since', p_since,
+        'jobs', (
+            SELECT COALESCE(jsonb_object_agg(status, n), '{}'::jsonb)
+                FROM (
+                    SELECT status, count(*) AS n
+                        FROM ai_jobs
+                        WHERE status IN ('queued', 'running') OR updated_at >= p_since
+                        GROUP BY status
+                ) s
+        ),
+        'expired_leases', (
+            SELECT count(*) FROM ai_jobs WHERE status = 'running' AND locked_until < NOW()
+        ),
+        'retried_jobs', (
+            SELECT count(*) FROM ai_jobs WHERE attempts > 1 AND updated_at >= p_since
+        ),
+        'recoveries', (
+            SELECT COALESCE(jsonb_object_agg(action, n), '{}'::jsonb)
+                FROM (
+                    SELECT action, count(*) AS n
+                        FROM ai_generation_recoveries
+                        WHERE created_at >= p_since
+                        GROUP BY action
+                ) r
+        ),
+        'recoveries_by_kind', (
+            SELECT COALESCE(jsonb_object_agg(kind, actions), '{}'::jsonb)
+                FROM (
+                    SELECT kind, jsonb_object_agg(action, n) AS actions
+                        FROM (
+                            SELECT kind, action, count(*) AS n
+                                FROM ai_generation_recoveries
+                                WHERE created_at >= p_since
+                                GROUP BY kind, action
+                        ) c
+                        GROUP BY kind
+                ) k
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,149 @@
+-- Durable AI job queue
+--
+-- Request handlers enqueue a row here and return. Worker processes (worker.py)
+-- claim ready jobs with FOR UPDATE SKIP LOCKED, hold them under a lease that a
+-- heartbeat keeps extending, and retry failures with backoff. A job whose lease
+-- expires (worker crashed or was redeployed) becomes claimable again.
+
+CREATE TYPE ai_job_status AS ENUM ('queued', 'running', 'completed', 'failed');
+
+CREATE TABLE ai_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_type VARCHAR(50) NOT NULL,
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status ai_job_status NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    locked_until TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Claim scans
+CREATE INDEX idx_ai_jobs_ready ON ai_jobs(run_at) WHERE status = 'queued';
+CREATE INDEX idx_ai_jobs_lease ON ai_jobs(locked_until) WHERE status = 'running';
+-- At most one pending or running job of a kind per project
+CREATE UNIQUE INDEX idx_ai_jobs_active ON ai_jobs(job_type, project_id) WHERE status IN ('queued', 'running');
+
+CREATE OR REPLACE TRIGGER update_ai_jobs_modtime
+    BEFORE UPDATE ON ai_jobs
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
+-- Function: enqueue_ai_job(job_type, project_id, payload, max_attempts)
+-- Returns the new job id, or no rows if the same job is already pending or running
+CREATE OR REPLACE FUNCTION enqueue_ai_job(p_job_type VARCHAR, p_project_id UUID, p_payload JSONB, p_max_attempts INTEGER)
+RETURNS SETOF UUID AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO ai_jobs (job_type, project_id, payload, max_attempts)
+            VALUES (p_job_type, p_project_id, COALESCE(p_payload, '{}'::jsonb), p_max_attempts)
+            ON CONFLICT (job_type, project_id) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: claim_ai_jobs(worker, limit, lease_seconds)
+-- Leases up to limit ready jobs (queued and due, or running with an expired lease)
+CREATE OR REPLACE FUNCTION claim_ai_jobs(p_worker TEXT, p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF ai_jobs AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_by = p_worker,
+                locked_until = NOW() + make_interval(secs => p_lease_seconds),
+                heartbeat_at = NOW()
+            WHERE j.id IN (
+                SELECT id
+                    FROM ai_jobs
+                    WHERE (status = 'queued' AND run_at <= NOW())
+                    OR (status = 'running' AND locked_until < NOW() AND attempts < max_attempts)
+                    ORDER BY run_at
+                    LIMIT p_limit
+                    FOR UPDATE SKIP LOCKED
+            )
+            RETURNING j.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: heartbeat_ai_job(job_id, worker, lease_seconds)
+-- Extends the lease, returns false if the worker no longer holds the job
+CREATE OR REPLACE FUNCTION heartbeat_ai_job(p_job_id UUID, p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE ai_jobs
+        SET locked_until = NOW() + make_interval(secs => p_lease_seconds),
+            heartbeat_at = NOW()
+        WHERE id = p_job_id
+        AND locked_by = p_worker
+        AND status = 'running';
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: complete_ai_job(job_id, worker)
+CREATE OR REPLACE FUNCTION complete_ai_job(p_job_id UUID, p_worker TEXT)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE ai_jobs
+        SET status = 'completed',
+            locked_by = NULL,
+            locked_until = NULL,
+            last_error = NULL
+        WHERE id = p_job_id
+        AND locked_by = p_worker
+        AND status = 'running';
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: fail_ai_job(job_id, worker, error, retry_delay_seconds)
+-- Requeues the job after the delay while attempts remain, otherwise marks it failed.
+-- Returns the resulting status, or no rows if the worker no longer holds the job
+CREATE OR REPLACE FUNCTION fail_ai_job(p_job_id UUID, p_worker TEXT, p_error TEXT, p_retry_delay_seconds INTEGER)
+RETURNS SETOF ai_job_status AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued'::ai_job_status ELSE 'failed'::ai_job_status END,
+                run_at = NOW() + make_interval(secs => p_retry_delay_seconds),
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = p_error
+            WHERE id = p_job_id
+            AND locked_by = p_worker
+            AND status = 'running'
+            RETURNING status;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: expire_ai_jobs()
+-- Marks running jobs whose lease expired with no attempts left as failed and returns them,
+-- so the worker can run their failure handling
+CREATE OR REPLACE FUNCTION expire_ai_jobs()
+RETURNS SETOF ai_jobs AS $$
+BEGIN
+    RETURN QUERY
+        UPDATE ai_jobs
+            SET status = 'failed',
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = COALESCE(last_error, 'Lease expired')
+            WHERE id IN (
+                SELECT id
+                    FROM ai_jobs
+                    WHERE status = 'running'
+                    AND locked_until < NOW()
+                    AND attempts >= max_attempts
+                    FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,96 @@
+-- Shared LLM provider rate limits
+--
+-- One token bucket pair (requests and tokens per minute) per provider key
+-- ("model_type:model_id"), shared by every API and worker process. Callers take
+-- capacity before each model call and are told how long to wait when the bucket
+-- is empty. A 429 with Retry-After blocks the key for every process.
+
+CREATE TABLE llm_rate_limits (
+    key TEXT PRIMARY KEY,
+    request_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+    token_tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+    refilled_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    blocked_until TIMESTAMPTZ
+);
+
+-- Function: take_llm_capacity(key, requests_per_minute, tokens_per_minute, tokens)
+-- Takes one request and the estimated tokens from the key's buckets (a limit of 0 means unlimited).
+-- Returns 0 when the call may go ahead, otherwise the seconds to wait before asking again
+CREATE OR REPLACE FUNCTION take_llm_capacity(p_key TEXT, p_requests_per_minute INTEGER, p_tokens_per_minute INTEGER, p_tokens INTEGER)
+RETURNS SETOF DOUBLE PRECISION AS $$
+DECLARE
+    bucket llm_rate_limits;
+    elapsed DOUBLE PRECISION;
+    needed DOUBLE PRECISION;
+    wait DOUBLE PRECISION := 0;
+BEGIN
+    INSERT INTO llm_rate_limits (key, request_tokens, token_tokens)
+        VALUES (p_key, p_requests_per_minute, p_tokens_per_minute)
+        ON CONFLICT (key) DO NOTHING;
+
+    SELECT * INTO bucket FROM llm_rate_limits WHERE key = p_key FOR UPDATE;
+
+    IF bucket.blocked_until > NOW() THEN
+        RETURN NEXT EXTRACT(EPOCH FROM bucket.blocked_until - NOW());
+        RETURN;
+    END IF;
+
+    elapsed := EXTRACT(EPOCH FROM NOW() - bucket.refilled_at);
+
+    IF p_requests_per_minute > 0 THEN
+        bucket.request_tokens := LEAST(p_requests_per_minute, bucket.request_tokens + elapsed * p_requests_per_minute / 60.0);
+        IF bucket.request_tokens < 1 THEN
+            wait := (1 - bucket.request_tokens) * 60.0 / p_requests_per_minute;
+        END IF;
+    END IF;
+
+    IF p_tokens_per_minute > 0 THEN
+        bucket.token_tokens := LEAST(p_tokens_per_minute, bucket.token_tokens + elapsed * p_tokens_per_minute / 60.0);
+        -- A call larger than the whole bucket only waits for a full bucket
+        needed := LEAST(p_tokens, p_tokens_per_minute);
+        IF bucket.token_tokens < needed THEN
+            wait := GREATEST(wait, (needed - bucket.token_tokens) * 60.0 / p_tokens_per_minute);
+        END IF;
+    END IF;
+
+    IF wait = 0 THEN
+        bucket.request_tokens := bucket.request_tokens - 1;
+        bucket.token_tokens := bucket.token_tokens - p_tokens;
+    END IF;
+
+    UPDATE llm_rate_limits
+        SET request_tokens = bucket.request_tokens,
+            token_tokens = bucket.token_tokens,
+            refilled_at = NOW()
+        WHERE key = p_key;
+
+    RETURN NEXT wait;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: settle_llm_tokens(key, tokens_per_minute, tokens)
+-- Corrects the token bucket once the real usage of a call is known
+-- (tokens > 0 charges more than the estimate, tokens < 0 refunds)
+CREATE OR REPLACE FUNCTION settle_llm_tokens(p_key TEXT, p_tokens_per_minute INTEGER, p_tokens INTEGER)
+RETURNS SETOF BOOLEAN AS $$
+BEGIN
+    UPDATE llm_rate_limits
+        SET token_tokens = LEAST(p_tokens_per_minute, token_tokens - p_tokens)
+        WHERE key = p_key;
+    RETURN NEXT FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: block_llm_key(key, seconds)
+-- Stops every process from calling the key for the given seconds (from a Retry-After header)
+CREATE OR REPLACE FUNCTION block_llm_key(p_key TEXT, p_seconds DOUBLE PRECISION)
+RETURNS SETOF TIMESTAMPTZ AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO llm_rate_limits (key, blocked_until)
+            VALUES (p_key, NOW() + make_interval(secs => p_seconds))
+            ON CONFLICT (key) DO UPDATE
+                SET blocked_until = GREATEST(llm_rate_limits.blocked_until, EXCLUDED.blocked_until)
+            RETURNING blocked_until;
+END;
+$$ LANGUAGE plpgsql;
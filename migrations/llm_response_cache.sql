@@ -0,0 +1,114 @@
+-- LLM response cache
+--
+-- Generated BRD, PRD and task responses keyed by a hash of the model, the agent
+-- instructions and the normalized prompt, so regenerating from unchanged input
+-- skips the model call. Entries expire after their TTL, and once the table holds
+-- more than max_bytes of content the least recently used entries are evicted.
+-- Lookups and hits are counted per model in llm_response_cache_counters.
+
+CREATE TABLE llm_response_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE llm_response_cache_counters (
+    model TEXT PRIMARY KEY,
+    lookups BIGINT NOT NULL DEFAULT 0,
+    hits BIGINT NOT NULL DEFAULT 0,
+    writes BIGINT NOT NULL DEFAULT 0,
+    evictions BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_llm_response_cache_last_used ON llm_response_cache(last_used_at);
+
+-- Function: get_llm_cache_entry(key, model)
+-- Returns the cached content of key if it has not expired, and counts the lookup
+CREATE OR REPLACE FUNCTION get_llm_cache_entry(p_key TEXT, p_model TEXT)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    cached TEXT;
+BEGIN
+    UPDATE llm_response_cache
+        SET hits = hits + 1,
+            last_used_at = NOW()
+        WHERE key = p_key
+        AND expires_at > NOW()
+        RETURNING content INTO cached;
+
+    INSERT INTO llm_response_cache_counters (model, lookups, hits)
+        VALUES (p_model, 1, CASE WHEN cached IS NULL THEN 0 ELSE 1 END)
+        ON CONFLICT (model) DO UPDATE
+            SET lookups = llm_response_cache_counters.lookups + 1,
+                hits = llm_response_cache_counters.hits + EXCLUDED.hits;
+
+    IF cached IS NOT NULL THEN
+        RETURN NEXT cached;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: put_llm_cache_entry(key, model, content, ttl_seconds, max_bytes)
+-- Stores content under key, then drops expired entries and the least recently used
+-- ones beyond max_bytes of content. Returns the number of evicted entries
+CREATE OR REPLACE FUNCTION put_llm_cache_entry(p_key TEXT, p_model TEXT, p_content TEXT, p_ttl_seconds INTEGER, p_max_bytes BIGINT)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    evicted INTEGER;
+BEGIN
+    INSERT INTO llm_response_cache (key, model, content, size_bytes, expires_at)
+        VALUES (p_key, p_model, p_content, octet_length(p_content), NOW() + make_interval(secs => p_ttl_seconds))
+        ON CONFLICT (key) DO UPDATE
+            SET content = EXCLUDED.content,
+                size_bytes = EXCLUDED.size_bytes,
+                last_used_at = NOW(),
+                expires_at = EXCLUDED.expires_at;
+
+    DELETE FROM llm_response_cache
+        WHERE expires_at <= NOW()
+        OR key IN (
+            SELECT c.key
+                FROM (
+                    SELECT key, SUM(size_bytes) OVER (ORDER BY last_used_at DESC, key) AS running_bytes
+                        FROM llm_response_cache
+                ) c
+                WHERE c.running_bytes > p_max_bytes
+        );
+    GET DIAGNOSTICS evicted = ROW_COUNT;
+
+    INSERT INTO llm_response_cache_counters (model, writes, evictions)
+        VALUES (p_model, 1, evicted)
+        ON CONFLICT (model) DO UPDATE
+            SET writes = llm_response_cache_counters.writes + 1,
+                evictions = llm_response_cache_counters.evictions + EXCLUDED.evictions;
+
+    RETURN NEXT evicted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: llm_cache_stats()
+-- Entry count, stored bytes and per-model lookup, hit and eviction counters
+CREATE OR REPLACE FUNCTION llm_cache_stats()
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'entries', (SELECT count(*) FROM llm_response_cache WHERE expires_at > NOW()),
+        'size_bytes', (SELECT COALESCE(SUM(size_bytes), 0) FROM llm_response_cache WHERE expires_at > NOW()),
+        'models', (
+            SELECT COALESCE(jsonb_object_agg(model, jsonb_build_object(
+                'lookups', lookups,
+                'hits', hits,
+                'hit_rate', CASE WHEN lookups > 0 THEN round(hits::numeric / lookups, 4) ELSE 0 END,
+                'writes', writes,
+                'evictions', evictions
+            )), '{}'::jsonb)
+                FROM llm_response_cache_counters
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
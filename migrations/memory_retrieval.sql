@@ -0,0 +1,70 @@
+-- Memory retrieval
+--
+-- Every user memory (ai.user_memories, written by the agents and the memory
+-- writer) is split into chunks stored with an embedding, so an agent is given
+-- the chunks most similar to its prompt, within a token budget, instead of
+-- every memory of the user. Chunks are replaced when their memory is rewritten
+-- and deleted with it.
+--
+-- A user never has more than MEMORY_MAX_PER_USER memories, so matches are
+-- ranked by an exact scan of the user's chunks rather than an approximate
+-- index over all of them, which would return too few rows once filtered.
+--
+-- Run after database.sql, the vector size must match EMBEDDING_DIMENSIONS.
+
+CREATE TABLE ai.memory_chunks (
+    memory_id VARCHAR NOT NULL REFERENCES ai.user_memories(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    user_id VARCHAR NOT NULL,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    embedding vector(768) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (memory_id, chunk_index)
+);
+
+CREATE INDEX idx_memory_chunks_user ON ai.memory_chunks(user_id, model);
+
+-- Function: save_memory_chunks(memory_id, user_id, model, chunks)
+-- chunks: [{"content": text, "tokens": int, "embedding": "[...]"}] in order
+-- Replaces the chunks of a memory, returns the number stored, or no rows if the
+-- memory has been deleted in the meantime
+CREATE OR REPLACE FUNCTION save_memory_chunks(p_memory_id VARCHAR, p_user_id VARCHAR, p_model TEXT, p_chunks JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    stored INTEGER;
+BEGIN
+    PERFORM 1 FROM ai.user_memories WHERE id = p_memory_id FOR SHARE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM ai.memory_chunks WHERE memory_id = p_memory_id;
+    INSERT INTO ai.memory_chunks (memory_id, chunk_index, user_id, model, content, tokens, embedding)
+        SELECT p_memory_id, c.ordinality - 1, p_user_id, p_model,
+               c.value->>'content', (c.value->>'tokens')::INTEGER, (c.value->>'embedding')::vector
+            FROM jsonb_array_elements(p_chunks) WITH ORDINALITY AS c(value, ordinality);
+    GET DIAGNOSTICS stored = ROW_COUNT;
+    RETURN NEXT stored;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: match_memory_chunks(user_id, model, embedding, limit)
+-- Returns up to limit chunks of the user's memories, most similar first, each row
+-- also carrying the tokens of all the user's chunks (what a full memory prompt costs)
+CREATE OR REPLACE FUNCTION match_memory_chunks(p_user_id VARCHAR, p_model TEXT, p_embedding vector, p_limit INTEGER)
+RETURNS TABLE (memory_id VARCHAR, chunk_index INTEGER, content TEXT, tokens INTEGER, similarity DOUBLE PRECISION, total_tokens BIGINT) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+        SELECT c.memory_id, c.chunk_index, c.content, c.tokens,
+               1 - (c.embedding <=> p_embedding) AS similarity,
+               sum(c.tokens) OVER () AS total_tokens
+            FROM ai.memory_chunks c
+            WHERE c.user_id = p_user_id
+            AND c.model = p_model
+            ORDER BY c.embedding <=> p_embedding
+            LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql;
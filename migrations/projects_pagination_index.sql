@@ -0,0 +1,3 @@
+-- Index backing keyset pagination of a user's projects
+-- Matches ORDER BY created_at DESC, id DESC filtered by user_id
+CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects(user_id, created_at DESC, id DESC);
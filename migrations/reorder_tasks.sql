@@ -0,0 +1,84 @@
+-- Bulk task reordering
+--
+-- Applies a whole ordering in one call instead of one UPDATE per task. The
+-- per-row shifting trigger is skipped for the statement (it would otherwise
+-- rewrite every following row for each moved task) and positions of the
+-- touched statuses are renumbered once, set-based, afterwards.
+
+-- Skip the shifting trigger while taskflow.skip_position_trigger is on
+CREATE OR REPLACE TRIGGER before_task_position_update
+    BEFORE UPDATE OF position, status ON tasks
+    FOR EACH ROW
+    WHEN (
+        ((OLD.position IS DISTINCT FROM NEW.position)
+        OR (OLD.status IS DISTINCT FROM NEW.status))
+        AND COALESCE(current_setting('taskflow.skip_position_trigger', true), '') <> 'on'
+    )
+    EXECUTE FUNCTION handle_task_position_update();
+
+-- Function: reorder_tasks(project_id, user_id, orders)
+-- orders: [{"task_id": uuid, "position": int, "status": task_status (optional)}]
+-- Returns one row with the number of tasks moved, or no rows if the project is not owned by the user
+CREATE OR REPLACE FUNCTION reorder_tasks(p_project_id UUID, p_user_id UUID, p_orders JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    moved_count INTEGER;
+    touched     task_status[];
+BEGIN
+    -- Verify project ownership in the same call
+    PERFORM 1 FROM projects WHERE id = p_project_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    -- Statuses whose sequences change: where moved tasks come from and go to
+    SELECT ARRAY_AGG(DISTINCT s) INTO touched
+        FROM (
+            SELECT t.status AS s
+                FROM tasks t
+                JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = t.id
+                WHERE t.project_id = p_project_id
+            UNION
+            SELECT o.status
+                FROM jsonb_to_recordset(p_orders) AS o(status task_status)
+                WHERE o.status IS NOT NULL
+        ) statuses;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'on', true);
+
+    UPDATE tasks t
+        SET position = GREATEST(1, o.position),
+            status   = COALESCE(o.status, t.status)
+        FROM jsonb_to_recordset(p_orders) AS o(task_id UUID, position INTEGER, status task_status)
+        WHERE t.id = o.task_id
+        AND t.project_id = p_project_id;
+    GET DIAGNOSTICS moved_count = ROW_COUNT;
+
+    -- Abort the whole reorder on unknown, foreign or duplicated task ids
+    IF moved_count <> jsonb_array_length(p_orders) THEN
+        RAISE EXCEPTION 'Orders must reference distinct tasks of this project'
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    -- Renumber touched statuses to 1..n, moved tasks win position ties
+    UPDATE tasks t
+        SET position = ranked.new_position
+        FROM (
+            SELECT tk.id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY tk.status
+                    ORDER BY tk.position, (o.task_id IS NULL), tk.created_at, tk.id
+                ) AS new_position
+            FROM tasks tk
+            LEFT JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = tk.id
+            WHERE tk.project_id = p_project_id
+            AND tk.status = ANY(touched)
+        ) ranked
+        WHERE t.id = ranked.id
+        AND t.position IS DISTINCT FROM ranked.new_position;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'off', true);
+
+    RETURN NEXT moved_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,126 @@
+-- Semantic project cache
+--
+-- Stores an embedding of every project's objective so BRD and market validation
+-- runs can find a completed document of a similar earlier project. A match above
+-- the similarity threshold is reused directly in draft mode, or passed to the
+-- model as a compact reference. Matches come from the same user's projects
+-- unless the lookup is shared. Lookups, hits and search latency are counted per
+-- document kind in semantic_cache_counters.
+--
+-- The vector size must match EMBEDDING_DIMENSIONS.
+
+CREATE TABLE project_embeddings (
+    project_id UUID PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    model TEXT NOT NULL,
+    embedding vector(768) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE semantic_cache_counters (
+    kind TEXT PRIMARY KEY,
+    lookups BIGINT NOT NULL DEFAULT 0,
+    hits BIGINT NOT NULL DEFAULT 0,
+    search_ms DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_project_embeddings_hnsw ON project_embeddings USING hnsw (embedding vector_cosine_ops);
+
+CREATE OR REPLACE TRIGGER update_project_embeddings_modtime
+    BEFORE UPDATE ON project_embeddings
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_updated_at_column();
+
+-- Function: save_project_embedding(project_id, model, embedding)
+-- Stores or replaces the objective embedding of a project
+CREATE OR REPLACE FUNCTION save_project_embedding(p_project_id UUID, p_model TEXT, p_embedding vector)
+RETURNS SETOF UUID AS $$
+BEGIN
+    RETURN QUERY
+        INSERT INTO project_embeddings (project_id, model, embedding)
+            VALUES (p_project_id, p_model, p_embedding)
+            ON CONFLICT (project_id) DO UPDATE
+                SET model = EXCLUDED.model,
+                    embedding = EXCLUDED.embedding
+            RETURNING project_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: match_similar_projects(project_id, model, embedding, kind, threshold, limit, shared)
+-- Stores the project's embedding, then returns up to limit other projects with a completed
+-- 'brd' or 'market_research' document whose cosine similarity is at least threshold, most
+-- similar first. Only the same user's projects are searched unless shared is true
+CREATE OR REPLACE FUNCTION match_similar_projects(
+    p_project_id UUID,
+    p_model TEXT,
+    p_embedding vector,
+    p_kind TEXT,
+    p_threshold DOUBLE PRECISION,
+    p_limit INTEGER,
+    p_shared BOOLEAN
+)
+RETURNS TABLE (project_id UUID, similarity DOUBLE PRECISION, content TEXT) AS $$
+#variable_conflict use_column
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+    owner UUID;
+    found_count INTEGER;
+BEGIN
+    IF p_kind NOT IN ('brd', 'market_research') THEN
+        RAISE EXCEPTION 'Unknown document kind: %', p_kind;
+    END IF;
+
+    PERFORM save_project_embedding(p_project_id, p_model, p_embedding);
+    SELECT user_id INTO owner FROM projects WHERE id = p_project_id;
+
+    RETURN QUERY
+        SELECT m.project_id, m.similarity, m.content
+            FROM (
+                SELECT e.project_id,
+                       1 - (e.embedding <=> p_embedding) AS similarity,
+                       CASE WHEN p_kind = 'brd' THEN b.brd_markdown ELSE r.report_markdown END AS content
+                    FROM project_embeddings e
+                    JOIN projects p ON p.id = e.project_id
+                    LEFT JOIN brd b ON p_kind = 'brd' AND b.project_id = e.project_id AND b.status = 'completed'
+                    LEFT JOIN market_research r ON p_kind = 'market_research' AND r.project_id = e.project_id AND r.status = 'completed'
+                    WHERE e.project_id <> p_project_id
+                    AND e.model = p_model
+                    AND (p_shared OR p.user_id = owner)
+                    -- Nearest neighbours from the HNSW index, filtered below
+                    ORDER BY e.embedding <=> p_embedding
+                    LIMIT GREATEST(p_limit, 1) * 10
+            ) m
+            WHERE m.content IS NOT NULL
+            AND m.similarity >= p_threshold
+            ORDER BY m.similarity DESC
+            LIMIT p_limit;
+    GET DIAGNOSTICS found_count = ROW_COUNT;
+
+    INSERT INTO semantic_cache_counters (kind, lookups, hits, search_ms)
+        VALUES (p_kind, 1, CASE WHEN found_count > 0 THEN 1 ELSE 0 END, EXTRACT(EPOCH FROM clock_timestamp() - started) * 1000)
+        ON CONFLICT (kind) DO UPDATE
+            SET lookups = semantic_cache_counters.lookups + 1,
+                hits = semantic_cache_counters.hits + EXCLUDED.hits,
+                search_ms = semantic_cache_counters.search_ms + EXCLUDED.search_ms;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: semantic_cache_stats()
+-- Stored embeddings and per-kind lookup, hit and average search latency counters
+CREATE OR REPLACE FUNCTION semantic_cache_stats()
+RETURNS SETOF JSONB AS $$
+BEGIN
+    RETURN NEXT jsonb_build_object(
+        'embeddings', (SELECT count(*) FROM project_embeddings),
+        'kinds', (
+            SELECT COALESCE(jsonb_object_agg(kind, jsonb_build_object(
+                'lookups', lookups,
+                'hits', hits,
+                'hit_rate', CASE WHEN lookups > 0 THEN round(hits::numeric / lookups, 4) ELSE 0 END,
+                'avg_search_ms', CASE WHEN lookups > 0 THEN round((search_ms / lookups)::numeric, 2) ELSE 0 END
+            )), '{}'::jsonb)
+                FROM semantic_cache_counters
+        )
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,25 @@
+-- Agent session compaction
+--
+-- ai.agent_sessions holds one row per agent session (e.g. "<project_id>_brd") that
+-- agno reads and rewrites in full on every run. Sessions are saved with only their
+-- newest SESSION_KEEP_RUNS runs, and sessions not updated for SESSION_RETENTION_DAYS
+-- are deleted by the worker and by `python maintenance.py compact-sessions` (see
+-- app/services/session_compaction.py). With SESSION_ARCHIVE enabled, the runs and
+-- sessions removed are first stored here as zlib-compressed JSON, reason being
+-- 'runs' or 'expired'.
+--
+-- Run after database.sql. The archive table is also created on first use.
+
+CREATE TABLE IF NOT EXISTS ai.agent_sessions_archive (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR NOT NULL,
+    user_id VARCHAR,
+    reason TEXT NOT NULL,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Retention scans of idle sessions
+CREATE INDEX IF NOT EXISTS idx_agent_sessions_updated ON ai.agent_sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_agent_sessions_archive_session ON ai.agent_sessions_archive(session_id, archived_at);
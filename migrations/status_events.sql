@@ -0,0 +1,112 @@
+-- Generation status events
+--
+-- Every status change of a brd / prd / market_research / mockup / github_setup
+-- row and of a project's tasks_generation_status is recorded in status_events
+-- and announced with NOTIFY on the 'generation_status' channel. Each API process
+-- LISTENs once and fans the events out to its /events Server-Sent Events
+-- connections. Clients reconnecting with Last-Event-ID get the events they
+-- missed from this table. The worker prunes events older than
+-- STATUS_EVENT_RETENTION seconds.
+
+CREATE TABLE status_events (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    project_id UUID NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(50),
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_status_events_user ON status_events(user_id, id);
+CREATE INDEX idx_status_events_created ON status_events(created_at);
+
+-- Function: notify_generation_status()
+-- Trigger recording a changed generation status and notifying listeners
+CREATE OR REPLACE FUNCTION notify_generation_status()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind TEXT := TG_TABLE_NAME;
+    v_status TEXT;
+    v_project UUID;
+    v_user UUID;
+    v_event status_events%ROWTYPE;
+BEGIN
+    IF TG_TABLE_NAME = 'projects' THEN
+        IF TG_OP = 'UPDATE' AND NEW.tasks_generation_status IS NOT DISTINCT FROM OLD.tasks_generation_status THEN
+            RETURN NULL;
+        END IF;
+        v_kind := 'tasks';
+        v_status := NEW.tasks_generation_status;
+        v_project := NEW.id;
+        v_user := NEW.user_id;
+    ELSE
+        IF TG_OP = 'UPDATE' AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+            RETURN NULL;
+        END IF;
+        v_status := NEW.status;
+        v_project := NEW.project_id;
+        SELECT user_id INTO v_user FROM projects WHERE id = v_project;
+    END IF;
+
+    IF v_user IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO status_events (user_id, project_id, kind, status)
+        VALUES (v_user, v_project, v_kind, v_status)
+        RETURNING * INTO v_event;
+
+    PERFORM pg_notify('generation_status', json_build_object(
+        'id', v_event.id,
+        'user_id', v_event.user_id,
+        'project_id', v_event.project_id,
+        'kind', v_event.kind,
+        'status', v_event.status,
+        'created_at', v_event.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER notify_brd_status
+    AFTER INSERT OR UPDATE OF status ON brd
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_prd_status
+    AFTER INSERT OR UPDATE OF status ON prd
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_market_research_status
+    AFTER INSERT OR UPDATE OF status ON market_research
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_mockup_status
+    AFTER INSERT OR UPDATE OF status ON mockup
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_github_setup_status
+    AFTER INSERT OR UPDATE OF status ON github_setup
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+CREATE OR REPLACE TRIGGER notify_tasks_status
+    AFTER UPDATE OF tasks_generation_status ON projects
+    FOR EACH ROW
+    EXECUTE PROCEDURE notify_generation_status();
+
+-- Function: prune_status_events(retention_seconds)
+-- Deletes events older than retention_seconds, returns how many were deleted
+CREATE OR REPLACE FUNCTION prune_status_events(p_retention_seconds INTEGER)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    DELETE FROM status_events WHERE created_at < NOW() - make_interval(secs => p_retention_seconds);
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN NEXT deleted;
+END;
+$$ LANGUAGE plpgsql;
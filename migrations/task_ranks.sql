@@ -0,0 +1,234 @@
+-- Fractional task ranks
+--
+-- Adds tasks.rank, a base-62 fractional key (see app/utils/ranking.py) that
+-- orders tasks within a status. Moving a task writes only its own rank, so the
+-- position-shifting triggers are skipped whenever the rank changes. position is
+-- kept for existing clients but is no longer maintained on rank moves, the API
+-- reports it from the rank order instead.
+
+-- Function: task_rank(index)
+-- Evenly spaced rank of the index-th task (1-based), 8 base-62 digits with trailing zeros removed
+CREATE OR REPLACE FUNCTION task_rank(idx BIGINT)
+RETURNS TEXT AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    value  BIGINT := idx * 14776336; -- 62^4
+    key    TEXT := '';
+BEGIN
+    IF idx < 1 OR idx >= 14776336 THEN
+        RAISE EXCEPTION 'Rank index out of range: %', idx;
+    END IF;
+
+    FOR i IN 1..8 LOOP
+        key := substr(digits, (value % 62)::INTEGER + 1, 1) || key;
+        value := value / 62;
+    END LOOP;
+
+    RETURN rtrim(key, '0');
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Function: task_rank_after(key)
+-- A rank sorting after key (the first rank when key is NULL)
+CREATE OR REPLACE FUNCTION task_rank_after(key TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    digit  INTEGER;
+BEGIN
+    IF key IS NULL THEN
+        RETURN task_rank(1);
+    END IF;
+
+    -- Raise the first digit with room before the end, dropping the rest
+    FOR i IN 1..length(key) LOOP
+        digit := strpos(digits, substr(key, i, 1)) - 1;
+        IF digit < 61 THEN
+            RETURN substr(key, 1, i - 1) || substr(digits, (digit + 62) / 2 + 1, 1);
+        END IF;
+    END LOOP;
+
+    RETURN key || 'V';
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Rank column, backfilled from the current positions
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS rank TEXT COLLATE "C";
+
+UPDATE tasks t
+    SET rank = task_rank(ordered.idx)
+    FROM (
+        SELECT id,
+            ROW_NUMBER() OVER (PARTITION BY project_id, status ORDER BY position, created_at, id) AS idx
+        FROM tasks
+    ) ordered
+    WHERE t.id = ordered.id
+    AND t.rank IS NULL;
+
+ALTER TABLE tasks ALTER COLUMN rank SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_project_status_rank ON tasks(project_id, status, rank);
+
+-- Inserts with a rank only append a position, no sibling is shifted.
+-- Inserts without a rank keep the old shifting behaviour and are ranked last.
+CREATE OR REPLACE FUNCTION adjust_task_positions()
+RETURNS TRIGGER AS $$
+DECLARE
+    max_position INTEGER;
+    status_key   task_status := NEW.status;
+BEGIN
+    -- Prevent recursive trigger loops
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NEW;
+    END IF;
+
+    -- Find current max position among tasks with same status
+    SELECT COALESCE(MAX(position), 0)
+        INTO max_position
+        FROM tasks
+        WHERE project_id = NEW.project_id
+        AND status = status_key;
+
+    IF NEW.rank IS NOT NULL THEN
+        NEW.position := max_position + 1;
+        RETURN NEW;
+    END IF;
+
+    NEW.rank := task_rank_after((
+        SELECT MAX(rank)
+            FROM tasks
+            WHERE project_id = NEW.project_id
+            AND status = status_key
+    ));
+
+    -- Assign or shift
+    IF NEW.position IS NULL
+        OR NEW.position > max_position + 1 THEN
+        NEW.position := max_position + 1;
+    ELSE
+        NEW.position := GREATEST(1, NEW.position);
+        UPDATE tasks
+            SET position = position + 1
+            WHERE project_id = NEW.project_id
+            AND status = status_key
+            AND position >= NEW.position;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rank moves bypass position shifting
+CREATE OR REPLACE TRIGGER before_task_position_update
+    BEFORE UPDATE OF position, status ON tasks
+    FOR EACH ROW
+    WHEN (
+        ((OLD.position IS DISTINCT FROM NEW.position)
+        OR (OLD.status IS DISTINCT FROM NEW.status))
+        AND OLD.rank IS NOT DISTINCT FROM NEW.rank
+        AND COALESCE(current_setting('taskflow.skip_position_trigger', true), '') <> 'on'
+    )
+    EXECUTE FUNCTION handle_task_position_update();
+
+-- Function: rebalance_task_ranks(project_id, status)
+-- Respaces the ranks of one status column once keys have grown too long
+-- Returns one row with the number of tasks respaced
+CREATE OR REPLACE FUNCTION rebalance_task_ranks(p_project_id UUID, p_status task_status)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    respaced INTEGER;
+BEGIN
+    UPDATE tasks t
+        SET rank = task_rank(ordered.idx)
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY rank, id) AS idx
+            FROM tasks
+            WHERE project_id = p_project_id
+            AND status = p_status
+        ) ordered
+        WHERE t.id = ordered.id;
+    GET DIAGNOSTICS respaced = ROW_COUNT;
+
+    RETURN NEXT respaced;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bulk reorders place untouched tasks by rank and respace ranks with the positions
+-- orders: [{"task_id": uuid, "position": int, "status": task_status (optional)}]
+-- Returns one row with the number of tasks moved, or no rows if the project is not owned by the user
+CREATE OR REPLACE FUNCTION reorder_tasks(p_project_id UUID, p_user_id UUID, p_orders JSONB)
+RETURNS SETOF INTEGER AS $$
+DECLARE
+    moved_count INTEGER;
+    touched     task_status[];
+BEGIN
+    -- Verify project ownership in the same call
+    PERFORM 1 FROM projects WHERE id = p_project_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    -- Statuses whose sequences change: where moved tasks come from and go to
+    SELECT ARRAY_AGG(DISTINCT s) INTO touched
+        FROM (
+            SELECT t.status AS s
+                FROM tasks t
+                JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = t.id
+                WHERE t.project_id = p_project_id
+            UNION
+            SELECT o.status
+                FROM jsonb_to_recordset(p_orders) AS o(status task_status)
+                WHERE o.status IS NOT NULL
+        ) statuses;
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'on', true);
+
+    UPDATE tasks t
+        SET position = GREATEST(1, o.position),
+            status   = COALESCE(o.status, t.status)
+        FROM jsonb_to_recordset(p_orders) AS o(task_id UUID, position INTEGER, status task_status)
+        WHERE t.id = o.task_id
+        AND t.project_id = p_project_id;
+    GET DIAGNOSTICS moved_count = ROW_COUNT;
+
+    -- Abort the whole reorder on unknown, foreign or duplicated task ids
+    IF moved_count <> jsonb_array_length(p_orders) THEN
+        RAISE EXCEPTION 'Orders must reference distinct tasks of this project'
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    -- Renumber touched statuses to 1..n: moved tasks take their requested
+    -- slot, the others keep their rank order, and ranks are respaced to match
+    UPDATE tasks t
+        SET position = ranked.new_position,
+            rank     = task_rank(ranked.new_position)
+        FROM (
+            SELECT keyed.id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY keyed.status
+                    ORDER BY keyed.sort_key, keyed.moved DESC, keyed.rank, keyed.id
+                ) AS new_position
+            FROM (
+                SELECT tk.id, tk.status, tk.rank,
+                    (o.task_id IS NOT NULL) AS moved,
+                    CASE WHEN o.task_id IS NOT NULL THEN tk.position
+                        ELSE ROW_NUMBER() OVER (
+                            PARTITION BY tk.status, (o.task_id IS NULL)
+                            ORDER BY tk.rank, tk.id
+                        )
+                    END AS sort_key
+                FROM tasks tk
+                LEFT JOIN jsonb_to_recordset(p_orders) AS o(task_id UUID) ON o.task_id = tk.id
+                WHERE tk.project_id = p_project_id
+                AND tk.status = ANY(touched)
+            ) keyed
+        ) ranked
+        WHERE t.id = ranked.id
+        AND (t.position IS DISTINCT FROM ranked.new_position
+            OR t.rank IS DISTINCT FROM task_rank(ranked.new_position));
+
+    PERFORM set_config('taskflow.skip_position_trigger', 'off', true);
+
+    RETURN NEXT moved_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,5 @@
+from app.worker import main
+
+if __name__ == "__main__":
+    # AI generation job worker, run alongside the API (see app/worker.py)
+    main()